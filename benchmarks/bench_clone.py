@@ -0,0 +1,145 @@
+"""
+benchmark the `QuerySet` chaining with the copy-on-write `_clone`
+against copying every container on each clone, as it did before.
+
+The copy-on-write saves the container copies, every call of the chain
+still creates a queryset clone of all the attributes. The bytes are the
+ones retained by the queryset at the end of a chain, the intermediate
+clones and copies are freed right away.
+
+run it from the project root::
+
+    python benchmarks/bench_clone.py --rounds 20000
+"""
+
+import argparse
+import asyncio as aio
+import os
+import sys
+import time
+import tracemalloc
+from copy import copy
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_tortoise import Manager, Tortoise, Tortoiser, fields  # noqa: E402
+from flask_tortoise import queryset as queryset_module  # noqa: E402
+from flask_tortoise.queryset import QuerySet  # noqa: E402
+
+db = Tortoise()
+
+#: the containers the `_clone` copied before the copy-on-write.
+COPIED_CONTAINERS = (
+    "_prefetch_map", "_prefetch_queries", "_filter_kwargs", "_orderings", "_joined_tables",
+    "_q_objects", "_annotations", "_having", "_custom_filters", "_group_bys",
+)
+
+
+class Posts(db.Model):
+    id = fields.IntField(pk=True)
+    name = fields.CharField(max_length=60)
+    published = fields.BooleanField(default=True)
+
+    class Meta:
+        manager = Manager()
+
+
+def copying_clone(self):
+    queryset = cow_clone(self)
+    for name in COPIED_CONTAINERS:
+        setattr(queryset, name, copy_container(getattr(queryset, name)))
+    return queryset
+
+
+def copy_container(value):
+    return copy(value)
+
+
+cow_clone = QuerySet._clone
+
+
+def chain() -> QuerySet:
+    return Posts.filter(published=True).order_by("-id").offset(20).limit(20).only("id", "name")
+
+
+def count_clones() -> int:
+    """
+    count the querysets cloned by a chain, the throwaway
+    clones aren't retained so the allocations miss them.
+    """
+    clone = QuerySet._clone
+    calls = [0]
+
+    def counting_clone(self):
+        calls[0] += 1
+        return clone(self)
+
+    QuerySet._clone = counting_clone
+    try:
+        chain()
+    finally:
+        QuerySet._clone = clone
+    return calls[0]
+
+
+def count_copies() -> int:
+    """
+    count the containers copied by a chain.
+    """
+    global copy_container
+    copy_function, copying_function = queryset_module.copy, copy_container
+    calls = [0]
+
+    def counting_copy(value):
+        calls[0] += 1
+        return copy(value)
+
+    queryset_module.copy = copy_container = counting_copy
+    try:
+        chain()
+    finally:
+        queryset_module.copy, copy_container = copy_function, copying_function
+    return calls[0]
+
+
+def measure(rounds:int) -> tuple:
+    chain()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        chain()
+    elapsed = (time.perf_counter() - start) / rounds
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    querysets = [chain() for _ in range(1000)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename")) / len(querysets)
+    return elapsed, allocated, count_clones(), count_copies()
+
+
+async def main(rounds:int) -> None:
+    await Tortoiser.init(db_url="sqlite://:memory:", modules={"models": ["__main__"]})
+    try:
+        QuerySet._clone = copying_clone
+        copying = measure(rounds)
+        QuerySet._clone = cow_clone
+        cow = measure(rounds)
+    finally:
+        QuerySet._clone = cow_clone
+        await Tortoiser.close_connections()
+
+    # the chain clones 5 times, the manager creates the first queryset.
+    print(f"rounds: {rounds}, chain: filter().order_by().offset().limit().only()")
+    for name, result in (("copying clone:", copying), ("copy-on-write clone:", cow)):
+        print(
+            f"{name:20} {result[0] * 1e6:8.2f} us {result[1]:8.0f} bytes retained "
+            f"{result[2]} clones {result[3]:3} container copies per chain"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=20000)
+    args = parser.parse_args()
+    aio.run(main(args.rounds))
@@ -0,0 +1,75 @@
+"""
+benchmark the repeated tortoise orm initialization 
+with and without the cached models registry.
+
+run it from the project root::
+
+    python benchmarks/bench_init.py --models 150 --rounds 20
+"""
+
+import argparse
+import asyncio as aio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_tortoise import Tortoiser  # noqa: E402
+
+
+def write_models_module(directory:str, count:int) -> str:
+    lines = ["from flask_tortoise import Tortoise, fields", "", "db = Tortoise()", ""]
+    for i in range(count):
+        lines += [
+            f"class Model{i}(db.Model):",
+            "    id = fields.IntField(pk=True)",
+            "    name = fields.CharField(max_length=60)",
+            "    created = fields.DatetimeField(auto_now_add=True)",
+        ]
+        if i:
+            lines.append(f"    parent = fields.ForeignKeyField('models.Model{i - 1}', related_name='children')")
+        lines.append("")
+
+    with open(os.path.join(directory, "bench_models.py"), "w") as f:
+        f.write("\n".join(lines))
+
+    return "bench_models"
+
+
+async def measure(module:str, rounds:int, cached:bool) -> float:
+    elapsed = 0.0
+    for _ in range(rounds):
+        if not cached:
+            Tortoiser.clear_models_registry()
+
+        start = time.perf_counter()
+        await Tortoiser.init(db_url="sqlite://:memory:", modules={"models": [module]})
+        elapsed += time.perf_counter() - start
+        await Tortoiser.close_connections()
+
+    return elapsed / rounds
+
+
+async def main(count:int, rounds:int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        sys.path.insert(0, directory)
+        module = write_models_module(directory, count)
+
+        first = await measure(module, 1, cached=True)
+        uncached = await measure(module, rounds, cached=False)
+        cached = await measure(module, rounds, cached=True)
+
+    print(f"models: {count}, rounds: {rounds}")
+    print(f"first init:        {first * 1000:8.2f} ms")
+    print(f"re-init, uncached: {uncached * 1000:8.2f} ms")
+    print(f"re-init, cached:   {cached * 1000:8.2f} ms ({uncached / cached:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--models", type=int, default=150)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    aio.run(main(args.models, args.rounds))
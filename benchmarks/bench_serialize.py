@@ -0,0 +1,93 @@
+"""
+benchmark serializing a list endpoint to JSON through the model
+instances against the `QuerySet.to_json` path, with `orjson` and
+with the json module fallback, which isn't faster than the instances.
+
+run it from the project root::
+
+    python benchmarks/bench_serialize.py --rows 5000 --rounds 20
+"""
+
+import argparse
+import asyncio as aio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_tortoise import Manager, Tortoise, Tortoiser, fields  # noqa: E402
+from flask_tortoise import serializers  # noqa: E402
+
+db = Tortoise()
+
+
+class Posts(db.Model):
+    id = fields.IntField(pk=True)
+    name = fields.CharField(max_length=60)
+    body = fields.TextField()
+    created = fields.DatetimeField(auto_now_add=True)
+
+    class Meta:
+        manager = Manager()
+
+
+async def instances_path() -> bytes:
+    posts = await Posts.all()
+    data = [dict(id=post.id, name=post.name, body=post.body, created=post.created.isoformat()) for post in posts]
+    return json.dumps(data).encode("utf-8")
+
+
+async def to_json_path() -> bytes:
+    return await Posts.all().to_json("id", "name", "body", "created")
+
+
+async def measure(func, rounds:int) -> float:
+    await func()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await func()
+    return (time.perf_counter() - start) / rounds
+
+
+def compare(reference:float, timing:float) -> str:
+    if timing <= reference:
+        return f"{reference / timing:.1f}x faster"
+    return f"{timing / reference:.1f}x slower"
+
+
+async def main(rows:int, rounds:int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        await Tortoiser.init(
+            db_url=f"sqlite://{os.path.join(directory, 'db.sqlite3')}", 
+            modules={"models": ["__main__"]}
+            )
+        try:
+            await Tortoiser.generate_schemas()
+            await Posts.bulk_create(
+                [Posts(name=f"Post-{i}", body=f"This is the post body, NO: {i}") for i in range(rows)]
+                )
+
+            instances = await measure(instances_path, rounds)
+            to_json = await measure(to_json_path, rounds)
+            orjson, serializers.orjson = serializers.orjson, None
+            to_json_stdlib = await measure(to_json_path, rounds)
+            serializers.orjson = orjson
+        finally:
+            await Tortoiser.close_connections()
+
+    print(f"rows: {rows}, rounds: {rounds}")
+    print(f"model instances:       {instances * 1000:8.2f} ms")
+    if orjson is not None:
+        print(f"to_json (orjson):      {to_json * 1000:8.2f} ms ({compare(instances, to_json)})")
+    print(f"to_json (json module): {to_json_stdlib * 1000:8.2f} ms ({compare(instances, to_json_stdlib)})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    aio.run(main(args.rows, args.rounds))
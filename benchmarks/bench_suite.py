@@ -0,0 +1,316 @@
+"""
+benchmark the hot paths of the extension against the stored baselines.
+
+Covers a request through the hooks of `register_tortoise` and `paginate`
+at a shallow and a deep page, both served by the test client in the
+`request` and the `persistent` pool modes, `get_or_404`, the `QuerySet`
+clone chaining, the bulk inserts, the model instances against the `rows`
+and the JSON rendering, on an in-memory and a file sqlite database.
+
+Every timing is divided by the one of a request to a plain async flask
+view measured in the same run, so the ratios stored in
+`benchmarks/baselines.json` hold on a faster or a slower machine.
+Update them with `--update-baselines` when a change is expected to move them.
+
+run it from the project root::
+
+    python benchmarks/bench_suite.py
+    python benchmarks/bench_suite.py --database file --update-baselines
+
+or under pytest, failing on the regressions::
+
+    pytest benchmarks/bench_suite.py
+"""
+
+import argparse
+import asyncio as aio
+import json
+import os
+import sys
+import tempfile
+import time
+import typing as t
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import flask  # noqa: E402
+
+from flask_tortoise import Manager, Tortoise, Tortoiser, fields  # noqa: E402
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+DATABASES = ("memory", "file")
+POOL_MODES = ("request", "persistent")
+#: the benchmark every other one is divided by.
+REFERENCE = "plain_request"
+
+#: a benchmark regresses when it's slower than `TOLERANCE` times it's baseline.
+TOLERANCE = 2.0
+
+db = Tortoise()
+
+
+class Posts(db.Model):
+    id = fields.IntField(pk=True)
+    name = fields.CharField(max_length=60)
+    body = fields.TextField()
+    published = fields.BooleanField(default=True)
+    created = fields.DatetimeField(auto_now_add=True)
+
+    class Meta:
+        table = "bench_posts"
+        manager = Manager()
+
+
+Benchmark = t.Callable[[int], t.Awaitable[t.Any]]
+BENCHMARKS:t.Dict[str, t.Tuple[Benchmark, int]] = dict()
+
+
+def benchmark(name:str, rounds:int=1):
+    """
+    register an async benchmark, called with the number of the rows
+    and repeated `rounds` times per measured round.
+    """
+    def decorator(func:Benchmark) -> Benchmark:
+        BENCHMARKS[name] = (func, rounds)
+        return func
+    return decorator
+
+
+@benchmark("get_or_404", rounds=100)
+async def bench_get_or_404(rows:int) -> None:
+    await Posts.get_or_404(pk=rows // 2)
+
+
+@benchmark("clone_chaining", rounds=1000)
+async def bench_clone_chaining(rows:int) -> None:
+    Posts.filter(published=True).exclude(name="").order_by("-id").offset(20).limit(20).only("id", "name")
+
+
+@benchmark("bulk_create", rounds=1)
+async def bench_bulk_create(rows:int) -> None:
+    await Posts.bulk_create([Posts(name=f"Bulk-{i}", body="body") for i in range(1000)])
+
+
+@benchmark("to_json", rounds=5)
+async def bench_to_json(rows:int) -> None:
+    await Posts.all().limit(1000).to_json("id", "name", "body", "created")
+
+
+@benchmark("instances", rounds=5)
+async def bench_instances(rows:int) -> None:
+    await Posts.all().limit(1000)
+
+
+@benchmark("rows", rounds=5)
+async def bench_rows(rows:int) -> None:
+    await Posts.all().limit(1000).rows()
+
+
+@benchmark("pagination_to_dict", rounds=20)
+async def bench_pagination_to_dict(rows:int) -> None:
+    (await Posts.all().paginate(page=1, per_page=50, fields=["id", "name", "created"])).to_dict()
+
+
+def get_db_url(database:str, directory:str) -> str:
+    if database == "memory":
+        return "sqlite://:memory:"
+    return f"sqlite://{os.path.join(directory, 'bench.sqlite3')}"
+
+
+async def create_posts(rows:int) -> None:
+    await Posts.bulk_create([Posts(name=f"Post-{i}", body=f"The post body, NO: {i}") for i in range(rows)])
+
+
+async def run_query_benchmarks(db_url:str, rows:int, repeat:int) -> t.Dict[str, float]:
+    await Tortoiser.init(db_url=db_url, modules={"models": [__name__]})
+    try:
+        await Tortoiser.generate_schemas()
+        await create_posts(rows)
+
+        results:t.Dict[str, float] = dict()
+        for name, (func, rounds) in BENCHMARKS.items():
+            await func(rows)
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                for _ in range(rounds):
+                    await func(rows)
+                best = min(best, (time.perf_counter() - start) / rounds)
+            results[name] = best
+        return results
+    finally:
+        await Tortoiser.close_connections()
+
+
+def measure_requests(app:flask.Flask, path:str, rounds:int, repeat:int) -> float:
+    client = app.test_client()
+    assert client.get(path).status_code == 200
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            client.get(path)
+        best = min(best, (time.perf_counter() - start) / rounds)
+    return best
+
+
+def make_app(db_url:str, pool_mode:str, rows:int) -> flask.Flask:
+    app = flask.Flask(__name__)
+    app.config["TORTOISE_ORM_DATABASE_URI"] = db_url
+    app.config["TORTOISE_ORM_MODELS"] = __name__
+    app.config["TORTOISE_ORM_GENERATE_SCHEMAS"] = True
+    app.config["TORTOISE_ORM_POOL_MODE"] = pool_mode
+    db.init_app(app)
+
+    @app.get("/")
+    async def index() -> str:
+        return "ok"
+
+    @app.get("/posts/<int:page>")
+    async def list_posts(page:int) -> str:
+        pagination = await Posts.filter(published=True).order_by("id").paginate(page=page, per_page=20)
+        return str(pagination.total)
+
+    @app.post("/posts")
+    async def seed_posts() -> str:
+        if not await Posts.exists():
+            await create_posts(rows)
+        return "ok"
+
+    return app
+
+
+def measure_reference(rounds:int, repeat:int) -> float:
+    """
+    measure a request to a plain async view, without the extension.
+    """
+    plain = flask.Flask(__name__)
+
+    @plain.get("/")
+    async def index() -> str:
+        return "ok"
+
+    return measure_requests(plain, "/", rounds, repeat)
+
+
+def run_request_benchmarks(db_url:str, rows:int, rounds:int, repeat:int) -> t.Dict[str, float]:
+    """
+    measure the requests through the hooks of `register_tortoise` in every pool mode.
+    """
+    results:t.Dict[str, float] = dict()
+    for pool_mode in POOL_MODES:
+        app = make_app(db_url, pool_mode, rows)
+        try:
+            app.test_client().post("/posts")
+            results[f"request_{pool_mode}"] = measure_requests(app, "/", rounds, repeat)
+            results[f"paginate_shallow_{pool_mode}"] = measure_requests(app, "/posts/1", rounds // 5, repeat)
+            results[f"paginate_deep_{pool_mode}"] = measure_requests(app, f"/posts/{rows // 20}", rounds // 5, repeat)
+        finally:
+            aio.run(db.close_pools())
+    return results
+
+
+def run_suite(database:str, rows:int=2000, repeat:int=5) -> t.Dict[str, float]:
+    """
+    return the best time of every benchmark in milliseconds.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        db_url = get_db_url(database, directory)
+        reference = measure_reference(100, repeat)
+        results = run_request_benchmarks(db_url, rows, 100, repeat)
+        if database == "file":
+            os.remove(os.path.join(directory, "bench.sqlite3"))
+        results.update(aio.run(run_query_benchmarks(db_url, rows, repeat)))
+
+    # measured before and after the others, the first one may still be warming up.
+    results[REFERENCE] = min(reference, measure_reference(100, repeat))
+    return {name: round(value * 1000, 4) for name, value in results.items()}
+
+
+def normalize(results:t.Dict[str, float]) -> t.Dict[str, float]:
+    """
+    return the timings as the multiples of the reference timing of the same run.
+    """
+    reference = results[REFERENCE]
+    return {name: round(value / reference, 4) for name, value in results.items() if name != REFERENCE}
+
+
+def load_baselines() -> t.Dict[str, t.Dict[str, float]]:
+    if not os.path.exists(BASELINES_PATH):
+        return dict()
+    with open(BASELINES_PATH) as f:
+        return json.load(f)
+
+
+def save_baselines(baselines:t.Dict[str, t.Dict[str, float]]) -> None:
+    with open(BASELINES_PATH, "w") as f:
+        json.dump(baselines, f, indent=4, sort_keys=True)
+        f.write("\n")
+
+
+def find_regressions(
+    results:t.Dict[str, float],
+    baselines:t.Dict[str, float],
+    tolerance:float=TOLERANCE
+    ) -> t.Dict[str, t.Tuple[float, float]]:
+    """
+    return the benchmarks slower than `tolerance` times their baseline,
+    with their ratio and baseline ratio to the reference. The differences
+    below 0.1 ms are noise.
+    """
+    reference = results[REFERENCE]
+    ratios = normalize(results)
+    return {
+        name: (ratio, baselines[name]) for name, ratio in ratios.items()
+        if name in baselines and ratio > baselines[name] * tolerance
+        and (ratio - baselines[name]) * reference > 0.1
+    }
+
+
+def test_no_regressions() -> None:
+    for database in DATABASES:
+        baselines = load_baselines().get(database, dict())
+        regressions = find_regressions(run_suite(database), baselines)
+        assert not regressions, f"{database}: {regressions}"
+
+
+def main(databases:t.Sequence[str], rows:int, repeat:int, update:bool, tolerance:float) -> int:
+    baselines = load_baselines()
+    failed = False
+    for database in databases:
+        results = run_suite(database, rows, repeat)
+        current = baselines.get(database, dict())
+        regressions = find_regressions(results, current, tolerance)
+
+        ratios = normalize(results)
+
+        print(f"database: {database}, rows: {rows}, {REFERENCE}: {results[REFERENCE]:.4f} ms")
+        for name, ratio in ratios.items():
+            baseline = current.get(name)
+            change = f"{ratio / baseline:6.2f}x" if baseline else "     -"
+            flag = "  REGRESSION" if name in regressions else ""
+            print(
+                f"  {name:28} {results[name]:10.4f} ms {ratio:10.4f} ref"
+                f"  baseline {baseline or 0:10.4f} ref  {change}{flag}"
+            )
+
+        failed = failed or bool(regressions)
+        if update:
+            baselines[database] = ratios
+
+    if update:
+        save_baselines(baselines)
+        print(f"updated {BASELINES_PATH}")
+        return 0
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database", choices=DATABASES, action="append")
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--update-baselines", action="store_true")
+    args = parser.parse_args()
+    sys.exit(main(args.database or DATABASES, args.rows, args.repeat, args.update_baselines, args.tolerance))
@@ -19,8 +19,7 @@ async def view():
     page=1
     per_page=10
     posts = await Posts.paginate(page=1, per_page=per_page)
-    data = await posts.items
-    # data = await posts.items
+    data = posts.items
     # print ("posts.items:", posts)
     # return "none"
     return render_template('view.html',posts=posts, data=data)
@@ -1,7 +1,13 @@
 from tortoise import Tortoise as OldTortoise
+from tortoise.backends.base.config_generator import generate_config
+from tortoise.transactions import current_transaction_map
+from tortoise.exceptions import ConfigurationError
 
 import asyncio as aio
+import atexit as atexit
 import logging as logging
+import os as os
+import threading as th
 from types import ModuleType
 from tortoise.log import logger
 
@@ -10,6 +16,7 @@ import typing as t
 from .models import (
     Model as Model,
     Manager as Manager,
+    install_m2m_relations,
     )
 from .fields import (
     CASCADE, 
@@ -44,21 +51,51 @@ from .fields import (
     ReverseRelation,
 )
 from .queryset import (
+    CursorPagination as CursorPagination,
     Pagination as Pagination,
     QuerySet as QuerySet,
 )
+from .schemas import generate_schemas_once
+from .streaming import stream_response as stream_response
+from .totals import TOTAL_STRATEGIES
+from .cache import query_cache
+from .templates import template_cache
+from .identity import clear_identity_map
+from .instrumentation import add_timing_headers, instrument_connections
+from .nplusone import N_PLUS_ONE_MODES, NPlusOneDetector
+from .slowlog import SlowQueryLog
+from .metrics import make_metrics_blueprint, metrics
+from .replicas import (
+    REPLICA_STRATEGIES,
+    ReplicaSet,
+    current_replica_routes,
+    get_replica_name,
+    install_replica_router,
+    lease_replicas,
+    register_replica,
+    release_replicas,
+)
+from .pool import (
+    SHARED_ENGINES,
+    ConnectionPool, 
+    lease_connections, 
+    release_connections,
+)
 
 if t.TYPE_CHECKING:
     from tortoise.fields.data import CharEnumType, IntEnumType
+    from tortoise.backends.base.client import BaseDBAsyncClient
     from flask import Flask
 
 
 __all__:t.Tuple[str] = (
     "Model",
     "Manager",
+    "CursorPagination",
     "Pagination",
     "QuerySet",
     "Tortoise",
+    "stream_response",
 )
 
 
@@ -357,6 +394,42 @@ class ConfigureModelAndFields(object):
         )
 
 
+def _register_shutdown(func:t.Callable[[], None]) -> None:
+    """
+    register the function to run at the interpreter shutdown.
+    The aiosqlite connections run inside non-daemon threads, which
+    are joined before the `atexit` callbacks, so the threading 
+    shutdown hook is preferred when it is available.
+    """
+    register = getattr(th, "_register_atexit", None)
+    if register is not None:
+        try:
+            return register(func)
+        except RuntimeError:
+            pass
+
+    atexit.register(func)
+
+
+#: the values of the process wide config vars, by the config var.
+_process_config:t.Dict[str, t.Any] = dict()
+
+
+def _check_process_config(app:"Flask", **config:t.Any) -> None:
+    """
+    record the config vars of the caches and the metrics, which are shared
+    by every app of the process, warning if another app set them differently.
+    """
+    for name, value in config.items():
+        previous = _process_config.get(name, value)
+        if previous != value:
+            logger.warning(
+                "`%s` is process wide, the app %r overrides it's previous value %r with %r.", 
+                name, app.name, previous, value
+                )
+        _process_config[name] = value
+
+
 class Tortoiser(OldTortoise):
     """
     base Tortoise class inherited from `tortoise.Tortoise`
@@ -364,6 +437,57 @@ class Tortoiser(OldTortoise):
     methods to perform the changes related 
     to the base `Tortoise` class.
     """
+    #: the discovered and resolved models of every apps config 
+    #: initialized by this process, reused by the later initializations.
+    _models_registry:t.Dict[t.Tuple, t.Dict[str, t.Dict[str, t.Type["Model"]]]] = dict()
+
+    @classmethod
+    def _get_models_registry_key(cls, apps_config:t.Dict[str, t.Any]) -> t.Tuple:
+        key = list()
+        for name, info in sorted(apps_config.items()):
+            connection_name = info.get("default_connection", "default")
+            key.append((
+                name,
+                tuple(
+                    module.__name__ if isinstance(module, ModuleType) else str(module) 
+                    for module in info["models"]
+                    ),
+                connection_name,
+                # the initial querysets depend on the dialect of the connection.
+                type(cls._connections.get(connection_name)).__name__,
+            ))
+        return tuple(key)
+
+    @classmethod
+    def _init_apps(cls, apps_config:t.Dict[str, t.Any]) -> None:
+        key = cls._get_models_registry_key(apps_config)
+        registry = cls._models_registry.get(key)
+        if registry is None:
+            super(Tortoiser, cls)._init_apps(apps_config)
+            for models in cls.apps.values():
+                for model in models.values():
+                    install_m2m_relations(model)
+            cls._models_registry[key] = {name: dict(models) for name, models in cls.apps.items()}
+            return None
+
+        # the models are already imported and their relations and
+        # initial querysets are built, only the app registry is restored.
+        for name, info in apps_config.items():
+            connection_name = info.get("default_connection", "default")
+            if connection_name not in cls._connections:
+                raise ConfigurationError(f'Unknown connection "{connection_name}" for app "{name}"')
+
+            cls.apps[name] = dict(registry[name])
+            for model in cls.apps[name].values():
+                model._meta.default_connection = connection_name
+
+    @classmethod
+    def clear_models_registry(cls) -> None:
+        """
+        forget the cached models, so the next 
+        initialization discovers them again.
+        """
+        cls._models_registry.clear()
 
 class ConnectTortoise(object):
     """
@@ -404,6 +528,20 @@ class _Tortoise(object):
         db_uri: t.Optional[str] = None,
         modules: t.Optional[t.Dict[str, t.Iterable[t.Union[str, ModuleType]]]] = None,
         generate_schemas: bool = False,
+        pool_mode: str = "request",
+        pool_min_size: int = 1,
+        pool_max_size: int = 10,
+        pool_idle_timeout: t.Optional[float] = 300.0,
+        pool_acquire_timeout: t.Optional[float] = 30.0,
+        statement_cache_size: t.Optional[int] = None,
+        read_replica_uris: t.Optional[t.Dict[str, t.List[str]]] = None,
+        read_replica_strategy: str = "round_robin",
+        record_queries: bool = False,
+        query_timing_headers: bool = False,
+        n_plus_one: t.Optional[str] = None,
+        n_plus_one_threshold: int = 5,
+        slow_query_log: t.Optional["SlowQueryLog"] = None,
+        metrics_path: t.Optional[str] = None,
         ) -> None:
 
         self.app = app
@@ -412,6 +550,29 @@ class _Tortoise(object):
         self.db_uri = db_uri
         self.modules = modules
         self._generate_schemas:bool = generate_schemas
+        self.pool_mode = pool_mode
+        self.pool_min_size = pool_min_size
+        self.pool_max_size = pool_max_size
+        self.pool_idle_timeout = pool_idle_timeout
+        self.pool_acquire_timeout = pool_acquire_timeout
+        self.statement_cache_size = statement_cache_size
+        self.read_replica_uris = read_replica_uris or dict()
+        self.read_replica_strategy = read_replica_strategy
+        self.record_queries = (
+            record_queries or query_timing_headers 
+            or n_plus_one is not None or slow_query_log is not None
+            or metrics_path is not None
+        )
+        self.query_timing_headers = query_timing_headers
+        self.n_plus_one = n_plus_one
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.slow_query_log = slow_query_log
+        self.metrics_path = metrics_path
+
+        self._pools:t.Dict[str, "ConnectionPool"] = dict()
+        self._replica_sets:t.Dict[str, "ReplicaSet"] = dict()
+        self._pools_pid:t.Optional[int] = None
+        self._pools_lock = th.Lock()
 
         self.aerich_config = {
             "connections": {"default": self.db_uri},
@@ -480,17 +641,164 @@ class _Tortoise(object):
         tortoise_initializer_kwargs = initializer or self._get_kwargs_for_tortoise_initialization()
         return ConnectTortoise(tortoise_initializer_kwargs)
 
+    def _get_connections_config(self) -> t.Dict[str, t.Any]:
+        kwargs = self._get_kwargs_for_tortoise_initialization()
+        config = kwargs["config"]
+        if kwargs["config_file"]:
+            config = Tortoiser._get_config_from_config_file(kwargs["config_file"])
+        elif kwargs["db_url"]:
+            config = generate_config(kwargs["db_url"], kwargs["modules"])
+        return config["connections"]
+
+    def _get_pool_options(self) -> t.Dict[str, t.Any]:
+        if self.pool_mode == "persistent":
+            return dict(
+                min_size=self.pool_min_size, 
+                max_size=self.pool_max_size, 
+                idle_timeout=self.pool_idle_timeout,
+                acquire_timeout=self.pool_acquire_timeout,
+                # the prepared statements outlive the request with the connection.
+                statement_cache_size=self.statement_cache_size,
+            )
+
+        # the `request` mode opens a dedicated connection for every
+        # request and closes it as soon as the request is released,
+        # without limiting the concurrent requests.
+        return dict(min_size=0, max_size=None, idle_timeout=0, statement_cache_size=self.statement_cache_size)
+
+    def _create_pool(self, name:str, info:t.Union[str, t.Dict[str, t.Any]]) -> "ConnectionPool":
+        pool = ConnectionPool(name, info, **self._get_pool_options())
+        if self.pool_mode == "persistent" and not pool.shared_across_loops:
+            # flask runs every request inside a new event loop, the clients
+            # of these drivers can't outlive the loop which opened them.
+            raise ConfigurationError(
+                f'The `persistent` pool mode supports only the {list(SHARED_ENGINES)} engines. '
+                f'Got: {pool.engine} for the connection "{name}".'
+                )
+        return pool
+
+    async def init_pools(self) -> None:
+        """
+        initialize the tortoise orm and open a connection pool
+        for every configured connection. 
+        This runs only once per worker process, 
+        the later calls are no-op.
+        """
+        if self._pools_pid == os.getpid():
+            return None
+
+        # flask runs every async hook inside it's own event loop and thread,
+        # so a thread lock is used to initialize the orm only once.
+        with self._pools_lock:
+            if self._pools_pid == os.getpid():
+                return None
+
+            pools:t.Dict[str, "ConnectionPool"] = {
+                name: self._create_pool(name, info) for name, info in self._get_connections_config().items()
+            }
+
+            await self.init_tortoise()
+            if self._generate_schemas:
+                await generate_schemas_once(Tortoiser._connections)
+
+            for name, pool in pools.items():
+                await pool.open(shared_client=Tortoiser._connections.get(name))
+
+            self._pools = pools
+            self._replica_sets = await self._open_replica_sets()
+            self._pools_pid = os.getpid()
+            _register_shutdown(self._close_pools_at_exit)
+
+    async def _open_replica_sets(self) -> t.Dict[str, "ReplicaSet"]:
+        """
+        open the connection pools of the read replicas. The replicas
+        aren't the tortoise orm connections, so the schemas are never
+        generated on them and `in_transaction()` keeps working without
+        a connection name. The reads get to them by the `ReplicaRouter`.
+        """
+        if not self.read_replica_uris:
+            return dict()
+
+        replica_pools:t.Dict[str, t.Dict[str, "ConnectionPool"]] = dict()
+        for name, uris in self.read_replica_uris.items():
+            replica_pools[name] = dict()
+            for idx, uri in enumerate(uris):
+                replica = get_replica_name(name, idx)
+                replica_pools[name][replica] = self._create_pool(replica, uri)
+
+        replica_sets:t.Dict[str, "ReplicaSet"] = dict()
+        for name, pools in replica_pools.items():
+            for replica, pool in pools.items():
+                await pool.open()
+                register_replica(replica)
+            replica_sets[name] = ReplicaSet(name, pools, self.read_replica_strategy)
+
+        install_replica_router()
+        return replica_sets
+
+    async def close_pools(self) -> None:
+        """
+        close all the connection pools and the tortoise orm connections.
+        """
+        pools, self._pools = self._pools, dict()
+        replica_sets, self._replica_sets = self._replica_sets, dict()
+        self._pools_pid = None
+        for replica_set in replica_sets.values():
+            pools.update(replica_set.pools)
+        await aio.gather(*(pool.close() for pool in pools.values()))
+        await Tortoiser.close_connections()
+
+    def _close_pools_at_exit(self) -> None:
+        if self._pools_pid != os.getpid():
+            return None
+
+        loop = aio.new_event_loop()
+        try:
+            loop.run_until_complete(self.close_pools())
+        finally:
+            loop.close()
+
+    async def lease_connections(self) -> None:
+        """
+        lease a client from every connection pool and use 
+        it as the current tortoise orm connection of the request.
+        """
+        await lease_connections(self._pools)
+        await lease_replicas(self._replica_sets)
+        if self.record_queries:
+            detector = None
+            if self.n_plus_one is not None:
+                detector = NPlusOneDetector(self.n_plus_one, self.n_plus_one_threshold)
+            instrument_connections(
+                [*self._pools, *(current_replica_routes.get() or dict()).values()], 
+                detector, 
+                self.slow_query_log
+            )
+
+    async def release_connections(self) -> None:
+        """
+        return the leased clients of the request to their pools.
+        """
+        await release_replicas()
+        await release_connections(self._pools)
+
     def register_tortoise(self) -> None:
 
         @self.app.before_request
         async def init_orm() -> None: 
-            await self.init_tortoise()
-            if self._generate_schemas:
-                await Tortoiser.generate_schemas()
+            await self.init_pools()
+            await self.lease_connections()
 
         @self.app.teardown_request
         async def close_orm(*wargs, **kwargs):
-            await Tortoiser.close_connections()
+            clear_identity_map()
+            await self.release_connections()
+
+        if self.query_timing_headers:
+            self.app.after_request(add_timing_headers)
+
+        if self.metrics_path is not None:
+            self.app.register_blueprint(make_metrics_blueprint(self.metrics_path))
 
     def register_cli_interface(self):
         from .cli import tortoise 
@@ -504,6 +812,7 @@ class Tortoise(_Tortoise, ConfigureModelAndFields):
         the Flask application
     """
     __available_db_models:list = ["aerich.models"] # add custom models here.
+    __available_pool_modes:t.Tuple[str] = ("request", "persistent")
 
     def __init__(self, app:t.Optional["Flask"]=None) -> None:
         
@@ -526,6 +835,29 @@ class Tortoise(_Tortoise, ConfigureModelAndFields):
         db_config:t.Optional[dict] = app.config.get("TORTOISE_ORM_CONFIG", None)
         db_config_file:t.Optional[str] = app.config.get("TORTOISE_ORM_CONFIG_FILE", None)
         generate_schemas:bool = app.config.get("TORTOISE_ORM_GENERATE_SCHEMAS", False)
+        pool_mode:str = app.config.get("TORTOISE_ORM_POOL_MODE", "request")
+        pool_min_size:int = app.config.get("TORTOISE_ORM_POOL_MIN_SIZE", 1)
+        pool_max_size:int = app.config.get("TORTOISE_ORM_POOL_MAX_SIZE", 10)
+        pool_idle_timeout:t.Optional[t.Union[int, float]] = app.config.get("TORTOISE_ORM_POOL_IDLE_TIMEOUT", 300)
+        pool_acquire_timeout:t.Optional[t.Union[int, float]] = app.config.get("TORTOISE_ORM_POOL_ACQUIRE_TIMEOUT", 30)
+        statement_cache_size:t.Optional[int] = app.config.get("TORTOISE_ORM_STATEMENT_CACHE_SIZE", None)
+        pagination_total:str = app.config.get("TORTOISE_ORM_PAGINATION_TOTAL", "exact")
+        pagination_total_ttl:t.Optional[t.Union[int, float]] = app.config.get("TORTOISE_ORM_PAGINATION_TOTAL_TTL", 60)
+        query_cache_size:int = app.config.get("TORTOISE_ORM_QUERY_CACHE_SIZE", 1024)
+        sql_template_cache_size:int = app.config.get("TORTOISE_ORM_SQL_TEMPLATE_CACHE_SIZE", 512)
+        single_flight:bool = app.config.get("TORTOISE_ORM_SINGLE_FLIGHT", False)
+        read_replica_uris:t.Optional[t.Union[list, tuple, dict]] = app.config.get("TORTOISE_ORM_READ_REPLICA_URIS", None)
+        read_replica_strategy:str = app.config.get("TORTOISE_ORM_READ_REPLICA_STRATEGY", "round_robin")
+        record_queries:bool = app.config.get("TORTOISE_ORM_RECORD_QUERIES", False)
+        query_timing_headers:bool = app.config.get("TORTOISE_ORM_QUERY_TIMING_HEADERS", False)
+        n_plus_one:t.Optional[str] = app.config.get("TORTOISE_ORM_N_PLUS_ONE", None)
+        n_plus_one_threshold:int = app.config.get("TORTOISE_ORM_N_PLUS_ONE_THRESHOLD", 5)
+        slow_query_ms:t.Optional[t.Union[int, float]] = app.config.get("TORTOISE_ORM_SLOW_QUERY_MS", None)
+        slow_query_sample_rate:t.Union[int, float] = app.config.get("TORTOISE_ORM_SLOW_QUERY_SAMPLE_RATE", 1.0)
+        slow_query_log_path:t.Optional[str] = app.config.get("TORTOISE_ORM_SLOW_QUERY_LOG", None)
+        slow_query_explain:bool = app.config.get("TORTOISE_ORM_SLOW_QUERY_EXPLAIN", True)
+        metrics_enabled:bool = app.config.get("TORTOISE_ORM_METRICS", False)
+        metrics_path:str = app.config.get("TORTOISE_ORM_METRICS_PATH", "/metrics")
 
         _ = self.__check_data_type(db_uri, str, "TORTOISE_ORM_DATABASE_URI", True)
         _ = self.__check_data_type(db_models, (str, list, tuple), "TORTOISE_ORM_MODELS")
@@ -533,6 +865,68 @@ class Tortoise(_Tortoise, ConfigureModelAndFields):
         _ = self.__check_data_type(db_config, dict, "TORTOISE_ORM_CONFIG")
         _ = self.__check_data_type(db_config_file, str, "TORTOISE_ORM_CONFIG_FILE")
         _ = self.__check_data_type(generate_schemas, bool, "TORTOISE_ORM_GENERATE_SCHEMAS")
+        _ = self.__check_data_type(pool_mode, str, "TORTOISE_ORM_POOL_MODE")
+        _ = self.__check_data_type(pool_min_size, int, "TORTOISE_ORM_POOL_MIN_SIZE")
+        _ = self.__check_data_type(pool_max_size, int, "TORTOISE_ORM_POOL_MAX_SIZE")
+        _ = self.__check_data_type(pool_idle_timeout, (int, float), "TORTOISE_ORM_POOL_IDLE_TIMEOUT")
+        _ = self.__check_data_type(pool_acquire_timeout, (int, float), "TORTOISE_ORM_POOL_ACQUIRE_TIMEOUT")
+        _ = self.__check_data_type(statement_cache_size, int, "TORTOISE_ORM_STATEMENT_CACHE_SIZE")
+        _ = self.__check_data_type(pagination_total, str, "TORTOISE_ORM_PAGINATION_TOTAL")
+        _ = self.__check_data_type(pagination_total_ttl, (int, float), "TORTOISE_ORM_PAGINATION_TOTAL_TTL")
+        _ = self.__check_data_type(query_cache_size, int, "TORTOISE_ORM_QUERY_CACHE_SIZE")
+        _ = self.__check_data_type(sql_template_cache_size, int, "TORTOISE_ORM_SQL_TEMPLATE_CACHE_SIZE")
+        _ = self.__check_data_type(single_flight, bool, "TORTOISE_ORM_SINGLE_FLIGHT")
+        _ = self.__check_data_type(read_replica_uris, (list, tuple, dict), "TORTOISE_ORM_READ_REPLICA_URIS")
+        _ = self.__check_data_type(read_replica_strategy, str, "TORTOISE_ORM_READ_REPLICA_STRATEGY")
+        _ = self.__check_data_type(record_queries, bool, "TORTOISE_ORM_RECORD_QUERIES")
+        _ = self.__check_data_type(query_timing_headers, bool, "TORTOISE_ORM_QUERY_TIMING_HEADERS")
+        _ = self.__check_data_type(n_plus_one, str, "TORTOISE_ORM_N_PLUS_ONE")
+        _ = self.__check_data_type(n_plus_one_threshold, int, "TORTOISE_ORM_N_PLUS_ONE_THRESHOLD")
+        _ = self.__check_data_type(slow_query_ms, (int, float), "TORTOISE_ORM_SLOW_QUERY_MS")
+        _ = self.__check_data_type(slow_query_sample_rate, (int, float), "TORTOISE_ORM_SLOW_QUERY_SAMPLE_RATE")
+        _ = self.__check_data_type(slow_query_log_path, str, "TORTOISE_ORM_SLOW_QUERY_LOG")
+        _ = self.__check_data_type(slow_query_explain, bool, "TORTOISE_ORM_SLOW_QUERY_EXPLAIN")
+        _ = self.__check_data_type(metrics_enabled, bool, "TORTOISE_ORM_METRICS")
+        _ = self.__check_data_type(metrics_path, str, "TORTOISE_ORM_METRICS_PATH")
+
+        if pool_mode not in self.__available_pool_modes:
+            raise ValueError(f"`TORTOISE_ORM_POOL_MODE` config var takes only {list(self.__available_pool_modes)} values. Got: {pool_mode}")
+
+        if pagination_total not in TOTAL_STRATEGIES:
+            raise ValueError(f"`TORTOISE_ORM_PAGINATION_TOTAL` config var takes only {list(TOTAL_STRATEGIES)} values. Got: {pagination_total}")
+
+        if read_replica_strategy not in REPLICA_STRATEGIES:
+            raise ValueError(f"`TORTOISE_ORM_READ_REPLICA_STRATEGY` config var takes only {list(REPLICA_STRATEGIES)} values. Got: {read_replica_strategy}")
+
+        if n_plus_one is not None and n_plus_one not in N_PLUS_ONE_MODES:
+            raise ValueError(f"`TORTOISE_ORM_N_PLUS_ONE` config var takes only {list(N_PLUS_ONE_MODES)} values. Got: {n_plus_one}")
+
+        if not 0 <= slow_query_sample_rate <= 1:
+            raise ValueError(f"`TORTOISE_ORM_SLOW_QUERY_SAMPLE_RATE` config var takes a value between 0 and 1. Got: {slow_query_sample_rate}")
+
+        slow_query_log:t.Optional[SlowQueryLog] = None
+        if slow_query_ms is not None:
+            slow_query_log = SlowQueryLog(
+                slow_query_ms, 
+                sample_rate=slow_query_sample_rate, 
+                path=slow_query_log_path, 
+                explain=slow_query_explain
+            )
+
+        if isinstance(read_replica_uris, (list, tuple)):
+            # a list of uris replicates the `default` connection.
+            read_replica_uris = {"default": list(read_replica_uris)}
+
+        # the caches and the metrics are shared by every app of the process.
+        _check_process_config(
+            app,
+            TORTOISE_ORM_QUERY_CACHE_SIZE=query_cache_size,
+            TORTOISE_ORM_SQL_TEMPLATE_CACHE_SIZE=sql_template_cache_size,
+            TORTOISE_ORM_METRICS=metrics_enabled,
+            )
+        query_cache.maxsize = query_cache_size
+        template_cache.maxsize = sql_template_cache_size
+        metrics.enabled = metrics_enabled
 
         if db_models is not None:
             if isinstance(db_models, str):
@@ -554,7 +948,21 @@ class Tortoise(_Tortoise, ConfigureModelAndFields):
             config_file=db_config_file, 
             db_uri=db_uri, 
             modules=db_modules, 
-            generate_schemas=generate_schemas
+            generate_schemas=generate_schemas,
+            pool_mode=pool_mode,
+            pool_min_size=pool_min_size,
+            pool_max_size=pool_max_size,
+            pool_idle_timeout=pool_idle_timeout,
+            pool_acquire_timeout=pool_acquire_timeout,
+            statement_cache_size=statement_cache_size,
+            read_replica_uris=read_replica_uris,
+            read_replica_strategy=read_replica_strategy,
+            record_queries=record_queries,
+            query_timing_headers=query_timing_headers,
+            n_plus_one=n_plus_one,
+            n_plus_one_threshold=n_plus_one_threshold,
+            slow_query_log=slow_query_log,
+            metrics_path=metrics_path if metrics_enabled else None,
             )
         
         super(Tortoise, self).register_tortoise()
@@ -580,7 +988,7 @@ class Tortoise(_Tortoise, ConfigureModelAndFields):
         """
         async def generator() -> None:
             await self.init_tortoise()
-            await Tortoiser.generate_schemas()
+            await generate_schemas_once(Tortoiser._connections, force=True)
             await Tortoiser.close_connections()
 
         logger.setLevel(logging.DEBUG)
@@ -0,0 +1,307 @@
+"""
+provide the small in-process caches used by the query helpers.
+"""
+
+from tortoise.backends.base.client import (
+    BaseTransactionWrapper, 
+    TransactionContext, 
+    TransactionContextPooled,
+    )
+from tortoise.transactions import current_transaction_map
+
+from collections import OrderedDict
+
+import threading as th
+import time as time
+import typing as t
+
+if t.TYPE_CHECKING:
+    from tortoise.backends.base.client import BaseDBAsyncClient
+    from tortoise.models import Model
+
+__all__ = (
+    'TTLCache',
+    'CachingClient',
+    'query_cache',
+    'invalidate_tables',
+    'invalidate_model',
+    'invalidate_written_tables',
+    'get_transaction_client',
+)
+
+_MISSING = object()
+
+
+class TTLCache(object):
+    """
+    A thread safe, size bounded LRU cache with an optional
+    time to live for the entries.
+
+    :param maxsize:
+        the maximum number of the entries, the least recently
+        used ones are evicted first.
+
+    :param ttl:
+        the default number of seconds an entry stays valid. `None` never expires.
+
+    :for example::
+
+        cache = TTLCache(maxsize=128, ttl=30)
+        cache.set("key", "value")
+        cache.get("key")
+    """
+    def __init__(self, maxsize:int=1024, ttl:t.Optional[float]=None) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits:int = 0
+        self.misses:int = 0
+        self._data:"OrderedDict[t.Hashable, t.Tuple[t.Any, t.Optional[float]]]" = OrderedDict()
+        self._lock = th.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key:t.Hashable) -> bool:
+        return self.get(key, _MISSING, count=False) is not _MISSING
+
+    def get(self, key:t.Hashable, default:t.Any=None, count:bool=True) -> t.Any:
+        """
+        return the cached value of the key or the `default`.
+        """
+        with self._lock:
+            entry = self._data.get(key, None)
+            if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+                del self._data[key]
+                entry = None
+
+            if entry is None:
+                if count:
+                    self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            if count:
+                self.hits += 1
+            return entry[0]
+
+    def set(self, key:t.Hashable, value:t.Any, ttl:t.Optional[float]=None) -> None:
+        """
+        store the value, `ttl` overrides the default time to live of the cache.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key:t.Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_many(self, predicate:t.Callable[[t.Hashable], bool]) -> int:
+        """
+        delete every entry whose key matches the predicate,
+        returns the number of the deleted entries.
+        """
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                del self._data[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        """
+        delete every entry, the hits and the misses keep counting
+        as they are exposed as the monotonic metrics counters.
+        """
+        with self._lock:
+            self._data.clear()
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.hits = self.misses = 0
+
+    def stats(self) -> t.Dict[str, int]:
+        """
+        return the size, hits and misses of the cache.
+        """
+        return dict(size=len(self._data), maxsize=self.maxsize, hits=self.hits, misses=self.misses)
+
+
+#: the cached rows of `QuerySet.cache`, by the tables they were read from.
+query_cache = TTLCache(maxsize=1024)
+
+_generations:t.Dict[str, int] = dict()
+#: the number of the open transactions which wrote to each table.
+_pending_tables:t.Dict[str, int] = dict()
+#: the tables written by each open transaction.
+_transaction_tables:t.Dict["BaseDBAsyncClient", t.Set[str]] = dict()
+_generations_lock = th.Lock()
+
+
+def _get_generation(tables:t.FrozenSet[str]) -> int:
+    return sum(_generations.get(table, 0) for table in tables)
+
+
+def _has_pending_writes(tables:t.FrozenSet[str]) -> bool:
+    return any(table in _pending_tables for table in tables)
+
+
+def get_transaction_client(connection_name:str) -> t.Optional["BaseDBAsyncClient"]:
+    """
+    return the client of the transaction open on the connection in
+    the current context, or `None` if there is none.
+    """
+    if connection_name not in current_transaction_map:
+        return None
+    client = current_transaction_map[connection_name].get()
+    return client if isinstance(client, BaseTransactionWrapper) else None
+
+
+def _finish_transaction(client:"BaseDBAsyncClient") -> None:
+    with _generations_lock:
+        tables = _transaction_tables.pop(client, None)
+        if tables is None:
+            return None
+        for table in tables:
+            _pending_tables[table] -= 1
+            if not _pending_tables[table]:
+                del _pending_tables[table]
+    # the other connections may have cached the rows from before the commit.
+    invalidate_tables(*tables)
+
+
+_transaction_contexts_hooked:bool = False
+
+
+def _hook_transaction_contexts() -> None:
+    """
+    finish the transactions when their context exits, also if neither
+    the commit nor the rollback ran, e.g. on a `TransactionManagementError`.
+    """
+    global _transaction_contexts_hooked
+    if _transaction_contexts_hooked:
+        return None
+
+    for context_class in (TransactionContext, TransactionContextPooled):
+        # the nested contexts don't end the transaction.
+        def hook(aexit:t.Callable[..., t.Awaitable[None]]) -> t.Callable[..., t.Awaitable[None]]:
+            async def __aexit__(self:TransactionContext, *exc_info:t.Any) -> None:
+                try:
+                    return await aexit(self, *exc_info)
+                finally:
+                    _finish_transaction(self.connection)
+            return __aexit__
+
+        context_class.__aexit__ = hook(context_class.__aexit__)
+    _transaction_contexts_hooked = True
+
+
+def _defer_invalidation(client:"BaseDBAsyncClient", tables:t.Iterable[str]) -> None:
+    """
+    invalidate the tables again once the transaction commits or
+    rolls back, and don't cache their rows until then.
+    """
+    _hook_transaction_contexts()
+    with _generations_lock:
+        written = _transaction_tables.get(client)
+        if written is None:
+            written = _transaction_tables[client] = set()
+            commit, rollback = client.commit, client.rollback
+
+            async def _commit() -> None:
+                try:
+                    await commit()
+                finally:
+                    _finish_transaction(client)
+
+            async def _rollback() -> None:
+                try:
+                    await rollback()
+                finally:
+                    _finish_transaction(client)
+
+            client.commit, client.rollback = _commit, _rollback
+
+        for table in set(tables) - written:
+            written.add(table)
+            _pending_tables[table] = _pending_tables.get(table, 0) + 1
+
+
+def invalidate_tables(*tables:str) -> int:
+    """
+    delete the cached rows read from any of the tables,
+    returns the number of the deleted entries.
+    """
+    invalidated = frozenset(tables)
+    with _generations_lock:
+        for table in invalidated:
+            _generations[table] = _generations.get(table, 0) + 1
+    return query_cache.delete_many(lambda key: not invalidated.isdisjoint(key[0]))
+
+
+def invalidate_written_tables(connection_name:str, *tables:str) -> int:
+    """
+    delete the cached rows read from the tables written on the connection.
+    A write inside a transaction invalidates them again once the
+    transaction ends, the rows aren't cached while it's open.
+    """
+    client = get_transaction_client(connection_name)
+    if client is not None:
+        _defer_invalidation(client, tables)
+    return invalidate_tables(*tables)
+
+
+def invalidate_model(model:t.Type["Model"]) -> int:
+    """
+    delete the cached rows read from the table of the model.
+    """
+    return invalidate_written_tables(model._meta.default_connection, model._meta.db_table)
+
+
+class CachingClient(object):
+    """
+    A proxy of a database client which caches the rows of
+    it's `execute_query` calls inside :data:`query_cache`.
+
+    :param client:
+        the proxied database client.
+
+    :param tables:
+        the tables read by the queries, a write to any of them
+        invalidates the cached rows.
+
+    :param ttl:
+        the number of seconds the rows stay cached. `None` never expires.
+    """
+    def __init__(
+        self, 
+        client:"BaseDBAsyncClient", 
+        tables:t.Iterable[str], 
+        ttl:t.Optional[float]=None
+        ) -> None:
+        self._client = client
+        self._tables = frozenset(tables)
+        self._ttl = ttl
+
+    def __getattr__(self, name:str) -> t.Any:
+        return getattr(self._client, name)
+
+    async def execute_query(self, query:str, values:t.Optional[list]=None) -> t.Any:
+        if _has_pending_writes(self._tables):
+            # the rows may change once the open transaction commits.
+            return await self._client.execute_query(query, values)
+
+        key = (self._tables, self._client.connection_name, query, tuple(values) if values else None)
+        result = query_cache.get(key, _MISSING)
+        if result is not _MISSING:
+            return result
+
+        generation = _get_generation(self._tables)
+        result = await self._client.execute_query(query, values)
+        # a write committed while the query ran could've made the rows stale.
+        if generation == _get_generation(self._tables) and not _has_pending_writes(self._tables):
+            query_cache.set(key, result, ttl=self._ttl)
+        return result
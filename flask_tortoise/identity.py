@@ -0,0 +1,76 @@
+"""
+provide the request scoped identity map of the model instances
+fetched by their primary key.
+
+The map lives on `flask.g` while a request is handled, so the repeated
+`get_or_404(pk=...)` lookups and the foreign key fetches of the same row
+return the already loaded instance without another query.
+"""
+
+from flask import g, has_request_context
+
+import typing as t
+
+if t.TYPE_CHECKING:
+    from .models import Model
+
+__all__ = (
+    'get_identity',
+    'set_identity',
+    'discard_identities',
+    'clear_identity_map',
+)
+
+_IDENTITY_MAP_ATTR:str = "_flask_tortoise_identity_map"
+
+IdentityKey = t.Tuple[t.Type["Model"], t.Any]
+
+
+def _get_identity_map(create:bool=False) -> t.Optional[t.Dict[IdentityKey, "Model"]]:
+    if not has_request_context():
+        return None
+
+    identity_map = g.get(_IDENTITY_MAP_ATTR, None)
+    if identity_map is None and create:
+        identity_map = dict()
+        setattr(g, _IDENTITY_MAP_ATTR, identity_map)
+    return identity_map
+
+
+def get_identity(model:t.Type["Model"], pk:t.Any) -> t.Optional["Model"]:
+    """
+    return the instance of the model loaded by the current request or `None`.
+    """
+    identity_map = _get_identity_map()
+    if identity_map is None:
+        return None
+    return identity_map.get((model, pk))
+
+
+def set_identity(instance:"Model") -> None:
+    """
+    store the instance inside the identity map of the current request.
+    """
+    identity_map = _get_identity_map(create=True)
+    if identity_map is not None and instance.pk is not None:
+        identity_map[(instance.__class__, instance.pk)] = instance
+
+
+def discard_identities(model:t.Type["Model"]) -> None:
+    """
+    forget the loaded instances of the model, e.g. after they got updated.
+    """
+    identity_map = _get_identity_map()
+    if not identity_map:
+        return None
+
+    for key in [key for key in identity_map if key[0] is model]:
+        del identity_map[key]
+
+
+def clear_identity_map() -> None:
+    """
+    forget all the instances loaded by the current request.
+    """
+    if has_request_context():
+        g.pop(_IDENTITY_MAP_ATTR, None)
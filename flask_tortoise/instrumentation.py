@@ -0,0 +1,307 @@
+"""
+record the queries issued by a request.
+
+With `TORTOISE_ORM_RECORD_QUERIES` enabled the connection clients leased
+by a request are wrapped by an :class:`InstrumentedClient`, which records
+the duration, the row count and the fingerprint of every query into the
+:class:`QueryCollector` of the request on `flask.g`.
+The queries running inside a transaction aren't recorded.
+"""
+
+from flask import g, has_request_context
+from tortoise.transactions import current_transaction_map
+
+import re as re
+import time as time
+import typing as t
+
+from .metrics import metrics
+from .nplusone import get_call_site
+
+if t.TYPE_CHECKING:
+    from flask import Response
+    from tortoise.backends.base.client import BaseDBAsyncClient
+    from .nplusone import CallSite, NPlusOneDetector
+    from .slowlog import SlowQueryLog
+
+__all__ = (
+    'QueryRecord',
+    'QueryCollector',
+    'InstrumentedClient',
+    'fingerprint',
+    'get_query_collector',
+    'start_query_collector',
+    'instrument_client',
+    'instrument_connections',
+    'add_timing_headers',
+)
+
+_COLLECTOR_ATTR:str = "_flask_tortoise_query_collector"
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w.\"`])-?\d+(?:\.\d+)?(?![\w\"`])")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_SPACES_RE = re.compile(r"\s+")
+
+
+def fingerprint(sql:str) -> str:
+    """
+    return the sql with every literal replaced by a `?`, so the
+    queries differing only by their values share a fingerprint.
+
+    :for example::
+
+        >>> fingerprint("SELECT * FROM todos WHERE id IN (1, 2) AND title='x'")
+        "SELECT * FROM todos WHERE id IN (...) AND title=?"
+    """
+    sql = _STRING_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _IN_LIST_RE.sub("(...)", sql)
+    return _SPACES_RE.sub(" ", sql).strip()
+
+
+class QueryRecord(object):
+    """
+    A single executed query.
+
+    :param sql:
+        the executed sql.
+
+    :param duration:
+        the time the query took, in seconds.
+
+    :param rows:
+        the number of the fetched or the affected rows.
+
+    :param connection_name:
+        the name of the connection the query ran on.
+
+    :param call_site:
+        the file, the line and the function of the application
+        issuing the query, only recorded by the N+1 detector.
+
+    :param values:
+        the parameters bound to the sql.
+    """
+    __slots__ = ("sql", "duration", "rows", "connection_name", "call_site", "values", "_fingerprint")
+
+    def __init__(
+        self,
+        sql:str,
+        duration:float,
+        rows:int,
+        connection_name:t.Optional[str]=None,
+        call_site:t.Optional["CallSite"]=None,
+        values:t.Optional[list]=None
+        ) -> None:
+        self.sql = sql
+        self.duration = duration
+        self.rows = rows
+        self.connection_name = connection_name
+        self.call_site = call_site
+        self.values = values
+        self._fingerprint:t.Optional[str] = None
+
+    @property
+    def fingerprint(self) -> str:
+        # computed lazily, most of the requests never look at it.
+        if self._fingerprint is None:
+            self._fingerprint = fingerprint(self.sql)
+        return self._fingerprint
+
+    def __repr__(self) -> str:
+        return f"<QueryRecord {self.duration * 1000:.2f}ms rows={self.rows} {self.sql!r}>"
+
+
+class QueryCollector(object):
+    """
+    The queries recorded for a single request.
+
+    :param detector:
+        the N+1 detector checking every recorded query.
+
+    :param slow_query_log:
+        the log of the slow queries.
+    """
+    def __init__(
+        self, 
+        detector:t.Optional["NPlusOneDetector"]=None,
+        slow_query_log:t.Optional["SlowQueryLog"]=None
+        ) -> None:
+        self.records:t.List[QueryRecord] = []
+        self.detector = detector
+        self.slow_query_log = slow_query_log
+
+    def record(self, record:QueryRecord) -> None:
+        self.records.append(record)
+        if metrics.enabled:
+            metrics.observe_query(record)
+        if self.detector is not None:
+            self.detector.check(record)
+
+    @property
+    def count(self) -> int:
+        """The number of the recorded queries."""
+        return len(self.records)
+
+    @property
+    def duration(self) -> float:
+        """The total duration of the recorded queries, in seconds."""
+        return sum(record.duration for record in self.records)
+
+    def by_fingerprint(self) -> t.Dict[str, t.List[QueryRecord]]:
+        """
+        return the recorded queries grouped by their fingerprint.
+        """
+        groups:t.Dict[str, t.List[QueryRecord]] = dict()
+        for record in self.records:
+            groups.setdefault(record.fingerprint, []).append(record)
+        return groups
+
+
+def get_query_collector() -> t.Optional[QueryCollector]:
+    """
+    return the query collector of the current request or `None`.
+    """
+    if not has_request_context():
+        return None
+    return g.get(_COLLECTOR_ATTR, None)
+
+
+def start_query_collector(
+    detector:t.Optional["NPlusOneDetector"]=None,
+    slow_query_log:t.Optional["SlowQueryLog"]=None
+    ) -> t.Optional[QueryCollector]:
+    """
+    return the query collector of the current request, creating it if needed.
+    """
+    if not has_request_context():
+        return None
+
+    collector = g.get(_COLLECTOR_ATTR, None)
+    if collector is None:
+        collector = QueryCollector(detector, slow_query_log)
+        setattr(g, _COLLECTOR_ATTR, collector)
+    return collector
+
+
+def _count_rows(result:t.Any) -> int:
+    if isinstance(result, tuple) and len(result) == 2:
+        # `execute_query` returns the row count and the rows.
+        rowcount, rows = result
+        return len(rows) if rows else max(rowcount or 0, 0)
+
+    if isinstance(result, list):
+        return len(result)
+    return 0
+
+
+class InstrumentedClient(object):
+    """
+    A proxy of a database client which records every query
+    into a :class:`QueryCollector`.
+
+    :param client:
+        the proxied database client.
+
+    :param collector:
+        the collector of the queries.
+    """
+    def __init__(self, client:"BaseDBAsyncClient", collector:QueryCollector) -> None:
+        self._client = client
+        self._collector = collector
+
+    def __getattr__(self, name:str) -> t.Any:
+        return getattr(self._client, name)
+
+    async def _run(self, method:str, query:str, *args:t.Any, rows:t.Optional[int]=None) -> t.Any:
+        call_site = get_call_site() if self._collector.detector is not None else None
+        values = args[0] if args else None
+        started_at = time.perf_counter()
+        try:
+            result = await getattr(self._client, method)(query, *args)
+        except BaseException:
+            self._collector.record(self._make_record(query, started_at, 0, call_site, values))
+            raise
+
+        record = self._make_record(query, started_at, _count_rows(result) if rows is None else rows, call_site, values)
+        slow_query_log = self._collector.slow_query_log
+        if slow_query_log is not None and slow_query_log.should_capture(record):
+            await slow_query_log.capture(self._client, record, values)
+        self._collector.record(record)
+        return result
+
+    def _make_record(
+        self,
+        query:str,
+        started_at:float,
+        rows:int,
+        call_site:t.Optional["CallSite"],
+        values:t.Optional[list]
+        ) -> QueryRecord:
+        duration = time.perf_counter() - started_at
+        return QueryRecord(query, duration, rows, self._client.connection_name, call_site, values)
+
+    async def execute_query(self, query:str, values:t.Optional[list]=None) -> t.Any:
+        return await self._run("execute_query", query, values)
+
+    async def execute_query_dict(self, query:str, values:t.Optional[list]=None) -> t.List[dict]:
+        return await self._run("execute_query_dict", query, values)
+
+    async def execute_insert(self, query:str, values:list) -> t.Any:
+        return await self._run("execute_insert", query, values, rows=1)
+
+    async def execute_many(self, query:str, values:t.List[list]) -> None:
+        return await self._run("execute_many", query, values, rows=len(values))
+
+    async def execute_script(self, query:str) -> None:
+        return await self._run("execute_script", query)
+
+
+def instrument_client(client:t.Optional["BaseDBAsyncClient"]) -> t.Optional["BaseDBAsyncClient"]:
+    """
+    return the client recording it's queries into the collector
+    of the current request, or the client itself if there is none.
+    """
+    collector = get_query_collector()
+    if client is None or collector is None or isinstance(client, InstrumentedClient):
+        return client
+    return InstrumentedClient(client, collector)
+
+
+def instrument_connections(
+    connection_names:t.Iterable[str], 
+    detector:t.Optional["NPlusOneDetector"]=None,
+    slow_query_log:t.Optional["SlowQueryLog"]=None
+    ) -> None:
+    """
+    start the query collector of the current request and wrap
+    the current clients of the connections to record their queries.
+    """
+    if start_query_collector(detector, slow_query_log) is None:
+        return None
+
+    for name in connection_names:
+        if name not in current_transaction_map:
+            continue
+
+        client = current_transaction_map[name].get()
+        if client is not None:
+            current_transaction_map[name].set(instrument_client(client))
+
+
+def add_timing_headers(response:"Response") -> "Response":
+    """
+    add the `Server-Timing` and the `X-DB-Queries` headers
+    of the queries of the current request to the response.
+    """
+    collector = get_query_collector()
+    if collector is None:
+        return response
+
+    response.headers["X-DB-Queries"] = str(collector.count)
+    response.headers.add(
+        "Server-Timing",
+        f'db;dur={collector.duration * 1000:.2f};desc="{collector.count} queries"'
+    )
+    return response
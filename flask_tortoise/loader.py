@@ -0,0 +1,140 @@
+"""
+provide the DataLoader style batching of the primary key lookups.
+
+All the `Model.load(pk)` calls issued in the same event loop iteration,
+e.g. by the coroutines of an `asyncio.gather`, are coalesced into a
+single `WHERE pk IN (...)` query. Only the calls using the same database
+client are batched together, so a lookup made inside a transaction is
+never served by a query running on another connection.
+"""
+
+from werkzeug.exceptions import NotFound
+
+from weakref import WeakKeyDictionary
+
+import asyncio as aio
+import typing as t
+
+from .identity import get_identity
+
+if t.TYPE_CHECKING:
+    from tortoise.backends.base.client import BaseDBAsyncClient
+    from .models import Model
+
+__all__ = (
+    'ModelLoader',
+    'get_loader',
+)
+
+Waiters = t.Dict[t.Any, t.List[t.Tuple[aio.Future, t.Optional[str]]]]
+
+_loaders:"WeakKeyDictionary[aio.AbstractEventLoop, t.Dict[t.Type[Model], ModelLoader]]" = WeakKeyDictionary()
+
+
+class ModelLoader(object):
+    """
+    A batching loader of the instances of a model by their primary key,
+    bound to a single event loop.
+
+    :param model:
+        the model class to load.
+
+    :param loop:
+        the event loop the lookups are coalesced in.
+
+    :param max_batch_size:
+        the maximum number of the primary keys of a single query.
+    """
+    def __init__(
+        self,
+        model:t.Type["Model"],
+        loop:aio.AbstractEventLoop,
+        max_batch_size:int=1000
+        ) -> None:
+        self.model = model
+        self.loop = loop
+        self.max_batch_size = max_batch_size
+        self._pending:t.Dict["BaseDBAsyncClient", Waiters] = dict()
+        self._scheduled:bool = False
+
+    def load(
+        self,
+        pk:t.Any,
+        description:t.Optional[str]=None,
+        using_db:t.Optional["BaseDBAsyncClient"]=None
+        ) -> aio.Future:
+        """
+        return a future of the instance with the primary key,
+        which raises `NotFound` if there is no such row.
+
+        :param using_db:
+            the database client of the lookup, defaults to the
+            client of the calling context, e.g. it's transaction.
+        """
+        future = self.loop.create_future()
+        try:
+            pk = self.model._meta.pk.to_python_value(pk)
+        except (TypeError, ValueError):
+            future.set_exception(NotFound(description=description))
+            return future
+
+        instance = get_identity(self.model, pk)
+        if instance is not None:
+            future.set_result(instance)
+            return future
+
+        # resolved in the context of the caller, the batch
+        # runs in the context of the first one.
+        db = using_db or self.model._choose_db()
+        self._pending.setdefault(db, dict()).setdefault(pk, []).append((future, description))
+        if not self._scheduled:
+            self._scheduled = True
+            # runs after every callback already scheduled for this iteration.
+            self.loop.call_soon(self._dispatch)
+        return future
+
+    def _dispatch(self) -> None:
+        pending, self._pending = self._pending, dict()
+        self._scheduled = False
+        for db, waiters in pending.items():
+            pks = list(waiters)
+            for idx in range(0, len(pks), self.max_batch_size):
+                batch = {pk: waiters[pk] for pk in pks[idx:idx + self.max_batch_size]}
+                aio.ensure_future(self._fetch(db, batch), loop=self.loop)
+
+    async def _fetch(self, db:"BaseDBAsyncClient", batch:Waiters) -> None:
+        try:
+            found = await self.model._fetch_by_pk(list(batch), using_db=db)
+        except BaseException as e:
+            for waiters in batch.values():
+                for future, _ in waiters:
+                    if not future.done():
+                        future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+            return None
+
+        for pk, waiters in batch.items():
+            instance = found.get(pk)
+            for future, description in waiters:
+                if future.done():
+                    continue
+                if instance is None:
+                    future.set_exception(NotFound(description=description))
+                else:
+                    future.set_result(instance)
+
+
+def get_loader(model:t.Type["Model"]) -> ModelLoader:
+    """
+    return the loader of the model bound to the running event loop.
+    """
+    loop = aio.get_running_loop()
+    loaders = _loaders.get(loop)
+    if loaders is None:
+        loaders = _loaders[loop] = dict()
+
+    loader = loaders.get(model)
+    if loader is None:
+        loader = loaders[model] = ModelLoader(model, loop)
+    return loader
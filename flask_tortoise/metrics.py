@@ -0,0 +1,259 @@
+"""
+collect the query and the connection pool metrics of the worker
+and expose them in the Prometheus text exposition format.
+
+The metrics are per process, every worker serves it's own ones.
+Enabled by `TORTOISE_ORM_METRICS`, which registers the
+`TORTOISE_ORM_METRICS_PATH` route on the application.
+"""
+
+from flask import Blueprint, Response, current_app
+
+import re as re
+import threading as th
+import typing as t
+
+from .cache import query_cache
+from .nplusone import _get_model_by_table
+from .singleflight import single_flight_stats
+from .templates import template_cache
+
+if t.TYPE_CHECKING:
+    from .instrumentation import QueryRecord
+
+__all__ = (
+    'PROMETHEUS_MIMETYPE',
+    'Counter',
+    'Histogram',
+    'Metrics',
+    'metrics',
+    'make_metrics_blueprint',
+)
+
+PROMETHEUS_MIMETYPE:str = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS:t.Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+Labels = t.Tuple[t.Tuple[str, str], ...]
+
+_OPERATION_RE = re.compile(r"^\s*(\w+)")
+_TABLE_RE = re.compile(r"\b(?:FROM|INTO|UPDATE)\s+[\"`]?(\w+)[\"`]?", re.IGNORECASE)
+_OPERATIONS:t.FrozenSet[str] = frozenset(("select", "insert", "update", "delete"))
+
+
+def _format_labels(labels:Labels, extra:Labels=()) -> str:
+    labels = labels + extra
+    if not labels:
+        return ""
+
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _format_value(value:float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter(object):
+    """
+    A monotonically increasing value per label set.
+    """
+    def __init__(self, name:str, documentation:str) -> None:
+        self.name = name
+        self.documentation = documentation
+        self._values:t.Dict[Labels, float] = dict()
+        self._lock = th.Lock()
+
+    def inc(self, amount:float=1, **labels:str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def expose(self) -> t.List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = list(self._values.items())
+        lines.extend(f"{self.name}{_format_labels(labels)} {_format_value(value)}" for labels, value in values)
+        return lines
+
+
+class Histogram(object):
+    """
+    The distribution of the observed values per label set, in cumulative buckets.
+    """
+    def __init__(
+        self,
+        name:str,
+        documentation:str,
+        buckets:t.Sequence[float]=DEFAULT_BUCKETS
+        ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        # the bucket counts, the sum and the count by the label set.
+        self._values:t.Dict[Labels, t.List[float]] = dict()
+        self._lock = th.Lock()
+
+    def observe(self, value:float, **labels:str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            values = self._values.get(key)
+            if values is None:
+                values = self._values[key] = [0] * (len(self.buckets) + 2)
+
+            for idx, bound in enumerate(self.buckets):
+                if value <= bound:
+                    values[idx] += 1
+                    break
+            values[-2] += value
+            values[-1] += 1
+
+    def expose(self) -> t.List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(labels, list(values)) for labels, values in self._values.items()]
+
+        for labels, values in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(labels, (('le', _format_value(bound)),))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(labels, (('le', '+Inf'),))} {values[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(values[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {values[-1]}")
+        return lines
+
+
+def _gauge(name:str, documentation:str, values:t.Iterable[t.Tuple[Labels, float]]) -> t.List[str]:
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} gauge"]
+    lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in values)
+    return lines
+
+
+class Metrics(object):
+    """
+    The metrics of the queries of the worker.
+    """
+    def __init__(self) -> None:
+        self.enabled:bool = False
+        self.queries = Counter(
+            "flask_tortoise_queries_total",
+            "The executed queries by model and operation."
+        )
+        self.query_duration = Histogram(
+            "flask_tortoise_query_duration_seconds",
+            "The duration of the executed queries by operation."
+        )
+        self.pagination_count_duration = Histogram(
+            "flask_tortoise_pagination_count_duration_seconds",
+            "The duration of the total counts of paginate by strategy."
+        )
+        self._models:t.Dict[str, str] = dict()
+
+    def _get_model_name(self, sql:str) -> str:
+        match = _TABLE_RE.search(sql)
+        if match is None:
+            return ""
+
+        table = match.group(1)
+        name = self._models.get(table)
+        if name is None:
+            model = _get_model_by_table(table)
+            name = self._models[table] = model.__name__ if model is not None else table
+        return name
+
+    def observe_query(self, record:"QueryRecord") -> None:
+        match = _OPERATION_RE.match(record.sql)
+        operation = match.group(1).lower() if match is not None else ""
+        if operation not in _OPERATIONS:
+            operation = "other"
+
+        self.queries.inc(model=self._get_model_name(record.sql), operation=operation)
+        self.query_duration.observe(record.duration, operation=operation)
+
+    def observe_pagination_count(self, duration:float, strategy:str) -> None:
+        self.pagination_count_duration.observe(duration, strategy=strategy)
+
+    def expose(self, tortoise:t.Optional[t.Any]=None) -> str:
+        """
+        return the metrics in the Prometheus text exposition format.
+
+        :param tortoise:
+            the `Tortoise` instance whose connection pools are exposed.
+        """
+        lines = self.queries.expose() + self.query_duration.expose() + self.pagination_count_duration.expose()
+
+        pools = dict(getattr(tortoise, "_pools", None) or dict())
+        for replica_set in (getattr(tortoise, "_replica_sets", None) or dict()).values():
+            pools.update(replica_set.pools)
+
+        for attr, name, documentation in (
+            ("size", "flask_tortoise_pool_size", "The open clients of the connection pool."),
+            ("in_use", "flask_tortoise_pool_in_use", "The leased clients of the connection pool."),
+            ("idle", "flask_tortoise_pool_idle", "The open but unleased clients of the connection pool."),
+            ("waiters", "flask_tortoise_pool_waiters", "The callers waiting for a free client of the connection pool."),
+        ):
+            lines.extend(_gauge(name, documentation, (
+                ((("connection", connection),), getattr(pool, attr)) for connection, pool in pools.items()
+            )))
+
+        for attr, name, documentation in (
+            ("opened_count", "flask_tortoise_pool_opened_total", "The clients opened by the connection pool."),
+            ("closed_count", "flask_tortoise_pool_closed_total", "The clients closed by the connection pool."),
+        ):
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} counter")
+            lines.extend(
+                f"{name}{_format_labels((('connection', connection),))} {getattr(pool, attr)}"
+                for connection, pool in pools.items()
+            )
+
+        cache_stats = query_cache.stats()
+        lines.extend(_gauge("flask_tortoise_query_cache_size", "The cached query results.", [((), cache_stats["size"])]))
+        for key in ("hits", "misses"):
+            name = f"flask_tortoise_query_cache_{key}_total"
+            lines.append(f"# HELP {name} The query cache {key}.")
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name} {cache_stats[key]}")
+
+        template_stats = template_cache.stats()
+        lines.extend(_gauge("flask_tortoise_sql_template_cache_size", "The cached sql templates.", [((), template_stats["size"])]))
+        for key in ("hits", "misses"):
+            name = f"flask_tortoise_sql_template_cache_{key}_total"
+            lines.append(f"# HELP {name} The sql template cache {key}.")
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name} {template_stats[key]}")
+
+        flight_stats = single_flight_stats()
+        for key in ("executed", "coalesced"):
+            name = f"flask_tortoise_single_flight_{key}_total"
+            lines.append(f"# HELP {name} The single flight queries {key}.")
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name} {flight_stats[key]}")
+
+        return "\n".join(lines) + "\n"
+
+
+#: the metrics of the worker.
+metrics = Metrics()
+
+
+def make_metrics_blueprint(path:str="/metrics") -> Blueprint:
+    """
+    return the blueprint serving the metrics at the path.
+    """
+    blueprint = Blueprint("flask_tortoise_metrics", __name__)
+
+    @blueprint.get(path)
+    def expose_metrics() -> Response:
+        tortoise = current_app.extensions.get("tortoise")
+        return Response(metrics.expose(tortoise), content_type=PROMETHEUS_MIMETYPE)
+
+    return blueprint
@@ -3,18 +3,33 @@ from tortoise.models import (
     MetaInfo as OldMetaInfo, 
     )
 from tortoise.manager import Manager as OldManager
+from tortoise.fields.relational import (
+    ManyToManyFieldInstance, 
+    ManyToManyRelation as OldManyToManyRelation,
+    )
 from tortoise.queryset import Q
 from tortoise.manager import Manager
+from werkzeug.exceptions import NotFound
+
+from functools import partial
 
-from .queryset import QuerySet
+from .cache import invalidate_written_tables
+from .identity import get_identity, set_identity
+from .loader import get_loader
+from .queryset import QuerySet, _on_model_write
+from .templates import get_pk_template
 
 import typing as t
 
 if t.TYPE_CHECKING:
+    from tortoise.backends.base.client import BaseDBAsyncClient
     from tortoise.queryset import QuerySetSingle
-    from .queryset import Pagination
+    from .queryset import CursorPagination, Pagination
     MODEL = t.TypeVar("MODEL", bound="Model")
 
+#: the maximum number of the primary keys selected by a single query of `get_many_by_pk`.
+PK_BATCH_SIZE:int = 512
+
 
 class Manager(OldManager):
     def get_queryset(self) -> t.Type["QuerySet"]:
@@ -24,6 +39,45 @@ class Manager(OldManager):
         return "flask-tortoise-manager"
 
 
+class ManyToManyRelation(OldManyToManyRelation):
+    """
+    the many to many relation manager invalidating
+    the cached rows read from the through table.
+    """
+    async def add(self, *instances:"MODEL", using_db:t.Optional["BaseDBAsyncClient"]=None) -> None:
+        await super(ManyToManyRelation, self).add(*instances, using_db=using_db)
+        self._on_through_write()
+
+    async def remove(self, *instances:"MODEL", using_db:t.Optional["BaseDBAsyncClient"]=None) -> None:
+        await super(ManyToManyRelation, self).remove(*instances, using_db=using_db)
+        self._on_through_write()
+
+    async def clear(self, using_db:t.Optional["BaseDBAsyncClient"]=None) -> None:
+        await super(ManyToManyRelation, self).clear(using_db=using_db)
+        self._on_through_write()
+
+    def _on_through_write(self) -> None:
+        invalidate_written_tables(self.remote_model._meta.default_connection, self.field.through)
+
+
+def _m2m_getter(self:"Model", _key:str, field_object:ManyToManyFieldInstance) -> ManyToManyRelation:
+    value = getattr(self, _key, None)
+    if value is None:
+        value = ManyToManyRelation(self, field_object)
+        setattr(self, _key, value)
+    return value
+
+
+def install_m2m_relations(model:t.Type[OldModel]) -> None:
+    """
+    replace the many to many relation managers the tortoise
+    orm created for the model with the invalidating ones.
+    """
+    for key in model._meta.m2m_fields:
+        field_object = model._meta.fields_map[key]
+        setattr(model, key, property(partial(_m2m_getter, _key=f"_{key}", field_object=field_object)))
+
+
 class MetaInfo(OldMetaInfo):
     def __init__(self, meta:"Model.Meta"):
         super(MetaInfo, self).__init__(meta)
@@ -36,6 +90,24 @@ class Model(OldModel):
     """
     _meta = MetaInfo(None)  # required for type checking      
 
+    async def save(self, *args:t.Any, **kwargs:t.Any) -> None:
+        await super(Model, self).save(*args, **kwargs)
+        _on_model_write(self.__class__)
+
+    async def delete(self, using_db:t.Optional["BaseDBAsyncClient"]=None) -> None:
+        await super(Model, self).delete(using_db)
+        _on_model_write(self.__class__)
+
+    @classmethod
+    async def bulk_create(
+        cls: t.Type["MODEL"], 
+        objects: t.Iterable["MODEL"], 
+        batch_size: t.Optional[int]=None, 
+        using_db: t.Optional["BaseDBAsyncClient"]=None
+        ) -> None:
+        await super(Model, cls).bulk_create(objects, batch_size, using_db)
+        _on_model_write(cls)
+
     @classmethod
     def get_or_404(
         cls: t.Type["MODEL"], 
@@ -54,7 +126,7 @@ class Model(OldModel):
         :param description: Error description for the `werkzeug's NotFound` error.
         :param kwargs: Simple filter constraints.
         """
-        return cls._meta.manager.get_queryset().get_or_404(*args, description, **kwargs)
+        return cls._meta.manager.get_queryset().get_or_404(*args, description=description, **kwargs)
 
     @classmethod
     def first_or_404(
@@ -74,22 +146,193 @@ class Model(OldModel):
         :param description: Error description for the `werkzeug's NotFound` error.
         :param kwargs: Simple filter constraints.
         """
-        return cls._meta.manager.get_queryset().first_or_404(*args, description, **kwargs)
+        return cls._meta.manager.get_queryset().first_or_404(*args, description=description, **kwargs)
+
+    @classmethod
+    async def _fetch_by_pk(
+        cls: t.Type["MODEL"],
+        pks: t.Iterable[t.Any],
+        using_db: t.Optional["BaseDBAsyncClient"]=None
+        ) -> t.Dict[t.Any, "MODEL"]:
+        """
+        return the instances of the primary keys by their primary key,
+        from the identity map of the request or the compiled primary key select.
+        """
+        meta = cls._meta
+        found:t.Dict[t.Any, "MODEL"] = dict()
+        missing:t.Dict[t.Any, None] = dict()
+        for value in pks:
+            try:
+                pk = meta.pk.to_python_value(value)
+            except (TypeError, ValueError):
+                continue
+            if pk is None or pk in found:
+                continue
+
+            instance = get_identity(cls, pk)
+            if instance is not None:
+                found[pk] = instance
+            else:
+                missing[pk] = None
+
+        if not missing:
+            return found
+
+        db = using_db or cls._choose_db()
+        missing_pks = list(missing)
+        for idx in range(0, len(missing_pks), PK_BATCH_SIZE):
+            batch = missing_pks[idx:idx + PK_BATCH_SIZE]
+            # the sizes are rounded up to a power of two to share the compiled selects.
+            count = None if len(batch) == 1 else 1 << (len(batch) - 1).bit_length()
+            template = get_pk_template(cls, db.capabilities.dialect, count)
+            if template is None:
+                instances = await cls.filter(pk__in=batch).using_db(db)
+            else:
+                values = [db.executor_class._field_to_db(meta.pk, pk, cls) for pk in batch]
+                values.extend(values[-1:] * ((count or 1) - len(values)))
+                _, rows = await db.execute_query(template.sql, template.bind(values))
+                instances = [cls._init_from_db(**row) for row in rows]
+
+            for instance in instances:
+                set_identity(instance)
+                found[instance.pk] = instance
+        return found
 
     @classmethod
-    def paginate(
+    async def get_by_pk(
+        cls: t.Type["MODEL"],
+        pk: t.Any,
+        using_db: t.Optional["BaseDBAsyncClient"]=None
+        ) -> t.Optional["MODEL"]:
+        """
+        Fetches a single record by it's primary key or `None`. The select is compiled
+        once per model and skips the queryset and the `LIMIT 2` multiplicity check
+        of `get`, the primary key is unique.
+
+        for example::
+
+            user:t.Optional["User"] = await User.get_by_pk(user_id)
+
+        :param pk: the primary key value.
+        :param using_db: the database client to fetch the record with.
+        """
+        return next(iter((await cls._fetch_by_pk((pk,), using_db)).values()), None)
+
+    @classmethod
+    async def get_by_pk_or_404(
+        cls: t.Type["MODEL"],
+        pk: t.Any,
+        description: t.Optional[str]=None,
+        using_db: t.Optional["BaseDBAsyncClient"]=None
+        ) -> "MODEL":
+        """
+        Like :meth:`get_by_pk` but aborts with 404 if not found instead of returning ``None``.
+
+        for example::
+
+            user:"User" = await User.get_by_pk_or_404(user_id, description="user not found.")
+
+        :param pk: the primary key value.
+        :param description: Error description for the `werkzeug's NotFound` error.
+        :param using_db: the database client to fetch the record with.
+        """
+        instance = await cls.get_by_pk(pk, using_db)
+        if instance is None:
+            raise NotFound(description=description)
+        return instance
+
+    @classmethod
+    async def get_many_by_pk(
+        cls: t.Type["MODEL"],
+        pks: t.Iterable[t.Any],
+        using_db: t.Optional["BaseDBAsyncClient"]=None
+        ) -> t.List["MODEL"]:
+        """
+        Fetches the records of the primary keys in their order, the missing
+        ones are skipped. Uses a compiled `WHERE pk IN (...)` select per
+        batch of `PK_BATCH_SIZE` keys.
+
+        for example::
+
+            users:t.List["User"] = await User.get_many_by_pk([3, 1, 2])
+
+        :param pks: the primary key values.
+        :param using_db: the database client to fetch the records with.
+        """
+        pks = list(pks)
+        found = await cls._fetch_by_pk(pks, using_db)
+        instances:t.Dict[t.Any, "MODEL"] = dict()
+        for value in pks:
+            try:
+                pk = cls._meta.pk.to_python_value(value)
+            except (TypeError, ValueError):
+                continue
+            if pk in found:
+                instances.setdefault(pk, found[pk])
+        return list(instances.values())
+
+    @classmethod
+    async def load(
+        cls: t.Type["MODEL"], 
+        pk: t.Any, 
+        description: t.Optional[str]=None,
+        using_db: t.Optional["BaseDBAsyncClient"]=None
+        ) -> "MODEL":
+        """
+        Fetches a single record by it's primary key or 404 error. All the lookups
+        issued concurrently on the same database client, e.g. with `asyncio.gather`,
+        are batched into a single `WHERE pk IN (...)` query.
+
+        for example::
+
+            users = await asyncio.gather(*(User.load(pk) for pk in user_ids))
+
+        :param pk: the primary key value.
+        :param description: Error description for the `werkzeug's NotFound` error.
+        :param using_db: the database client, defaults to the one of the current context.
+        """
+        return await get_loader(cls).load(pk, description, using_db)
+
+    @classmethod
+    async def paginate(
         cls: "MODEL", 
         page:t.Optional[int]=None, 
         per_page:t.Optional[int]=None, 
         error_out:bool=True, 
         max_per_page:t.Optional[int]=None, 
-        count:bool=True
+        count:bool=True,
+        total:t.Optional[str]=None,
+        total_ttl:t.Optional[float]=None,
+        fields:t.Optional[t.Iterable[str]]=None,
         ) -> "Pagination":
 
-        return cls._meta.manager.get_queryset().paginate(
+        return await cls._meta.manager.get_queryset().paginate(
             page=page, 
             per_page=per_page, 
             error_out=error_out, 
             max_per_page=max_per_page, 
-            count=count
-            )
\ No newline at end of file
+            count=count,
+            total=total,
+            total_ttl=total_ttl,
+            fields=fields
+            )
+
+    @classmethod
+    async def paginate_cursor(
+        cls: "MODEL",
+        after:t.Optional[str]=None,
+        before:t.Optional[str]=None,
+        per_page:t.Optional[int]=None,
+        order_by:t.Optional[t.Union[str, t.Iterable[str]]]=None,
+        error_out:bool=True,
+        max_per_page:t.Optional[int]=None,
+        ) -> "CursorPagination":
+
+        return await cls._meta.manager.get_queryset().paginate_cursor(
+            after=after,
+            before=before,
+            per_page=per_page,
+            order_by=order_by,
+            error_out=error_out,
+            max_per_page=max_per_page
+            )
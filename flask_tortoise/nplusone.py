@@ -0,0 +1,159 @@
+"""
+detect the N+1 queries of a request.
+
+A query is flagged when it's fingerprint runs more than `threshold` times
+with differing parameters from the same line of the application, e.g. a
+foreign key fetched lazily inside a loop. Depending on the mode it logs a
+warning with the stack or raises an :class:`NPlusOneError`, both naming
+the `prefetch_related`/`select_related` call that would batch the queries.
+"""
+
+from tortoise import Tortoise as Tortoiser
+from tortoise.log import logger
+
+import re as re
+import sys as sys
+import traceback as traceback
+import typing as t
+
+if t.TYPE_CHECKING:
+    from tortoise.models import Model
+    from .instrumentation import QueryRecord
+
+__all__ = (
+    'N_PLUS_ONE_MODES',
+    'NPlusOneError',
+    'NPlusOneDetector',
+    'get_call_site',
+    'suggest_fix',
+)
+
+N_PLUS_ONE_MODES:t.Tuple[str, ...] = ("warn", "raise")
+
+CallSite = t.Tuple[str, int, str]
+
+#: the modules whose frames are never the call site of a query.
+_LIBRARY_MODULES:t.Tuple[str, ...] = (
+    "flask_tortoise.", "tortoise.", "pypika.", "asyncio.", "asgiref.",
+    "contextlib", "aiosqlite.", "asyncpg.", "aiomysql.", "concurrent.", "threading",
+)
+
+_SELECT_RE = re.compile(r"^\s*SELECT\b", re.IGNORECASE)
+_TABLE_RE = re.compile(r"\bFROM\s+[\"`]?(\w+)[\"`]?", re.IGNORECASE)
+_FILTER_RE = re.compile(
+    r"\bWHERE\s+(?:[\"`]?\w+[\"`]?\.)?[\"`]?(\w+)[\"`]?\s*(?:=|\bIN\b)", re.IGNORECASE
+    )
+
+
+class NPlusOneError(Exception):
+    """The same query ran too many times from a single call site."""
+
+
+def get_call_site() -> t.Optional[CallSite]:
+    """
+    return the file, the line and the function of the
+    innermost application frame running the current query.
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if not (module + ".").startswith(_LIBRARY_MODULES):
+            code = frame.f_code
+            return (code.co_filename, frame.f_lineno, code.co_name)
+        frame = frame.f_back
+    return None
+
+
+def _get_model_by_table(table:str) -> t.Optional[t.Type["Model"]]:
+    for models in Tortoiser.apps.values():
+        for model in models.values():
+            if model._meta.db_table == table:
+                return model
+    return None
+
+
+def suggest_fix(sql:str) -> t.Optional[str]:
+    """
+    return the `prefetch_related`/`select_related` call fetching
+    the rows of the repeated query together with their parents.
+    """
+    table, column = _TABLE_RE.search(sql), _FILTER_RE.search(sql)
+    if table is None or column is None:
+        return None
+
+    model = _get_model_by_table(table.group(1))
+    if model is None:
+        return None
+
+    column = column.group(1)
+    if column == model._meta.db_pk_column:
+        # a foreign key fetched for every row of another model.
+        for models in Tortoiser.apps.values():
+            for parent in models.values():
+                for name in sorted(parent._meta.fk_fields | parent._meta.o2o_fields):
+                    if parent._meta.fields_map[name].related_model is model:
+                        return f'{parent.__name__}.all().select_related("{name}")'
+        return None
+
+    # a reverse relation fetched for every row of the related model.
+    for name in sorted(model._meta.fk_fields | model._meta.o2o_fields):
+        field = model._meta.fields_map[name]
+        if field.source_field == column and field.related_name:
+            return f'{field.related_model.__name__}.all().prefetch_related("{field.related_name}")'
+    return None
+
+
+class NPlusOneDetector(object):
+    """
+    The N+1 query detector of a single request.
+
+    :param mode:
+        `warn` to log a warning with the stack, `raise` to raise an `NPlusOneError`.
+
+    :param threshold:
+        the number of the runs of a query from a call site allowed before it's flagged.
+    """
+    def __init__(self, mode:str="warn", threshold:int=5) -> None:
+        if mode not in N_PLUS_ONE_MODES:
+            raise ValueError(f"The N+1 detector mode must be one of {list(N_PLUS_ONE_MODES)}. Got: {mode}")
+
+        self.mode = mode
+        self.threshold = threshold
+        self._seen:t.Dict[t.Tuple[str, CallSite], t.Set[str]] = dict()
+        self._counts:t.Dict[t.Tuple[str, CallSite], int] = dict()
+        self._flagged:t.Set[t.Tuple[str, CallSite]] = set()
+
+    def check(self, record:"QueryRecord") -> None:
+        """
+        count the query and flag it once it ran too many times
+        with differing parameters from the same call site.
+        """
+        if record.call_site is None or not _SELECT_RE.match(record.sql):
+            # the writes in a loop are batched by `bulk_create`, not the relations.
+            return None
+
+        key = (record.fingerprint, record.call_site)
+        self._counts[key] = count = self._counts.get(key, 0) + 1
+        statements = self._seen.setdefault(key, set())
+        if len(statements) <= self.threshold:
+            # the templated queries differ only by their bound values.
+            statements.add(record.sql if not record.values else f"{record.sql} {record.values!r}")
+
+        if count <= self.threshold or len(statements) < 2 or key in self._flagged:
+            return None
+
+        self._flagged.add(key)
+        self.report(record, count)
+
+    def report(self, record:"QueryRecord", count:int) -> None:
+        filename, lineno, function = record.call_site
+        message = f"N+1 queries: `{record.fingerprint}` ran {count} times from {filename}:{lineno} in {function}."
+        fix = suggest_fix(record.sql)
+        if fix is not None:
+            message += f" Fetch the rows together, e.g. with `{fix}`."
+
+        if self.mode == "raise":
+            raise NPlusOneError(message)
+
+        stack = "".join(traceback.format_stack(limit=20))
+        logger.warning("%s\n%s", message, stack)
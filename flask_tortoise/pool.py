@@ -0,0 +1,688 @@
+"""
+provide the connection pool of the flask_tortoise.Tortoise class.
+
+The pool is shared by every thread and every event loop
+of a worker process, because flask runs each async view and
+hook inside its own short-lived event loop. Only the clients of
+:data:`SHARED_ENGINES` work from any event loop: the sqlite driver
+runs every connection inside it's own thread, while the asyncpg and
+aiomysql connections are bound to the event loop which opened them.
+So the `persistent` mode, keeping the clients open across the requests,
+is limited to these engines, and the `request` mode opens and closes
+the client of a request around it, like a plain `Tortoise.init` does.
+
+The `asyncio.Lock` of a sqlite client is bound to the first event loop
+it's contended in, so the pooled clients get a :class:`LoopLock` instead.
+The clients of the other engines connect on their first query, inside
+the event loop of the view rather than the one of the `before_request` hook.
+"""
+
+from tortoise import Tortoise
+from tortoise.backends.base.config_generator import expand_db_url
+from tortoise.transactions import current_transaction_map
+
+from collections import deque
+from concurrent import futures as cf
+from contextvars import ContextVar
+
+import asyncio as aio
+import threading as th
+import time as time
+import typing as t
+
+if t.TYPE_CHECKING:
+    from tortoise.backends.base.client import BaseDBAsyncClient
+
+__all__ = (
+    'SHARED_ENGINES',
+    'STATEMENT_CACHE_PARAMS',
+    'LoopLock',
+    'ConnectionPool',
+    'lease_connections',
+    'release_connections',
+    'get_leased_client',
+    'acquire_spare_client',
+    'release_spare_client',
+)
+
+#: the engines whose clients can be used from any event loop.
+SHARED_ENGINES:t.Tuple[str, ...] = ("tortoise.backends.sqlite",)
+
+#: the connection param setting the size of the prepared statement cache
+#: of the driver by the engine. The tortoise sqlite client doesn't pass
+#: `cached_statements` to the sqlite3 module, which keeps 128 statements,
+#: and aiomysql doesn't prepare the statements.
+STATEMENT_CACHE_PARAMS:t.Dict[str, str] = {"tortoise.backends.asyncpg": "statement_cache_size"}
+
+#: the clients leased by the current request (or task), by connection name.
+current_leases:ContextVar[t.Optional[t.Dict[str, "BaseDBAsyncClient"]]] = ContextVar(
+    "flask_tortoise_current_leases", default=None
+    )
+#: the pools the current request (or task) leased it's clients from.
+current_pools:ContextVar[t.Optional[t.Dict[str, "ConnectionPool"]]] = ContextVar(
+    "flask_tortoise_current_pools", default=None
+    )
+_previous_connections:ContextVar[t.Optional[t.Dict[str, "BaseDBAsyncClient"]]] = ContextVar(
+    "flask_tortoise_previous_connections", default=None
+    )
+
+
+class LoopLock(object):
+    """
+    A lock of the coroutines running inside any event loop and thread.
+    The lock is handed over to the first waiter on release, like the
+    clients of the :class:`ConnectionPool` are.
+
+    :for example::
+
+        lock = LoopLock()
+        async with lock:
+            ...
+    """
+    def __init__(self) -> None:
+        self._lock = th.Lock()
+        self._locked:bool = False
+        self._waiters:t.Deque[t.Tuple[aio.AbstractEventLoop, aio.Future]] = deque()
+
+    def locked(self) -> bool:
+        return self._locked
+
+    async def acquire(self) -> bool:
+        with self._lock:
+            if not self._locked:
+                self._locked = True
+                return True
+
+            loop = aio.get_running_loop()
+            waiter = loop.create_future()
+            self._waiters.append((loop, waiter))
+
+        try:
+            await waiter
+        except BaseException:
+            with self._lock:
+                queued = (loop, waiter) in self._waiters
+                if queued:
+                    self._waiters.remove((loop, waiter))
+
+            if not queued and waiter.done() and not waiter.cancelled():
+                # the lock got handed over before the cancellation.
+                self.release()
+            raise
+
+        return True
+
+    def release(self) -> None:
+        with self._lock:
+            if not self._locked:
+                raise RuntimeError("The lock is not acquired.")
+
+            while self._waiters:
+                loop, waiter = self._waiters.popleft()
+                try:
+                    loop.call_soon_threadsafe(self._hand_over, waiter)
+                except RuntimeError:
+                    # the event loop of the waiter is already closed.
+                    continue
+                return None
+
+            self._locked = False
+
+    def _hand_over(self, waiter:aio.Future) -> None:
+        if not waiter.done():
+            waiter.set_result(True)
+        else:
+            # the waiter got cancelled in the meantime.
+            self.release()
+
+    async def __aenter__(self) -> None:
+        await self.acquire()
+
+    async def __aexit__(self, *exc_info:t.Any) -> None:
+        self.release()
+
+
+class _LazyTransactionContext(object):
+    """
+    the transaction context of a :class:`LazyConnectionMixin` client,
+    connecting it before the transaction starts.
+    """
+    __slots__ = ("client", "context")
+
+    def __init__(self, client:"LazyConnectionMixin") -> None:
+        self.client = client
+        self.context:t.Any = None
+
+    async def __aenter__(self) -> "BaseDBAsyncClient":
+        await self.client._ensure_connection()
+        self.context = super(LazyConnectionMixin, self.client)._in_transaction()
+        return await self.context.__aenter__()
+
+    async def __aexit__(self, *exc_info:t.Any) -> t.Any:
+        return await self.context.__aexit__(*exc_info)
+
+
+class LazyConnectionMixin(object):
+    """
+    connect a database client on it's first query, so it's
+    bound to the event loop of the view which runs the query.
+    """
+    _connecting:t.Optional[aio.Future] = None
+
+    async def _ensure_connection(self) -> None:
+        connecting = self._connecting
+        if connecting is None:
+            connecting = self._connecting = aio.ensure_future(
+                super(LazyConnectionMixin, self).create_connection(with_db=True)
+                )
+
+        try:
+            await aio.shield(connecting)
+        except BaseException:
+            if connecting.done() and self._connecting is connecting:
+                # the next query tries to connect again.
+                self._connecting = None
+            raise
+
+    async def create_connection(self, with_db:bool) -> None:
+        if not with_db:
+            return await super(LazyConnectionMixin, self).create_connection(with_db)
+        await self._ensure_connection()
+
+    def _in_transaction(self) -> _LazyTransactionContext:
+        return _LazyTransactionContext(self)
+
+    async def execute_query(self, query:str, values:t.Optional[list]=None) -> t.Any:
+        await self._ensure_connection()
+        return await super(LazyConnectionMixin, self).execute_query(query, values)
+
+    async def execute_query_dict(self, query:str, values:t.Optional[list]=None) -> t.List[dict]:
+        await self._ensure_connection()
+        return await super(LazyConnectionMixin, self).execute_query_dict(query, values)
+
+    async def execute_insert(self, query:str, values:list) -> t.Any:
+        await self._ensure_connection()
+        return await super(LazyConnectionMixin, self).execute_insert(query, values)
+
+    async def execute_many(self, query:str, values:t.List[list]) -> None:
+        await self._ensure_connection()
+        return await super(LazyConnectionMixin, self).execute_many(query, values)
+
+    async def execute_script(self, query:str) -> None:
+        await self._ensure_connection()
+        return await super(LazyConnectionMixin, self).execute_script(query)
+
+    async def close(self) -> None:
+        connecting, self._connecting = self._connecting, None
+        if connecting is not None:
+            await super(LazyConnectionMixin, self).close()
+
+
+_lazy_client_classes:t.Dict[type, type] = dict()
+
+
+def get_lazy_client_class(client_class:t.Type["BaseDBAsyncClient"]) -> t.Type["BaseDBAsyncClient"]:
+    """
+    return the client class connecting on it's first query.
+    """
+    lazy_class = _lazy_client_classes.get(client_class)
+    if lazy_class is None:
+        lazy_class = _lazy_client_classes[client_class] = type(
+            f"Lazy{client_class.__name__}", (LazyConnectionMixin, client_class), dict()
+            )
+    return lazy_class
+
+
+class ConnectionPool(object):
+    """
+    A bounded pool of the tortoise orm database clients
+    for a single connection name.
+
+    :param connection_name:
+        the name of the connection inside the tortoise orm config.
+
+    :param db_info:
+        the connection info, either a database url or
+        the expanded connection dictionary.
+
+    :param min_size:
+        the number of clients kept open even if they are idle.
+
+    :param max_size:
+        the maximum number of clients opened at the same time.
+        `None` doesn't limit them.
+
+    :param idle_timeout:
+        the number of seconds after which an idle client
+        above `min_size` gets closed.
+
+    :param acquire_timeout:
+        the number of seconds to wait for a free client
+        before raising `asyncio.TimeoutError`. `None` waits forever.
+
+    :param statement_cache_size:
+        the number of the prepared statements the driver keeps per client,
+        if the driver of the engine takes it, see :data:`STATEMENT_CACHE_PARAMS`.
+        `None` keeps the default of the driver.
+
+    :for example::
+
+        pool = ConnectionPool("default", "sqlite://db.sqlite3", max_size=5)
+        await pool.open()
+        client = await pool.acquire()
+        try:
+            await client.execute_query("SELECT 1")
+        finally:
+            await pool.release(client)
+    """
+    def __init__(
+        self,
+        connection_name:str,
+        db_info:t.Union[str, t.Dict[str, t.Any]],
+        min_size:int = 1,
+        max_size:t.Optional[int] = 10,
+        idle_timeout:t.Optional[float] = 300.0,
+        acquire_timeout:t.Optional[float] = None,
+        statement_cache_size:t.Optional[int] = None,
+        ) -> None:
+
+        if isinstance(db_info, str):
+            db_info = expand_db_url(db_info)
+
+        if max_size is not None and max_size < 1:
+            raise ValueError("`max_size` of the connection pool must be at least 1.")
+
+        if min_size < 0 or (max_size is not None and min_size > max_size):
+            raise ValueError("`min_size` of the connection pool must be between 0 and `max_size`.")
+
+        self.connection_name = connection_name
+        self.engine:str = db_info.get("engine")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+
+        self._client_class = Tortoise._discover_client_class(db_info.get("engine"))
+        self._credentials:t.Dict[str, t.Any] = db_info["credentials"].copy()
+        self._credentials.update({"connection_name": connection_name})
+        statement_cache_param = STATEMENT_CACHE_PARAMS.get(self.engine)
+        if statement_cache_size is not None and statement_cache_param is not None:
+            # a param of the database url takes precedence.
+            self._credentials.setdefault(statement_cache_param, statement_cache_size)
+        if not self.shared_across_loops:
+            self._client_class = get_lazy_client_class(self._client_class)
+
+        # every client of an in-memory sqlite database would
+        # be a separate database, so a single client is shared instead.
+        self._shared:bool = self._credentials.get("file_path") == ":memory:"
+        if self._shared:
+            self.min_size = self.max_size = 1
+
+        self._lock = th.Lock()
+        self._idle:t.Deque[t.Tuple["BaseDBAsyncClient", float]] = deque()
+        self._waiters:t.Deque[t.Tuple[aio.AbstractEventLoop, aio.Future]] = deque()
+        self._size:int = 0
+        self._in_use:int = 0
+        self._closed:bool = False
+        self._shared_future:t.Optional[cf.Future] = None
+        #: the number of the clients opened and closed since the pool got created.
+        self.opened_count:int = 0
+        self.closed_count:int = 0
+
+    @property
+    def shared_across_loops(self) -> bool:
+        """True if the clients can be used from any event loop."""
+        return self.engine in SHARED_ENGINES
+
+    @property
+    def size(self) -> int:
+        """The number of the open clients."""
+        return self._size
+
+    @property
+    def in_use(self) -> int:
+        """The number of the currently leased clients."""
+        return self._in_use
+
+    @property
+    def idle(self) -> int:
+        """The number of the open but unleased clients."""
+        return len(self._idle)
+
+    @property
+    def waiters(self) -> int:
+        """The number of the callers waiting for a free client."""
+        return len(self._waiters)
+
+    def _share_client(self, client:"BaseDBAsyncClient") -> "BaseDBAsyncClient":
+        """
+        make the lock of a client of :data:`SHARED_ENGINES` work from every event loop.
+        """
+        if self.shared_across_loops and isinstance(getattr(client, "_lock", None), aio.Lock):
+            client._lock = LoopLock()
+        return client
+
+    async def _open_client(self) -> "BaseDBAsyncClient":
+        client = self._share_client(self._client_class(**self._credentials))
+        if self.shared_across_loops:
+            # the other clients connect inside the event loop of their first query.
+            await client.create_connection(with_db=True)
+        self.opened_count += 1
+        return client
+
+    async def _close_clients(self, clients:t.Iterable["BaseDBAsyncClient"]) -> None:
+        clients = list(clients)
+        await aio.gather(*(client.close() for client in clients))
+        self.closed_count += len(clients)
+
+    def _pop_expired(self) -> t.List["BaseDBAsyncClient"]:
+        """
+        remove the clients idle for longer than `idle_timeout`.
+        must be called with the lock held.
+        """
+        expired:t.List["BaseDBAsyncClient"] = []
+        if self.idle_timeout is None:
+            return expired
+
+        deadline = time.monotonic() - self.idle_timeout
+        # the oldest released clients are at the left side.
+        while self._idle and self._size > self.min_size and self._idle[0][1] <= deadline:
+            client, _ = self._idle.popleft()
+            self._size -= 1
+            expired.append(client)
+
+        return expired
+
+    async def open(self, shared_client:t.Optional["BaseDBAsyncClient"]=None) -> None:
+        """
+        open the `min_size` clients of the pool.
+
+        :param shared_client:
+            an already opened client to share for an in-memory 
+            sqlite database, e.g. the one created by `Tortoise.init`.
+        """
+        if self._shared:
+            self._closed = False
+            if shared_client is not None and self._shared_future is None:
+                self._shared_future = cf.Future()
+                self._shared_future.set_result(self._share_client(shared_client))
+                self._size = 1
+                return None
+
+            return await self.release(await self._acquire_shared())
+
+        with self._lock:
+            self._closed = False
+            missing = self.min_size - self._size
+            self._size += missing
+
+        try:
+            clients = await aio.gather(*(self._open_client() for _ in range(missing)))
+        except Exception:
+            with self._lock:
+                self._size -= missing
+            raise
+
+        released_at = time.monotonic()
+        with self._lock:
+            self._idle.extend((client, released_at) for client in clients)
+
+    async def _acquire_shared(self) -> "BaseDBAsyncClient":
+        with self._lock:
+            future = self._shared_future
+            opener = future is None
+            if opener:
+                future = self._shared_future = cf.Future()
+                self._size = 1
+            self._in_use += 1
+
+        if opener:
+            try:
+                future.set_result(await self._open_client())
+            except BaseException as e:
+                with self._lock:
+                    self._shared_future = None
+                    self._size = 0
+                future.set_exception(e)
+
+        try:
+            return await aio.wrap_future(future)
+        except BaseException:
+            with self._lock:
+                self._in_use -= 1
+            raise
+
+    async def acquire(self, wait:bool=True) -> t.Optional["BaseDBAsyncClient"]:
+        """
+        lease a client from the pool, opening a new one
+        if all of the open clients are in use and the pool is not full.
+
+        :param wait:
+            wait for a released client if the pool is exhausted,
+            else return `None` immediately.
+        """
+        if self._closed:
+            raise RuntimeError(f"The connection pool `{self.connection_name}` is closed.")
+
+        if self._shared:
+            return await self._acquire_shared()
+
+        with self._lock:
+            expired = self._pop_expired()
+            client = None
+            waiter = None
+
+            if self._idle:
+                client, _ = self._idle.pop()
+                self._in_use += 1
+
+            elif self.max_size is None or self._size < self.max_size:
+                self._size += 1
+                self._in_use += 1
+
+            elif wait:
+                loop = aio.get_running_loop()
+                waiter = loop.create_future()
+                self._waiters.append((loop, waiter))
+
+            else:
+                return None
+
+        if expired:
+            await self._close_clients(expired)
+
+        if client is not None:
+            return client
+
+        if waiter is None:
+            try:
+                return await self._open_client()
+            except BaseException:
+                with self._lock:
+                    self._size -= 1
+                    self._in_use -= 1
+                raise
+
+        try:
+            return await aio.wait_for(waiter, self.acquire_timeout)
+        except aio.TimeoutError:
+            raise aio.TimeoutError(
+                f"Timed out waiting for a free client of the connection pool `{self.connection_name}`."
+                )
+        finally:
+            with self._lock:
+                if (loop, waiter) in self._waiters:
+                    self._waiters.remove((loop, waiter))
+
+    def acquire_idle(self) -> t.Optional["BaseDBAsyncClient"]:
+        """
+        lease an open idle client of the pool, without
+        opening a new one or waiting. Returns `None` if there is none.
+        """
+        if self._closed or self._shared:
+            return None
+
+        with self._lock:
+            if not self._idle:
+                return None
+            # the most recently released client is the least likely to expire.
+            client, _ = self._idle.pop()
+            self._in_use += 1
+            return client
+
+    def _put_back(self, client:"BaseDBAsyncClient") -> t.List["BaseDBAsyncClient"]:
+        """
+        hand the client over to the first waiting caller or
+        store it as idle. Returns the clients which need to be closed.
+        must be called with the lock held.
+        """
+        while self._waiters:
+            loop, waiter = self._waiters.popleft()
+            if waiter.cancelled():
+                continue
+            try:
+                loop.call_soon_threadsafe(self._hand_over, waiter, client)
+            except RuntimeError:
+                # the event loop of the waiter is already closed.
+                continue
+            return []
+
+        self._in_use -= 1
+        if self._closed:
+            self._size -= 1
+            return [client]
+
+        self._idle.append((client, time.monotonic()))
+        return self._pop_expired()
+
+    def _hand_over(self, waiter:aio.Future, client:"BaseDBAsyncClient") -> None:
+        if not waiter.done():
+            waiter.set_result(client)
+            return None
+
+        # the waiter timed out or got cancelled in the meantime.
+        with self._lock:
+            expired = self._put_back(client)
+
+        if expired:
+            aio.ensure_future(self._close_clients(expired))
+
+    async def release(self, client:"BaseDBAsyncClient") -> None:
+        """
+        return a leased client to the pool or
+        hand it over to the first waiting caller.
+        """
+        with self._lock:
+            if self._shared:
+                self._in_use -= 1
+                return None
+
+            expired = self._put_back(client)
+
+        if expired:
+            await self._close_clients(expired)
+
+    async def close(self) -> None:
+        """
+        close all the idle clients of the pool.
+        The leased clients are closed as soon as they are released.
+        """
+        with self._lock:
+            self._closed = True
+            clients = [client for client, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(clients)
+
+            future, self._shared_future = self._shared_future, None
+            if future is not None:
+                self._size = 0
+
+        if future is not None and future.done() and future.exception() is None:
+            clients.append(future.result())
+
+        await self._close_clients(clients)
+
+
+def get_leased_client(connection_name:str) -> t.Optional["BaseDBAsyncClient"]:
+    """
+    return the client leased by the current context 
+    for the connection name or `None`.
+    """
+    leases = current_leases.get()
+    if leases is None:
+        return None
+    return leases.get(connection_name)
+
+
+async def lease_connections(pools:t.Dict[str, "ConnectionPool"]) -> None:
+    """
+    lease a client from every pool and use it as the current 
+    tortoise orm connection of this context only, so the concurrent 
+    requests never share or close each other's connections.
+    """
+    if current_leases.get() is not None:
+        return None
+
+    leases:t.Dict[str, "BaseDBAsyncClient"] = dict()
+    try:
+        for name, pool in pools.items():
+            leases[name] = await pool.acquire()
+    except BaseException:
+        for name, client in leases.items():
+            await pools[name].release(client)
+        raise
+
+    previous:t.Dict[str, "BaseDBAsyncClient"] = dict()
+    for name, client in leases.items():
+        if name in current_transaction_map:
+            previous[name] = current_transaction_map[name].get()
+            current_transaction_map[name].set(client)
+
+    current_leases.set(leases)
+    current_pools.set(pools)
+    _previous_connections.set(previous)
+
+
+async def release_connections(pools:t.Dict[str, "ConnectionPool"]) -> None:
+    """
+    return the clients leased by this context to their pools.
+    """
+    leases = current_leases.get()
+    if leases is None:
+        return None
+
+    previous = _previous_connections.get() or dict()
+    current_leases.set(None)
+    current_pools.set(None)
+    _previous_connections.set(None)
+    for name, client in leases.items():
+        if name in previous and name in current_transaction_map:
+            # the context var tokens can't be used here, flask runs the 
+            # `before_request` and `teardown_request` hooks in different contexts.
+            current_transaction_map[name].set(previous[name])
+
+        pool = pools.get(name)
+        if pool is not None:
+            await pool.release(client)
+
+
+async def acquire_spare_client(connection_name:str) -> t.Optional["BaseDBAsyncClient"]:
+    """
+    lease an extra idle client of the connection for a query running
+    concurrently with the ones of the current request. Returns `None`
+    if the request has no pool or no client of the pool is idle, so a
+    request never opens a client or waits for the ones of the other requests.
+    """
+    pool = (current_pools.get() or dict()).get(connection_name)
+    if pool is None:
+        return None
+    return pool.acquire_idle()
+
+
+async def release_spare_client(connection_name:str, client:t.Optional["BaseDBAsyncClient"]) -> None:
+    """
+    return a client leased by :func:`acquire_spare_client`.
+    """
+    pool = (current_pools.get() or dict()).get(connection_name)
+    if client is not None and pool is not None:
+        await pool.release(client)
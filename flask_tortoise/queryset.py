@@ -1,16 +1,55 @@
-from tortoise.exceptions import DoesNotExist, MultipleObjectsReturned
-from tortoise.queryset import QuerySetSingle, QuerySet as OldQuerySet
+from tortoise.exceptions import DoesNotExist, FieldError, MultipleObjectsReturned, OperationalError
+from tortoise.queryset import (
+    QuerySetSingle, 
+    QuerySet as OldQuerySet,
+    UpdateQuery as OldUpdateQuery,
+    DeleteQuery as OldDeleteQuery,
+    BulkUpdateQuery as OldBulkUpdateQuery,
+    )
+from tortoise.backends.base.client import BaseTransactionWrapper
+from tortoise.fields.relational import ManyToManyFieldInstance
+from tortoise.query_utils import Prefetch
+from tortoise.query_utils import Q
+from pypika import Order
+from pypika.analytics import Count
+from pypika.terms import Star
 
 from copy import copy
 from math import ceil
-from flask.globals import request
+from enum import Enum
+from decimal import Decimal
+from uuid import UUID
+from flask.globals import current_app, request
+from flask.wrappers import Response
+from itsdangerous import BadSignature, URLSafeSerializer
 from werkzeug.exceptions import NotFound
 
+from .cache import CachingClient, get_transaction_client, invalidate_model
+from .identity import discard_identities, get_identity, set_identity
+from .instrumentation import instrument_client
+from .metrics import metrics
+from .pool import acquire_spare_client, release_spare_client
+from .replicas import get_replica_route
+from .rows import get_row_factory
+from .singleflight import SingleFlightClient
+from .templates import SQLTemplate, _Marker, compile_template, get_placeholder, get_shape, mark_q_objects, template_cache
+from .totals import get_total, supports_window_functions
+from .serializers import JSON_MIMETYPE, dumps
+from .streaming import model_to_dict
+
+import asyncio as aio
+import datetime as dt
+import time as time
 import typing as t
 
+_MISSING = object()
+
 if t.TYPE_CHECKING: # use this to omit the circular import issue.
+    from tortoise.backends.base.client import BaseDBAsyncClient
     from .models import MODEL
-    from tortoise.queryset import Q
+
+#: the alias of the `COUNT(*) OVER ()` column of the `window` total strategy.
+WINDOW_TOTAL_FIELD:str = "_flask_tortoise_total"
 
 class Pagination:
     """Internal helper class returned by :meth:`QuerySet.paginate`.  You
@@ -25,8 +64,10 @@ class Pagination:
         queryset:"QuerySet", 
         page:int, 
         per_page:int, 
-        total:int, 
-        items:"QuerySet[MODEL]"):
+        total:t.Optional[int], 
+        items:t.List[t.Union["MODEL", t.Dict[str, t.Any]]],
+        total_is_estimate:bool=False,
+        fields:t.Optional[t.Tuple[str, ...]]=None):
         #: the unlimited query object that was used to create this
         #: pagination object.
         self.queryset = queryset
@@ -38,22 +79,27 @@ class Pagination:
         self.total = total
         #: the items for the current page
         self.items = items
+        #: True if the total is estimated from the database statistics
+        self.total_is_estimate = total_is_estimate
+        #: the selected fields if the items are dictionaries
+        self.fields = fields
+
+    def _get_pages(self) -> int:
+        if self.per_page == 0 or self.total is None:
+            return 0
+        return int(ceil(self.total / float(self.per_page)))
 
     @property
     async def pages(self):
         """The total number of pages"""
-        if self.per_page == 0 or self.total is None:
-            pages = 0
-        else:
-            pages = int(ceil(self.total / float(self.per_page)))
-        return pages
+        return self._get_pages()
 
-    def prev(self, error_out=False):
+    async def prev(self, error_out=False):
         """Returns a :class:`Pagination` object for the previous page."""
         assert (
             self.queryset is not None
         ), "a query object is required for this method to work"
-        return self.queryset.paginate(self.page - 1, self.per_page, error_out)
+        return await self.queryset.paginate(self.page - 1, self.per_page, error_out, fields=self.fields)
 
     @property
     async def prev_num(self):
@@ -72,11 +118,14 @@ class Pagination:
         assert (
             self.queryset is not None
         ), "a query object is required for this method to work"
-        return self.queryset.paginate(self.page + 1, self.per_page, error_out)
+        return await self.queryset.paginate(self.page + 1, self.per_page, error_out, fields=self.fields)
 
     @property
     async def has_next(self):
         """True if a next page exists."""
+        if self.total_is_estimate and len(self.items) >= self.per_page:
+            # the estimate may be lower than the real total.
+            return True
         return self.page < await self.pages
 
     @property
@@ -109,38 +158,279 @@ class Pagination:
             {% endmacro %}
         """
         last = 0
-        for num in range(1, self.pages + 1):
+        pages = await self.pages
+        for num in range(1, pages + 1):
             if (
                 num <= left_edge
                 or (
                     num > self.page - left_current - 1
                     and num < self.page + right_current
                 )
-                or num > await self.pages - right_edge
+                or num > pages - right_edge
             ):
                 if last + 1 != num:
                     yield None
                 yield num
                 last = num
 
+    def to_dict(self, *fields:str) -> t.Dict[str, t.Any]:
+        """
+        return the items (only the ``fields`` if given)
+        and the page numbers as a dictionary.
+        """
+        fields = fields or self.fields
+        items = [
+            {field: item[field] for field in fields or item} if isinstance(item, dict) 
+            else model_to_dict(item, fields)
+            for item in self.items
+            ]
+        return dict(
+            items=items,
+            page=self.page,
+            per_page=self.per_page,
+            total=self.total,
+            pages=self._get_pages(),
+            )
+
+    def to_response(self, *fields:str, status:int=200) -> Response:
+        """
+        return a JSON response of :meth:`to_dict`. Paginate with the
+        ``fields`` argument to fetch the items as dictionaries, without
+        creating the model instances.
+
+        :for example::
+
+            @app.get("/posts")
+            async def list_posts():
+                pagination = await Posts.paginate(fields=("id", "name"))
+                return pagination.to_response()
+        """
+        return Response(dumps(self.to_dict(*fields)), status=status, mimetype=JSON_MIMETYPE)
+
     def __await__(self: "Pagination") -> t.Generator[t.Any, None, "Pagination"]:
         async def _self() -> "Pagination":
             return self
 
         return _self().__await__()
 
+class CursorPagination:
+    """Internal helper class returned by :meth:`QuerySet.paginate_cursor`.
+    Unlike :class:`Pagination` it doesn't know the total number of items or
+    pages, instead it provides the opaque :attr:`next_cursor` and
+    :attr:`prev_cursor` values built from the ordering columns of the
+    last and the first item of the page.
+    """
+
+    def __init__(
+        self,
+        queryset:t.Optional["QuerySet"],
+        per_page:int,
+        order_by:t.Tuple[str, ...],
+        items:t.List["MODEL"],
+        next_cursor:t.Optional[str]=None,
+        prev_cursor:t.Optional[str]=None):
+        #: the unlimited query object that was used to create this
+        #: pagination object.
+        self.queryset = queryset
+        #: the number of items to be displayed on a page.
+        self.per_page = per_page
+        #: the ordering of the items, the primary key is always the last one.
+        self.order_by = order_by
+        #: the items for the current page
+        self.items = items
+        #: the cursor of the next page or `None`.
+        self.next_cursor = next_cursor
+        #: the cursor of the previous page or `None`.
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self) -> bool:
+        """True if a next page exists."""
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self) -> bool:
+        """True if a previous page exists"""
+        return self.prev_cursor is not None
+
+    async def next(self, error_out:bool=False) -> t.Optional["CursorPagination"]:
+        """Returns a :class:`CursorPagination` object for the next page,
+        or `None` if there is no next page."""
+        assert (
+            self.queryset is not None
+        ), "a query object is required for this method to work"
+        if self.next_cursor is None:
+            # an empty cursor would fall back to the `after` request argument.
+            return None
+        return await self.queryset.paginate_cursor(
+            after=self.next_cursor, per_page=self.per_page, order_by=self.order_by, error_out=error_out
+            )
+
+    async def prev(self, error_out:bool=False) -> t.Optional["CursorPagination"]:
+        """Returns a :class:`CursorPagination` object for the previous page,
+        or `None` if there is no previous page."""
+        assert (
+            self.queryset is not None
+        ), "a query object is required for this method to work"
+        if self.prev_cursor is None:
+            # an empty cursor would fall back to the `before` request argument.
+            return None
+        return await self.queryset.paginate_cursor(
+            before=self.prev_cursor, per_page=self.per_page, order_by=self.order_by, error_out=error_out
+            )
+
+    def __await__(self: "CursorPagination") -> t.Generator[t.Any, None, "CursorPagination"]:
+        async def _self() -> "CursorPagination":
+            return self
+
+        return _self().__await__()
+
+
+def _cursor_serializer() -> URLSafeSerializer:
+    """
+    the cursors are signed with the `SECRET_KEY` of the current app,
+    so the clients can't forge or alter them.
+    """
+    secret_key = current_app.config.get("SECRET_KEY") if current_app else None
+    if not secret_key:
+        raise RuntimeError("The `SECRET_KEY` config var must be set to use the cursor pagination.")
+    return URLSafeSerializer(secret_key, salt="flask-tortoise-cursor")
+
+
+def _dump_cursor_value(value:t.Any) -> t.Any:
+    if isinstance(value, Enum):
+        value = value.value
+    if isinstance(value, (dt.datetime, dt.date, dt.time)):
+        return value.isoformat()
+    if isinstance(value, (Decimal, UUID)):
+        return str(value)
+    return value
+
+
+def _on_model_write(model:t.Type["MODEL"]) -> None:
+    """
+    invalidate the cached rows and the loaded instances of a written model.
+    """
+    invalidate_model(model)
+    discard_identities(model)
+
+
+class UpdateQuery(OldUpdateQuery):
+    __slots__ = ()
+
+    async def _execute(self) -> int:
+        rows = await super(UpdateQuery, self)._execute()
+        _on_model_write(self.model)
+        return rows
+
+
+class DeleteQuery(OldDeleteQuery):
+    __slots__ = ()
+
+    async def _execute(self) -> int:
+        rows = await super(DeleteQuery, self)._execute()
+        _on_model_write(self.model)
+        return rows
+
+
+class BulkUpdateQuery(OldBulkUpdateQuery):
+    __slots__ = ()
+
+    async def _execute(self) -> int:
+        rows = await super(BulkUpdateQuery, self)._execute()
+        _on_model_write(self.model)
+        return rows
+
+
+def _get_query_tables(model:t.Type["MODEL"], query:t.Any) -> t.Set[str]:
+    tables = {model._meta.db_table}
+    for join in getattr(query, "_joins", ()):
+        table_name = getattr(join.item, "_table_name", None)
+        if table_name is not None:
+            tables.add(table_name)
+    return tables
+
+
+def _get_prefetch_tables(model:t.Type["MODEL"], prefetch_map:t.Dict[str, t.Set[t.Any]]) -> t.Set[str]:
+    tables:t.Set[str] = set()
+    for name, nested in prefetch_map.items():
+        field = model._meta.fields_map.get(name)
+        related_model = getattr(field, "related_model", None)
+        if related_model is None:
+            continue
+
+        tables.add(related_model._meta.db_table)
+        if isinstance(field, ManyToManyFieldInstance):
+            tables.add(field.through)
+
+        nested_map:t.Dict[str, t.Set[t.Any]] = dict()
+        for relation in nested:
+            if isinstance(relation, Prefetch):
+                tables.add(relation.queryset.model._meta.db_table)
+                relation = relation.relation
+            first, _, rest = relation.partition("__")
+            nested_map.setdefault(first, set())
+            if rest:
+                nested_map[first].add(rest)
+        tables |= _get_prefetch_tables(related_model, nested_map)
+
+    return tables
+
+
+#: the containers of a queryset shared with it's clones until changed.
+_SHARED_CONTAINERS:t.FrozenSet[str] = frozenset((
+    "_prefetch_queries",
+    "_q_objects",
+    "_annotations",
+    "_custom_filters",
+    "_select_related",
+    "_force_indexes",
+    "_use_indexes",
+))
+
+
+def _copy_prefetch_queries(
+    prefetch_queries:t.Dict[str, t.List[t.Tuple[t.Optional[str], "OldQuerySet"]]]
+    ) -> t.Dict[str, t.List[t.Tuple[t.Optional[str], "OldQuerySet"]]]:
+    """
+    copy the prefetch queries, the executor and `Prefetch`
+    append to their lists in place.
+    """
+    return {name: list(queries) for name, queries in prefetch_queries.items()}
+
+
 class QuerySet(OldQuerySet):
-    _raise_404_not_found:bool = False
-    _not_found_err_description:t.Optional[str] = None
-    
+    __slots__ = (
+        "_raise_404_not_found",
+        "_not_found_err_description",
+        "_cached",
+        "_cache_ttl",
+        "_single_flight",
+        "_shared",
+    )
+
+    def __init__(self, model:t.Type["MODEL"]) -> None:
+        super(QuerySet, self).__init__(model)
+        self._raise_404_not_found:bool = False
+        self._not_found_err_description:t.Optional[str] = None
+        self._cached:bool = False
+        self._cache_ttl:t.Optional[float] = None
+        self._single_flight:t.Optional[bool] = None
+        #: the containers possibly shared with the other querysets of the chain.
+        self._shared:t.FrozenSet[str] = frozenset()
+
     def _clone(self) -> "QuerySet[MODEL]":
+        # the containers are shared by the clone and copied by
+        # `_own` only before they get changed in place, so chaining
+        # `.filter().order_by().limit()` copies only the filters. The
+        # clone itself still gets every attribute of the queryset.
         queryset = self.__class__.__new__(QuerySet)
         queryset.fields = self.fields
         queryset.model = self.model
         queryset.query = self.query
         queryset.capabilities = self.capabilities
-        queryset._prefetch_map = copy(self._prefetch_map)
-        queryset._prefetch_queries = copy(self._prefetch_queries)
+        queryset._prefetch_map = self._prefetch_map
+        queryset._prefetch_queries = self._prefetch_queries
         queryset._single = self._single
         queryset._raise_does_not_exist = self._raise_does_not_exist
         
@@ -148,15 +438,15 @@ class QuerySet(OldQuerySet):
         queryset._limit = self._limit
         queryset._offset = self._offset
         queryset._fields_for_select = self._fields_for_select
-        queryset._filter_kwargs = copy(self._filter_kwargs)
-        queryset._orderings = copy(self._orderings)
-        queryset._joined_tables = copy(self._joined_tables)
-        queryset._q_objects = copy(self._q_objects)
+        queryset._filter_kwargs = self._filter_kwargs
+        queryset._orderings = self._orderings
+        queryset._joined_tables = self._joined_tables
+        queryset._q_objects = self._q_objects
         queryset._distinct = self._distinct
-        queryset._annotations = copy(self._annotations)
-        queryset._having = copy(self._having)
-        queryset._custom_filters = copy(self._custom_filters)
-        queryset._group_bys = copy(self._group_bys)
+        queryset._annotations = self._annotations
+        queryset._having = self._having
+        queryset._custom_filters = self._custom_filters
+        queryset._group_bys = self._group_bys
         queryset._select_for_update = self._select_for_update
         queryset._select_for_update_nowait = self._select_for_update_nowait
         queryset._select_for_update_skip_locked = self._select_for_update_skip_locked
@@ -165,18 +455,335 @@ class QuerySet(OldQuerySet):
         queryset._select_related_idx = self._select_related_idx
         queryset._force_indexes = self._force_indexes
         queryset._use_indexes = self._use_indexes
+        queryset._raise_404_not_found = False
+        queryset._not_found_err_description = None
+        queryset._cached = self._cached
+        queryset._cache_ttl = self._cache_ttl
+        queryset._single_flight = self._single_flight
+        queryset._shared = self._shared = _SHARED_CONTAINERS
+        return queryset
+
+    def _own(self, *names:str) -> None:
+        """
+        copy the shared containers before they get changed in place.
+        """
+        shared = self._shared.intersection(names)
+        if not shared:
+            return None
+
+        for name in shared:
+            value = getattr(self, name)
+            if name == "_prefetch_queries":
+                value = _copy_prefetch_queries(value)
+            else:
+                value = copy(value)
+            setattr(self, name, value)
+        self._shared = self._shared.difference(shared)
+
+    def _owned_clone(self, *names:str) -> "QuerySet[MODEL]":
+        """
+        return a clone owning the containers it's going to change in place.
+        """
+        queryset = self._clone()
+        queryset._own(*names)
+        return queryset
+
+    # the tortoise orm methods below change the containers of their
+    # clone in place, so they are repeated on a clone owning them.
+
+    def _filter_or_exclude(self, *args:"Q", negate:bool, **kwargs:t.Any) -> "QuerySet[MODEL]":
+        queryset = self._owned_clone("_q_objects")
+        for arg in args:
+            if not isinstance(arg, Q):
+                raise TypeError("expected Q objects as args")
+            queryset._q_objects.append(~arg if negate else arg)
+        for key, value in kwargs.items():
+            q = Q(**{key: value})
+            queryset._q_objects.append(~q if negate else q)
+        return queryset
+
+    def annotate(self, **kwargs:t.Any) -> "QuerySet[MODEL]":
+        from tortoise.models import get_filters_for_field
+
+        queryset = self._owned_clone("_annotations", "_custom_filters")
+        for key, annotation in kwargs.items():
+            queryset._annotations[key] = annotation
+            queryset._custom_filters.update(get_filters_for_field(key, None, key))
+        return queryset
+
+    def select_related(self, *fields:str) -> "QuerySet[MODEL]":
+        queryset = self._owned_clone("_select_related")
+        queryset._select_related.update(fields)
         return queryset
 
-    async def _execute(self) -> t.List["MODEL"]:
-        instance_list = await self._db.executor_class(
+    def force_index(self, *index_names:str) -> "QuerySet[MODEL]":
+        if not self.capabilities.support_index_hint:
+            return self
+        queryset = self._owned_clone("_force_indexes")
+        queryset._force_indexes.update(index_names)
+        return queryset
+
+    def use_index(self, *index_names:str) -> "QuerySet[MODEL]":
+        if not self.capabilities.support_index_hint:
+            return self
+        queryset = self._owned_clone("_use_indexes")
+        queryset._use_indexes.update(index_names)
+        return queryset
+
+    def prefetch_related(self, *args:t.Any) -> "QuerySet[MODEL]":
+        queryset = self._owned_clone("_prefetch_queries")
+        queryset._prefetch_map = dict()
+
+        meta = self.model._meta
+        for relation in args:
+            if isinstance(relation, Prefetch):
+                relation.resolve_for_queryset(queryset)
+                continue
+
+            first_level_field, _, forwarded_prefetch = relation.partition("__")
+            if first_level_field not in meta.fetch_fields:
+                if first_level_field in meta.fields:
+                    raise FieldError(f"Field {first_level_field} on {meta.full_name} is not a relation")
+                raise FieldError(f"Relation {first_level_field} for {meta.full_name} not found")
+
+            forwarded = queryset._prefetch_map.setdefault(first_level_field, set())
+            if forwarded_prefetch:
+                forwarded.add(forwarded_prefetch)
+        return queryset
+
+    def cache(self, ttl:t.Optional[float]=30) -> "QuerySet[MODEL]":
+        """
+        cache the fetched rows (and the prefetched ones) inside the
+        process for ``ttl`` seconds, by the compiled sql. Saving, deleting
+        or updating the instances of any model read by the query
+        invalidates the cached rows. The queries running inside a
+        transaction or selected for update are never cached.
+
+        :for example::
+
+            categories = await Category.filter(active=True).cache(ttl=60)
+        """
+        queryset = self._clone()
+        queryset._cached = True
+        queryset._cache_ttl = ttl
+        return queryset
+
+    def single_flight(self, enabled:bool=True) -> "QuerySet[MODEL]":
+        """
+        let the identical queries running at the same time, in any request
+        of the process, await a single database round trip instead of sending
+        the same query again. Nothing is kept after the query completes.
+        Defaults to the ``TORTOISE_ORM_SINGLE_FLIGHT`` config var.
+
+        :for example::
+
+            categories = await Category.filter(active=True).single_flight()
+        """
+        queryset = self._clone()
+        queryset._single_flight = enabled
+        return queryset
+
+    def _get_cache_tables(self, tables:t.Optional[t.Iterable[str]]=None) -> t.Set[str]:
+        if tables is None:
+            tables = _get_query_tables(self.model, self.query)
+        return set(tables) | _get_prefetch_tables(self.model, self._prefetch_map)
+
+    def _get_execute_client(self, tables:t.Optional[t.Iterable[str]]=None) -> "BaseDBAsyncClient":
+        """
+        wrap the database client for the single flight 
+        and the cached queries.
+        """
+        if self._select_for_update or isinstance(self._db, BaseTransactionWrapper):
+            return self._db
+
+        single_flight = self._single_flight
+        if single_flight is None:
+            single_flight = bool(current_app) and current_app.config.get("TORTOISE_ORM_SINGLE_FLIGHT", False)
+
+        db = self._db
+        if single_flight:
+            db = SingleFlightClient(db)
+        if self._cached:
+            db = CachingClient(db, self._get_cache_tables(tables), self._cache_ttl)
+        return db
+
+    def update(self, **kwargs:t.Any) -> "UpdateQuery":
+        return UpdateQuery(
+            db=self._db,
+            model=self.model,
+            update_kwargs=kwargs,
+            q_objects=self._q_objects,
+            annotations=self._annotations,
+            custom_filters=self._custom_filters,
+            limit=self._limit,
+            orderings=self._orderings,
+        )
+
+    def delete(self) -> "DeleteQuery":
+        return DeleteQuery(
+            db=self._db,
             model=self.model,
+            q_objects=self._q_objects,
+            annotations=self._annotations,
+            custom_filters=self._custom_filters,
+            limit=self._limit,
+            orderings=self._orderings,
+        )
+
+    def bulk_update(
+        self, 
+        objects:t.Iterable["MODEL"], 
+        fields:t.Iterable[str], 
+        batch_size:t.Optional[int]=None
+        ) -> "BulkUpdateQuery":
+        if any(obj.pk is None for obj in objects):
+            raise ValueError("All bulk_update() objects must have a primary key set.")
+        return BulkUpdateQuery(
             db=self._db,
+            model=self.model,
+            q_objects=self._q_objects,
+            annotations=self._annotations,
+            custom_filters=self._custom_filters,
+            limit=self._limit,
+            orderings=self._orderings,
+            objects=objects,
+            fields=fields,
+            batch_size=batch_size,
+        )
+
+    def _get_identity_pk(self) -> t.Any:
+        """
+        return the primary key value if the queryset fetches a
+        single row by nothing else but it's primary key, else `_MISSING`.
+        """
+        if (
+            not self._single
+            or len(self._q_objects) != 1
+            or self._offset
+            or self._annotations
+            or self._custom_filters
+            or self._prefetch_map
+            or self._prefetch_queries
+            or self._select_related
+            or self._select_for_update
+            or self._fields_for_select
+            ):
+            return _MISSING
+
+        q = self._q_objects[0]
+        if q.children or q._is_negated or len(q.filters) != 1:
+            return _MISSING
+
+        (name, value), = q.filters.items()
+        meta = self.model._meta
+        if name not in ("pk", meta.pk_attr) or value is None:
+            return _MISSING
+
+        try:
+            return meta.pk.to_python_value(value)
+        except (TypeError, ValueError):
+            return _MISSING
+
+    def _get_sql_template(self) -> t.Optional[t.Tuple[SQLTemplate, t.List[t.Any]]]:
+        """
+        return the compiled sql of the shape of the queryset and
+        it's bound values, or `None` if it must go through the query builder.
+        """
+        if (
+            template_cache.maxsize <= 0
+            or self._annotations
+            or self._custom_filters
+            or self._having
+            or self._group_bys
+            or self._select_related
+            or self._joined_tables
+            ):
+            return None
+
+        dialect = self._db.capabilities.dialect
+        shape = get_shape(self.model, self._q_objects) if get_placeholder(dialect, 1) is not None else None
+        if shape is None:
+            return None
+
+        filters, params = shape
+        key = (
+            self.model,
+            dialect,
+            filters,
+            self._fields_for_select,
+            # the limit and the offset are bound like the filter values, so
+            # every page shares the shape. A zero renders no clause at all.
+            bool(self._limit),
+            bool(self._offset),
+            self._distinct,
+            tuple(self._orderings),
+            frozenset(self._force_indexes),
+            frozenset(self._use_indexes),
+            self._select_for_update,
+            self._select_for_update_nowait,
+            self._select_for_update_skip_locked,
+            frozenset(self._select_for_update_of),
+        )
+        template = template_cache.get(key)
+        if template is None:
+            queryset = self._clone()
+            queryset._q_objects = mark_q_objects(self._q_objects)
+            markers = iter(range(len(params), len(params) + 2))
+            if self._limit:
+                queryset._limit = _Marker(next(markers))
+            if self._offset:
+                queryset._offset = _Marker(next(markers))
+            queryset._make_query()
+            template = compile_template(
+                queryset.query.get_sql(), dialect, _get_query_tables(self.model, queryset.query)
+                )
+            template_cache.set(key, template)
+
+        executor_class = self._db.executor_class
+        values = [executor_class._field_to_db(field, value, self.model) for field, value in params]
+        if self._limit:
+            values.append(self._limit)
+        if self._offset:
+            values.append(self._offset)
+        return template, template.bind(values)
+
+    def __await__(self) -> t.Generator[t.Any, None, t.List["MODEL"]]:
+        if self._db is None:
+            self._db = self._choose_db(self._select_for_update)
+        template = self._get_sql_template()
+        if template is None:
+            self._make_query()
+        return self._execute(template).__await__()
+
+    async def _execute(
+        self,
+        template:t.Optional[t.Tuple[SQLTemplate, t.List[t.Any]]]=None
+        ) -> t.List["MODEL"]:
+        identity_pk = self._get_identity_pk()
+        if identity_pk is not _MISSING:
+            instance = get_identity(self.model, identity_pk)
+            if instance is not None:
+                return instance
+
+        executor = self._db.executor_class(
+            model=self.model,
+            db=self._get_execute_client(template[0].tables if template is not None else None),
             prefetch_map=self._prefetch_map,
-            prefetch_queries=self._prefetch_queries,
+            prefetch_queries=_copy_prefetch_queries(self._prefetch_queries),
             select_related_idx=self._select_related_idx,
-        ).execute_select(self.query, custom_fields=list(self._annotations.keys()))
+        )
+        if template is None:
+            instance_list = await executor.execute_select(self.query, custom_fields=list(self._annotations.keys()))
+        else:
+            sql_template, values = template
+            _, rows = await executor.db.execute_query(sql_template.sql, values)
+            instance_list = [self.model._init_from_db(**row) for row in rows]
+            await executor._execute_prefetch_queries(instance_list)
+
         if self._single:
             if len(instance_list) == 1:
+                if identity_pk is not _MISSING:
+                    set_identity(instance_list[0])
                 return instance_list[0]
 
             if not instance_list:
@@ -218,16 +825,21 @@ class QuerySet(OldQuerySet):
         Like :meth:`first` but aborts with 404 if not found instead
         of returning ``None``.
         """
-        return self.get_or_404(*args, description, **kwargs)
+        queryset = self.get_or_404(*args, description=description, **kwargs)
+        queryset._limit = 1
+        return queryset
 
-    def paginate(
+    async def paginate(
         self, 
         page:t.Optional[int]=None, 
         per_page:t.Optional[int]=None, 
         error_out:bool=True, 
         max_per_page:t.Optional[int]=None, 
-        count:bool=True
-    ) -> t.Type["Pagination"]:
+        count:bool=True,
+        total:t.Optional[str]=None,
+        total_ttl:t.Optional[float]=None,
+        fields:t.Optional[t.Iterable[str]]=None,
+    ) -> "Pagination":
         """Returns ``per_page`` items from page ``page``.
         If ``page`` or ``per_page`` are ``None``, they will be retrieved from
         the request query. If ``max_per_page`` is specified, ``per_page`` will
@@ -241,7 +853,18 @@ class QuerySet(OldQuerySet):
         * ``page`` or ``per_page`` are not ints.
         When ``error_out`` is ``False``, ``page`` and ``per_page`` default to
         1 and 20 respectively.
-        Returns a :class:`Pagination` object.
+        The items and the count queries run concurrently when an idle pooled
+        connection is available for the count, else one after the other.
+        ``total`` selects how the total is counted: ``"exact"``, ``"cached"``
+        (an exact count cached for ``total_ttl`` seconds), ``"estimated"``
+        (from the planner statistics, falls back to ``"cached"``) or ``"window"``
+        (fetched with the items by a single ``COUNT(*) OVER ()`` query, falls
+        back to ``"exact"`` without the window functions). They default
+        to the ``TORTOISE_ORM_PAGINATION_TOTAL`` and
+        ``TORTOISE_ORM_PAGINATION_TOTAL_TTL`` config vars.
+        If ``fields`` are given only those columns are selected and the items
+        are dictionaries instead of the model instances.
+        Returns a :class:`Pagination` object with the items fetched as a list.
         """
 
         if request:
@@ -284,14 +907,410 @@ class QuerySet(OldQuerySet):
             else:
                 per_page = 20
 
-        items = self.limit(per_page).offset((page - 1) * per_page).all()
+        items_query = self.limit(per_page).offset((page - 1) * per_page)
+        if fields is not None:
+            fields = tuple(fields)
+            items_query = items_query.values(*fields)
+
+        if current_app:
+            if total is None:
+                total = current_app.config.get("TORTOISE_ORM_PAGINATION_TOTAL", "exact")
+            if total_ttl is None:
+                total_ttl = current_app.config.get("TORTOISE_ORM_PAGINATION_TOTAL_TTL", 60)
+
+        window = None
+        if count and total == "window" and fields is None:
+            window = await items_query._fetch_with_window_total()
+
+        if not count:
+            items, (total_count, is_estimate) = await items_query, (None, False)
+        elif window is not None:
+            items, total_count, is_estimate = window[0], window[1], False
+            if total_count is None and page == 1:
+                total_count = 0
+            elif total_count is None and not error_out:
+                # an empty page past the last one, only the count is missing.
+                total_count, is_estimate = await self._get_total("exact", total_ttl)
+        else:
+            spare_client = await self._acquire_spare_client()
+            if spare_client is None:
+                # the queries of a connection would only wait for each other.
+                items = await items_query
+                total_count, is_estimate = await self._get_total(total or "exact", total_ttl)
+            else:
+                items, (total_count, is_estimate) = await aio.gather(
+                    items_query, self._get_total(total or "exact", total_ttl, spare_client)
+                    )
 
         if not items and page != 1 and error_out:
             raise NotFound
 
-        if not count:
-            total = None
+        return Pagination(
+            self, page, per_page, total_count, list(items), total_is_estimate=is_estimate, fields=fields
+            )
+
+    def _get_transaction_client(self) -> t.Optional["BaseDBAsyncClient"]:
+        """
+        return the client of the transaction the queryset runs in, or `None`.
+        """
+        if self._db is not None:
+            return self._db if isinstance(self._db, BaseTransactionWrapper) else None
+        return get_transaction_client(self.model._meta.default_connection)
+
+    async def _acquire_spare_client(self) -> t.Optional["BaseDBAsyncClient"]:
+        """
+        lease an idle pooled connection to count the rows on, so the count
+        doesn't wait behind the other queries of the request. Returns `None`
+        inside a transaction, whose own writes must be counted, for an
+        explicit or a replica client, or if no pooled connection is idle,
+        as opening one costs more than the count saves.
+        """
+        connection_name = self.model._meta.default_connection
+        if self._get_transaction_client() is not None or self._db is not None:
+            return None
+        if get_replica_route(connection_name) is not None:
+            # the reads routed to a replica don't hold up the primary.
+            return None
+        return await acquire_spare_client(connection_name)
+
+    async def _get_total(
+        self, 
+        strategy:str, 
+        ttl:t.Optional[float],
+        spare_client:t.Optional["BaseDBAsyncClient"]=None
+        ) -> t.Tuple[int, bool]:
+        """
+        count the rows with the strategy, on the spare client if it's given.
+        The spare client is released afterwards.
+        """
+        started_at = time.perf_counter()
+        try:
+            queryset = self.using_db(instrument_client(spare_client)) if spare_client is not None else self.all()
+            return await get_total(queryset, strategy, ttl)
+        finally:
+            if metrics.enabled:
+                metrics.observe_pagination_count(time.perf_counter() - started_at, strategy)
+            await release_spare_client(self.model._meta.default_connection, spare_client)
+
+    async def _fetch_with_window_total(self) -> t.Optional[t.Tuple[t.List["MODEL"], t.Optional[int]]]:
+        """
+        fetch the rows of the queryset together with the total of
+        the unlimited query in a single round trip.
+        Returns the rows and the total (`None` if there are no rows),
+        or `None` if the database can't count with a window function.
+        """
+        db = self._db or self._choose_db(self._select_for_update)
+        if self._distinct or self._group_bys or not supports_window_functions(db):
+            # the window would count the rows before they get grouped.
+            return None
+
+        queryset = self._clone()
+        queryset._db = db
+        queryset._make_query()
+        queryset.query = queryset.query.select(Count(Star()).over().as_(WINDOW_TOTAL_FIELD))
+        executor = db.executor_class(
+            model=self.model,
+            db=db,
+            prefetch_map=queryset._prefetch_map,
+            prefetch_queries=_copy_prefetch_queries(queryset._prefetch_queries),
+            select_related_idx=queryset._select_related_idx,
+            )
+        try:
+            items = await executor.execute_select(
+                queryset.query, custom_fields=[*queryset._annotations, WINDOW_TOTAL_FIELD]
+                )
+        except OperationalError:
+            if db.capabilities.dialect != "mysql":
+                raise
+            # mysql servers older than 8.0.
+            return None
+
+        total = getattr(items[0], WINDOW_TOTAL_FIELD) if items else None
+        for item in items:
+            delattr(item, WINDOW_TOTAL_FIELD)
+        return items, total
+
+
+    async def to_json(self, *fields:str) -> bytes:
+        """
+        return the JSON bytes of the list of the rows. Only the ``fields``
+        (all the database fields by default) are selected and the rows are
+        serialized straight from the database records, without creating
+        the model instances. Uses `orjson` when it's installed.
+
+        :for example::
+
+            @app.get("/posts")
+            async def list_posts():
+                return Response(await Posts.all().to_json("id", "name"), mimetype="application/json")
+        """
+        if not fields:
+            fields = tuple(self.model._meta.fields_db_projection.keys())
+        return dumps(await self.values(*fields))
+
+    async def rows(self, *fields:str) -> t.List[t.Any]:
+        """
+        return the rows of the queryset as the read-only named tuples of
+        the ``fields`` (all the database fields by default), converted to
+        their python values like the model instances. The row class is created
+        once per model and field selection, the rows take far less memory and
+        time than the model instances. The prefetches and `select_related`
+        aren't applied.
+
+        :for example::
+
+            @app.get("/report")
+            async def report():
+                rows = await Posts.filter(published=True).rows("id", "name", "created")
+                return jsonify([row._asdict() for row in rows])
+        """
+        if not fields:
+            fields = tuple(self.model._meta.fields_db_projection.keys())
+        factory = get_row_factory(self.model, tuple(fields))
+
+        queryset = self._clone()
+        queryset._fields_for_select = factory.fields
+        queryset._prefetch_map = dict()
+        queryset._prefetch_queries = dict()
+        queryset._select_related = set()
+        queryset._select_related_idx = list()
+        if queryset._db is None:
+            queryset._db = queryset._choose_db(queryset._select_for_update)
+
+        template = queryset._get_sql_template()
+        if template is None:
+            queryset._make_query()
+            db = queryset._get_execute_client()
+            _, records = await db.execute_query(queryset.query.get_sql())
         else:
-            total = self.all().count()
+            sql_template, values = template
+            db = queryset._get_execute_client(sql_template.tables)
+            _, records = await db.execute_query(sql_template.sql, values)
+        return factory.make_rows(records)
+
+    async def iter_chunks(
+        self, 
+        size:int=1000, 
+        order_by:t.Optional[t.Union[str, t.Iterable[str]]]=None
+        ) -> t.AsyncIterator[t.List["MODEL"]]:
+        """
+        iterate over the rows of the queryset in the lists of
+        at most ``size`` items, fetched by the keyset batching, so the memory
+        stays bounded regardless of the table size and every batch is as fast
+        as the first one. ``order_by`` takes the ordering fields like
+        :meth:`paginate_cursor`, the ordering fields must not be nullable.
+
+        :for example::
+
+            async for todos in Todo.filter(done=False).iter_chunks(500):
+                await send_reminders(todos)
+        """
+        if size < 1:
+            raise ValueError("The chunk size must be at least 1.")
+
+        ordering = self._get_cursor_ordering(order_by)
+        queryset = self.order_by(*ordering)
+        remaining = self._limit
+        values:t.Optional[t.List[t.Any]] = None
+
+        while remaining is None or remaining > 0:
+            batch_size = size if remaining is None else min(size, remaining)
+            if values is None:
+                batch = queryset.limit(batch_size)
+            else:
+                # the offset applies to the first batch only.
+                batch = queryset.filter(self._get_keyset_filter(ordering, values, False)).offset(0).limit(batch_size)
+
+            items = list(await batch)
+            if not items:
+                return
+            yield items
+
+            if len(items) < batch_size:
+                return
+            values = [getattr(items[-1], field.lstrip("-")) for field in ordering]
+            if remaining is not None:
+                remaining -= len(items)
+
+    async def stream(
+        self, 
+        size:int=1000, 
+        order_by:t.Optional[t.Union[str, t.Iterable[str]]]=None
+        ) -> t.AsyncIterator["MODEL"]:
+        """
+        iterate over the rows of the queryset one by one, 
+        fetched in the batches of :meth:`iter_chunks`.
+
+        :for example::
+
+            async for todo in Todo.all().stream():
+                print(todo.title)
+        """
+        async for items in self.iter_chunks(size, order_by):
+            for item in items:
+                yield item
+
+    def _get_cursor_ordering(self, order_by:t.Optional[t.Union[str, t.Iterable[str]]]) -> t.Tuple[str, ...]:
+        if order_by is None:
+            orderings = self._orderings or self.model._meta._default_ordering
+            order_by = [f"-{field}" if order == Order.desc else field for field, order in orderings]
+
+        elif isinstance(order_by, str):
+            order_by = [order_by]
+
+        meta = self.model._meta
+        pk_name = meta.pk_attr
+        ordering:t.List[str] = []
+        for field in order_by:
+            prefix = "-" if field.startswith("-") else ""
+            name = field.lstrip("-")
+            name = pk_name if name == "pk" else name
+
+            # the cursor stores the values read from the items, so only
+            # the own columns of the model can be ordered by.
+            if name not in meta.fields_map or name in meta.fetch_fields:
+                raise FieldError(
+                    f"Can't paginate {meta.full_name} by the cursor ordered by {name!r}, "
+                    "only the fields of the model are supported, not the related or annotated ones."
+                    )
+            ordering.append(prefix + name)
+
+        # the primary key makes the ordering unique, so no row is skipped or repeated.
+        if pk_name not in [field.lstrip("-") for field in ordering]:
+            ordering.append(pk_name)
+        return tuple(ordering)
+
+    def _encode_cursor(self, item:"MODEL", order_by:t.Tuple[str, ...]) -> str:
+        values = [_dump_cursor_value(getattr(item, field.lstrip("-"))) for field in order_by]
+        return _cursor_serializer().dumps({"o": list(order_by), "v": values})
+
+    def _decode_cursor(self, cursor:str, order_by:t.Tuple[str, ...]) -> t.List[t.Any]:
+        """
+        decode and verify the cursor, raises `ValueError` for
+        an invalid cursor or one created for a different ordering.
+        """
+        try:
+            payload = _cursor_serializer().loads(cursor)
+        except BadSignature:
+            raise ValueError("Invalid pagination cursor.")
+
+        if not isinstance(payload, dict) or payload.get("o") != list(order_by):
+            raise ValueError("The pagination cursor doesn't match the ordering.")
+
+        values = payload.get("v")
+        if not isinstance(values, list) or len(values) != len(order_by):
+            raise ValueError("Invalid pagination cursor.")
+
+        fields_map = self.model._meta.fields_map
+        return [
+            fields_map[field.lstrip("-")].to_python_value(value) if value is not None else None
+            for field, value in zip(order_by, values)
+            ]
+
+    def _get_keyset_filter(
+        self, 
+        order_by:t.Tuple[str, ...], 
+        values:t.List[t.Any], 
+        backwards:bool
+        ) -> Q:
+        """
+        build the `(a > x) OR (a = x AND b > y) ...` filter of the rows
+        after (or before if `backwards`) the given ordering values.
+        """
+        conditions:t.List[Q] = []
+        for idx, field in enumerate(order_by):
+            name = field.lstrip("-")
+            descending = field.startswith("-")
+            lookup = "lt" if descending != backwards else "gt"
+            filters = {order_by[i].lstrip("-"): values[i] for i in range(idx)}
+            filters[f"{name}__{lookup}"] = values[idx]
+            conditions.append(Q(**filters))
+        return Q(*conditions, join_type="OR")
+
+    async def paginate_cursor(
+        self,
+        after:t.Optional[str]=None,
+        before:t.Optional[str]=None,
+        per_page:t.Optional[int]=None,
+        order_by:t.Optional[t.Union[str, t.Iterable[str]]]=None,
+        error_out:bool=True,
+        max_per_page:t.Optional[int]=None,
+    ) -> "CursorPagination":
+        """Returns ``per_page`` items after the ``after`` or before the ``before``
+        cursor using the keyset pagination, so the deep pages are as fast as the
+        first one. ``order_by`` takes the ordering fields like :meth:`order_by`,
+        the primary key is always added as the last one. The ordering fields
+        must not be nullable.
+        If ``after``, ``before`` or ``per_page`` are ``None``, they will be retrieved
+        from the request query. If ``max_per_page`` is specified, ``per_page`` will
+        be limited to that value. ``per_page`` defaults to 20.
+        When ``error_out`` is ``True`` (default), an invalid or tampered cursor
+        or a ``per_page`` which is not a positive int will cause a 404 response,
+        else the first page is returned.
+        Returns a :class:`CursorPagination` object.
+        Raises ``FieldError`` when ordered by a related or an annotated field.
+        """
+        ordering = self._get_cursor_ordering(order_by)
+
+        if request:
+            if after is None and before is None:
+                after = request.args.get("after", None)
+                before = request.args.get("before", None)
+
+            if per_page is None:
+                try:
+                    per_page = int(request.args.get("per_page", 20))
+                except (TypeError, ValueError):
+                    if error_out:
+                        raise NotFound
+
+                    per_page = 20
+
+        if per_page is None:
+            per_page = 20
+
+        if max_per_page is not None:
+            per_page = min(per_page, max_per_page)
+
+        if per_page < 1:
+            if error_out:
+                raise NotFound
+            else:
+                per_page = 20
+
+        backwards = after is None and before is not None
+        queryset = self
+
+        cursor = before if backwards else after
+        if cursor is not None:
+            try:
+                values = self._decode_cursor(cursor, ordering)
+            except (ValueError, TypeError):
+                if error_out:
+                    raise NotFound
+                cursor, backwards = None, False
+            else:
+                queryset = self.filter(self._get_keyset_filter(ordering, values, backwards))
+
+        if backwards:
+            query_ordering = [field[1:] if field.startswith("-") else f"-{field}" for field in ordering]
+        else:
+            query_ordering = list(ordering)
+
+        items = list(await queryset.order_by(*query_ordering).limit(per_page + 1))
+        has_more = len(items) > per_page
+        items = items[:per_page]
+        if backwards:
+            items.reverse()
+
+        has_next = has_more if not backwards else cursor is not None
+        has_prev = has_more if backwards else cursor is not None
 
-        return Pagination(self, page, per_page, total, items)
\ No newline at end of file
+        return CursorPagination(
+            self,
+            per_page,
+            ordering,
+            items,
+            next_cursor=self._encode_cursor(items[-1], ordering) if has_next and items else None,
+            prev_cursor=self._encode_cursor(items[0], ordering) if has_prev and items else None,
+        )
@@ -0,0 +1,195 @@
+"""
+route the reads of a request to a read replica.
+
+Every request leases a client from a single replica of each connection,
+chosen round-robin or by the least busy replica pool. The tortoise orm
+router :class:`ReplicaRouter` sends the reads of the request to it, while
+the writes, the `select_for_update` queries and the transactions always
+use the primary. A request sticks to the primary after it's first write,
+so it reads it's own writes.
+"""
+
+from tortoise.backends.base.client import BaseTransactionWrapper
+from tortoise.router import router
+from tortoise.transactions import current_transaction_map
+
+from contextvars import ContextVar
+from itertools import count
+
+import threading as th
+import typing as t
+
+if t.TYPE_CHECKING:
+    from tortoise.backends.base.client import BaseDBAsyncClient
+    from tortoise.models import Model
+    from .pool import ConnectionPool
+
+__all__ = (
+    'REPLICA_STRATEGIES',
+    'ReplicaSet',
+    'ReplicaRouter',
+    'get_replica_name',
+    'get_replica_route',
+    'install_replica_router',
+    'register_replica',
+    'lease_replicas',
+    'release_replicas',
+    'stick_to_primary',
+)
+
+REPLICA_STRATEGIES:t.Tuple[str, ...] = ("round_robin", "least_busy")
+
+#: the replica connection name used by the current request, by the primary connection name.
+current_replica_routes:ContextVar[t.Optional[t.Dict[str, str]]] = ContextVar(
+    "flask_tortoise_current_replica_routes", default=None
+    )
+_current_replica_leases:ContextVar[t.Optional[t.List[t.Tuple["ConnectionPool", "BaseDBAsyncClient", t.Any]]]] = ContextVar(
+    "flask_tortoise_current_replica_leases", default=None
+    )
+
+
+def get_replica_name(connection_name:str, idx:int) -> str:
+    """
+    return the tortoise orm connection name of a read replica.
+    """
+    return f"{connection_name}_replica_{idx}"
+
+
+def get_replica_route(connection_name:str) -> t.Optional[str]:
+    """
+    return the replica connection name the current request reads from, if any.
+    """
+    return (current_replica_routes.get() or dict()).get(connection_name)
+
+
+class ReplicaSet(object):
+    """
+    The connection pools of the read replicas of a connection.
+
+    :param connection_name:
+        the name of the primary connection.
+
+    :param pools:
+        the connection pools of the replicas, by their connection name.
+
+    :param strategy:
+        `round_robin` or `least_busy`, the replica pool with the fewest leased clients.
+    """
+    def __init__(
+        self,
+        connection_name:str,
+        pools:t.Dict[str, "ConnectionPool"],
+        strategy:str="round_robin"
+        ) -> None:
+        if strategy not in REPLICA_STRATEGIES:
+            raise ValueError(f"The replica strategy must be one of {list(REPLICA_STRATEGIES)}. Got: {strategy}")
+
+        self.connection_name = connection_name
+        self.pools = pools
+        self.strategy = strategy
+        self._names = list(pools)
+        self._counter = count()
+        self._lock = th.Lock()
+
+    def choose(self) -> str:
+        """
+        return the connection name of the replica for the next request.
+        """
+        if self.strategy == "least_busy":
+            return min(self._names, key=lambda name: self.pools[name].in_use)
+
+        with self._lock:
+            return self._names[next(self._counter) % len(self._names)]
+
+
+class ReplicaRouter(object):
+    """
+    The tortoise orm router sending the reads of a request
+    to it's leased replica.
+    """
+    def db_for_read(self, model:t.Type["Model"]) -> t.Optional[str]:
+        name = model._meta.default_connection
+        replica = get_replica_route(name)
+        if replica is None:
+            return None
+
+        if isinstance(current_transaction_map[name].get(), BaseTransactionWrapper):
+            # the reads of a transaction must see it's writes.
+            return None
+        return replica
+
+    def db_for_write(self, model:t.Type["Model"]) -> None:
+        stick_to_primary(model._meta.default_connection)
+        return None
+
+
+def register_replica(replica:str) -> None:
+    """
+    make the replica connection name resolvable by the tortoise orm,
+    so the router can send the reads to the client leased from it.
+    """
+    if replica not in current_transaction_map:
+        current_transaction_map[replica] = ContextVar(replica, default=None)
+
+
+def install_replica_router() -> None:
+    """
+    put the :class:`ReplicaRouter` in front of the configured tortoise orm routers.
+    """
+    routers = router._routers or []
+    if not any(isinstance(r, ReplicaRouter) for r in routers):
+        router._routers = [ReplicaRouter(), *routers]
+
+
+def stick_to_primary(connection_name:str) -> None:
+    """
+    send the later reads of the current request to the primary.
+    """
+    routes = current_replica_routes.get()
+    if routes:
+        routes.pop(connection_name, None)
+
+
+async def lease_replicas(replica_sets:t.Dict[str, ReplicaSet]) -> None:
+    """
+    lease a client from a replica of every connection
+    and route the reads of the current request to it.
+    """
+    if _current_replica_leases.get() is not None or not replica_sets:
+        return None
+
+    leases:t.List[t.Tuple["ConnectionPool", "BaseDBAsyncClient", t.Any]] = []
+    routes:t.Dict[str, str] = dict()
+    try:
+        for name, replica_set in replica_sets.items():
+            replica = replica_set.choose()
+            pool = replica_set.pools[replica]
+            client = await pool.acquire()
+            leases.append((pool, client, current_transaction_map[replica].get()))
+            current_transaction_map[replica].set(client)
+            routes[name] = replica
+    except BaseException:
+        await _release(leases)
+        raise
+
+    _current_replica_leases.set(leases)
+    current_replica_routes.set(routes)
+
+
+async def _release(leases:t.List[t.Tuple["ConnectionPool", "BaseDBAsyncClient", t.Any]]) -> None:
+    for pool, client, previous in leases:
+        current_transaction_map[pool.connection_name].set(previous)
+        await pool.release(client)
+
+
+async def release_replicas() -> None:
+    """
+    return the replica clients leased by the current request.
+    """
+    leases = _current_replica_leases.get()
+    if leases is None:
+        return None
+
+    _current_replica_leases.set(None)
+    current_replica_routes.set(None)
+    await _release(leases)
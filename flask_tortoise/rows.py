@@ -0,0 +1,97 @@
+"""
+provide the lightweight read-only rows of `QuerySet.rows`.
+
+A row is a named tuple generated once per model and field selection,
+holding the field values converted like the model instances convert
+them, without the instance state and the change tracking of a `Model`.
+"""
+
+from tortoise.exceptions import FieldError
+
+from collections import namedtuple
+
+import threading as th
+import typing as t
+
+if t.TYPE_CHECKING:
+    from .models import Model
+
+__all__ = (
+    'RowFactory',
+    'get_row_factory',
+)
+
+_factories:t.Dict[t.Tuple[t.Type["Model"], t.Tuple[str, ...]], "RowFactory"] = dict()
+_factories_lock = th.Lock()
+
+
+def _identity(value:t.Any) -> t.Any:
+    return value
+
+
+class RowFactory(object):
+    """
+    Creates the rows of a model from the database records.
+
+    :param model:
+        the model class of the rows.
+
+    :param fields:
+        the names of the database fields of the rows, in order.
+    """
+    __slots__ = ("row_class", "fields", "_converters")
+
+    def __init__(self, model:t.Type["Model"], fields:t.Tuple[str, ...]) -> None:
+        meta = model._meta
+        unknown = [field for field in fields if field not in meta.fields_db_projection]
+        if unknown:
+            raise FieldError(f'Unknown fields {unknown} for the rows of model "{model.__name__}"')
+
+        self.fields = fields
+        self.row_class = namedtuple(f"{model.__name__}Row", fields, module=model.__module__)
+
+        # the same conversions as `Model._init_from_db`, the native
+        # fields come converted by the driver already, the others
+        # (the datetimes included) by the `to_python_value` of the field.
+        native = {model_field for _, model_field, _ in meta.db_native_fields}
+        default = {model_field: field.field_type for _, model_field, field in meta.db_default_fields}
+        converters:t.List[t.Callable[[t.Any], t.Any]] = []
+        for name in fields:
+            field = meta.fields_map[name]
+            if name in native:
+                converters.append(_identity)
+            elif name in default:
+                field_type = default[name]
+                converters.append(lambda value, field_type=field_type: None if value is None else field_type(value))
+            else:
+                converters.append(field.to_python_value)
+        self._converters = tuple(converters)
+
+    def __call__(self, record:t.Any) -> t.Any:
+        return self.row_class._make([
+            convert(record[name]) for name, convert in zip(self.fields, self._converters)
+        ])
+
+    def make_rows(self, records:t.Iterable[t.Any]) -> t.List[t.Any]:
+        """
+        return the rows of the database records.
+        """
+        if all(convert is _identity for convert in self._converters):
+            make, fields = self.row_class._make, self.fields
+            return [make([record[name] for name in fields]) for record in records]
+
+        return [self(record) for record in records]
+
+
+def get_row_factory(model:t.Type["Model"], fields:t.Tuple[str, ...]) -> RowFactory:
+    """
+    return the row factory of the model and the field selection, created once.
+    """
+    key = (model, fields)
+    factory = _factories.get(key)
+    if factory is None:
+        with _factories_lock:
+            factory = _factories.get(key)
+            if factory is None:
+                factory = _factories[key] = RowFactory(model, fields)
+    return factory
@@ -0,0 +1,125 @@
+"""
+generate the database schemas only once
+and only when the registered models have changed.
+
+A fingerprint of the models' metadata is stored inside the database
+after every schema generation, so the later startups can compare it
+and skip issuing `CREATE TABLE IF NOT EXISTS` for every model.
+"""
+
+from tortoise import Tortoise
+from tortoise.utils import generate_schema_for_client
+from tortoise.log import logger
+
+from hashlib import sha256
+
+import json as json
+import typing as t
+
+if t.TYPE_CHECKING:
+    from tortoise.backends.base.client import BaseDBAsyncClient
+    from tortoise.models import Model
+
+__all__ = (
+    'get_schema_fingerprint',
+    'generate_schemas_once',
+)
+
+#: the table used to store the schema fingerprint.
+FINGERPRINT_TABLE:str = "flask_tortoise_schema"
+
+
+def _json_default(value:t.Any) -> t.Any:
+    if hasattr(value, "__dict__"):
+        return vars(value)
+    return str(value)
+
+
+def _describe_model(model:t.Type["Model"]) -> t.Dict[str, t.Any]:
+    meta = model._meta
+    return {
+        "table": meta.db_table,
+        "fields": {
+            name: field.describe(serializable=True)
+            for name, field in meta.fields_map.items()
+        },
+        "unique_together": meta.unique_together,
+        "indexes": getattr(meta, "indexes", ()),
+    }
+
+
+def get_schema_fingerprint(connection_name:str) -> str:
+    """
+    compute the fingerprint of the tables, fields and indexes
+    of all the models registered for the connection.
+    """
+    description = {
+        model._meta.full_name: _describe_model(model)
+        for app in Tortoise.apps.values()
+        for model in app.values()
+        if model._meta.default_connection == connection_name
+    }
+    payload = json.dumps(description, sort_keys=True, default=_json_default)
+    return sha256(payload.encode("utf-8")).hexdigest()
+
+
+async def _create_fingerprint_table(client:"BaseDBAsyncClient") -> None:
+    await client.execute_script(
+        f"CREATE TABLE IF NOT EXISTS {FINGERPRINT_TABLE} (fingerprint VARCHAR(64) NOT NULL)"
+        )
+
+
+async def _get_stored_fingerprint(client:"BaseDBAsyncClient") -> t.Optional[str]:
+    _, rows = await client.execute_query(f"SELECT fingerprint FROM {FINGERPRINT_TABLE}")
+    if not rows:
+        return None
+    return dict(rows[0])["fingerprint"]
+
+
+async def _store_fingerprint(client:"BaseDBAsyncClient", fingerprint:str) -> None:
+    # the fingerprint is a hex digest, so it's safe to inline it.
+    await client.execute_script(f"DELETE FROM {FINGERPRINT_TABLE}")
+    await client.execute_script(
+        f"INSERT INTO {FINGERPRINT_TABLE} (fingerprint) VALUES ('{fingerprint}')"
+        )
+
+
+async def generate_schemas_once(
+    connections:t.Optional[t.Dict[str, "BaseDBAsyncClient"]]=None,
+    safe:bool=True, 
+    force:bool=False
+    ) -> t.Dict[str, bool]:
+    """
+    generate the schemas for every initialized connection whose stored
+    fingerprint doesn't match the registered models.
+    If `force` is `True` the schemas are generated regardless of the fingerprint.
+
+    :param connections:
+        the initialized connections by name,
+        defaults to the connections of `tortoise.Tortoise`.
+
+    Returns a dictionary of the connection names and
+    whether the schemas got generated for it.
+
+    :for example::
+
+        await Tortoise.init(db_url="sqlite://db.sqlite3", modules={"models": ["models"]})
+        await generate_schemas_once()
+    """
+    generated:t.Dict[str, bool] = dict()
+    if connections is None:
+        connections = Tortoise._connections
+
+    for name, client in connections.items():
+        fingerprint = get_schema_fingerprint(name)
+        await _create_fingerprint_table(client)
+        if not force and await _get_stored_fingerprint(client) == fingerprint:
+            logger.debug("Schemas of the connection `%s` are up to date", name)
+            generated[name] = False
+            continue
+
+        await generate_schema_for_client(client, safe)
+        await _store_fingerprint(client, fingerprint)
+        generated[name] = True
+
+    return generated
@@ -0,0 +1,53 @@
+"""
+serialize the query results to the JSON bytes,
+using `orjson` when it's installed.
+"""
+
+from decimal import Decimal
+from enum import Enum
+from uuid import UUID
+
+import datetime as dt
+import json as json
+import typing as t
+
+try:
+    import orjson as orjson
+except ImportError: # pragma: no cover
+    orjson = None
+
+__all__ = (
+    'JSON_MIMETYPE',
+    'dumps',
+)
+
+JSON_MIMETYPE:str = "application/json"
+
+
+def _default(value:t.Any) -> t.Any:
+    if isinstance(value, (dt.datetime, dt.date, dt.time)):
+        return value.isoformat()
+
+    if isinstance(value, dt.timedelta):
+        return value.total_seconds()
+
+    if isinstance(value, (Decimal, UUID)):
+        return str(value)
+
+    if isinstance(value, Enum):
+        return value.value
+
+    if isinstance(value, bytes):
+        return value.decode("utf-8")
+
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(data:t.Any) -> bytes:
+    """
+    return the JSON bytes of the data. The dates and times are dumped
+    in the ISO 8601 format, the decimals and the uuids as strings.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, default=_default)
+    return json.dumps(data, default=_default, separators=(",", ":")).encode("utf-8")
@@ -0,0 +1,96 @@
+"""
+coalesce the identical queries running at the same time.
+
+The first caller of a query (the leader) sends it to the database,
+every identical query issued while it is in flight (the followers)
+awaits the leader's result instead. Nothing is kept after the leader
+completes, so unlike `QuerySet.cache` no stale rows are ever returned.
+The in-flight queries are shared by every thread and event loop of
+the process.
+"""
+
+from concurrent import futures as cf
+
+import asyncio as aio
+import threading as th
+import typing as t
+
+if t.TYPE_CHECKING:
+    from tortoise.backends.base.client import BaseDBAsyncClient
+
+__all__ = (
+    'SingleFlightClient',
+    'single_flight_stats',
+    'reset_single_flight_stats',
+)
+
+_in_flight:t.Dict[t.Hashable, cf.Future] = dict()
+_lock = th.Lock()
+_stats:t.Dict[str, int] = dict(executed=0, coalesced=0)
+
+
+class _LeaderCancelled(Exception):
+    """The leader got cancelled before it's query completed."""
+
+
+def single_flight_stats() -> t.Dict[str, int]:
+    """
+    return the number of the executed queries and of the
+    queries saved by awaiting an identical in-flight one.
+    """
+    with _lock:
+        return dict(_stats, in_flight=len(_in_flight))
+
+
+def reset_single_flight_stats() -> None:
+    with _lock:
+        _stats.update(executed=0, coalesced=0)
+
+
+class SingleFlightClient(object):
+    """
+    A proxy of a database client which coalesces the identical
+    `execute_query` calls running at the same time.
+
+    :param client:
+        the proxied database client.
+    """
+    def __init__(self, client:"BaseDBAsyncClient") -> None:
+        self._client = client
+
+    def __getattr__(self, name:str) -> t.Any:
+        return getattr(self._client, name)
+
+    async def execute_query(self, query:str, values:t.Optional[list]=None) -> t.Any:
+        key = (self._client.connection_name, query, tuple(values) if values else None)
+        with _lock:
+            future = _in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = _in_flight[key] = cf.Future()
+                # a cancelled follower must not cancel the shared future.
+                future.set_running_or_notify_cancel()
+                _stats["executed"] += 1
+            else:
+                _stats["coalesced"] += 1
+
+        if not leader:
+            try:
+                return await aio.wrap_future(future)
+            except _LeaderCancelled:
+                return await self._client.execute_query(query, values)
+
+        try:
+            result = await self._client.execute_query(query, values)
+        except aio.CancelledError:
+            future.set_exception(_LeaderCancelled())
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with _lock:
+                del _in_flight[key]
@@ -0,0 +1,147 @@
+"""
+log the slow queries together with their query plan.
+
+Every query of a request slower than `TORTOISE_ORM_SLOW_QUERY_MS` is
+sampled by `TORTOISE_ORM_SLOW_QUERY_SAMPLE_RATE`, explained on the same
+connection and written as a single JSON line to the `flask_tortoise.slow_queries`
+logger, backed by a rotating file if `TORTOISE_ORM_SLOW_QUERY_LOG` is set.
+"""
+
+from flask import has_request_context, request
+
+from logging.handlers import RotatingFileHandler
+
+import datetime as dt
+import logging as logging
+import random as random
+import re as re
+import threading as th
+import typing as t
+
+from .serializers import dumps
+
+if t.TYPE_CHECKING:
+    from tortoise.backends.base.client import BaseDBAsyncClient
+    from .instrumentation import QueryRecord
+
+__all__ = (
+    'SlowQueryLog',
+    'get_explain_sql',
+)
+
+slow_query_logger = logging.getLogger("flask_tortoise.slow_queries")
+
+_SELECT_RE = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+
+# the rotating handlers by their file path, shared by every `SlowQueryLog`.
+_handlers:t.Dict[str, RotatingFileHandler] = dict()
+_handlers_lock = th.Lock()
+
+
+def get_explain_sql(sql:str, dialect:str) -> t.Optional[str]:
+    """
+    return the sql explaining the query plan of a select query
+    without running it, or `None` if it can't be explained.
+    """
+    if not _SELECT_RE.match(sql):
+        return None
+
+    if dialect == "sqlite":
+        return f"EXPLAIN QUERY PLAN {sql}"
+    if dialect in ("postgres", "mysql"):
+        return f"EXPLAIN {sql}"
+    return None
+
+
+def _get_handler(path:str, max_bytes:int, backup_count:int) -> RotatingFileHandler:
+    with _handlers_lock:
+        handler = _handlers.get(path)
+        if handler is None:
+            handler = _handlers[path] = RotatingFileHandler(
+                path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+        return handler
+
+
+class SlowQueryLog(object):
+    """
+    The log of the slow queries.
+
+    :param threshold_ms:
+        the duration in milliseconds from which a query is slow.
+
+    :param sample_rate:
+        the fraction of the slow queries logged, between `0` and `1`.
+
+    :param path:
+        the file the slow queries are written to, rotated at `max_bytes`.
+        Without it the records only go to the `flask_tortoise.slow_queries` logger.
+
+    :param explain:
+        whether to capture the query plan of the slow select queries.
+    """
+    def __init__(
+        self,
+        threshold_ms:float,
+        sample_rate:float=1.0,
+        path:t.Optional[str]=None,
+        explain:bool=True,
+        max_bytes:int=10 * 1024 * 1024,
+        backup_count:int=5
+        ) -> None:
+        if not 0 <= sample_rate <= 1:
+            raise ValueError(f"The slow query sample rate must be between 0 and 1. Got: {sample_rate}")
+
+        self.threshold = threshold_ms / 1000
+        self.sample_rate = sample_rate
+        self.explain = explain
+        self.logger = slow_query_logger
+        if path is not None:
+            handler = _get_handler(path, max_bytes, backup_count)
+            if handler not in self.logger.handlers:
+                self.logger.addHandler(handler)
+        if self.logger.level == logging.NOTSET:
+            self.logger.setLevel(logging.WARNING)
+
+    def should_capture(self, record:"QueryRecord") -> bool:
+        if record.duration < self.threshold:
+            return False
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    async def _explain(self, client:"BaseDBAsyncClient", sql:str) -> t.Optional[t.List[t.Dict[str, t.Any]]]:
+        explain_sql = get_explain_sql(sql, client.capabilities.dialect)
+        if explain_sql is None:
+            return None
+
+        try:
+            return [dict(row) for row in await client.execute_query_dict(explain_sql)]
+        except Exception as e:
+            # a failing plan must never fail the request.
+            return [{"error": str(e)}]
+
+    async def capture(
+        self,
+        client:"BaseDBAsyncClient",
+        record:"QueryRecord",
+        values:t.Optional[list]=None
+        ) -> None:
+        """
+        explain the slow query on it's client and log it.
+        """
+        entry:t.Dict[str, t.Any] = dict(
+            timestamp=dt.datetime.now(dt.timezone.utc).isoformat(),
+            duration_ms=round(record.duration * 1000, 3),
+            sql=record.sql,
+            values=list(values) if values else None,
+            rows=record.rows,
+            connection=record.connection_name,
+            fingerprint=record.fingerprint,
+        )
+        if has_request_context():
+            entry.update(endpoint=request.endpoint, method=request.method, path=request.path)
+
+        if self.explain:
+            entry["plan"] = await self._explain(client, record.sql)
+
+        self.logger.warning(dumps(entry).decode("utf-8"))
@@ -0,0 +1,155 @@
+"""
+turn the async streams of the model instances into
+chunked flask streaming responses.
+
+Flask iterates a response body synchronously, so the stream is
+driven by a dedicated event loop while the response is sent and the
+request context (and it's leased connection) is kept until the end.
+"""
+
+from flask import Response, stream_with_context
+
+from io import StringIO
+
+import asyncio as aio
+import csv as csv
+import typing as t
+
+from .serializers import dumps
+
+if t.TYPE_CHECKING:
+    from .models import Model
+    from .queryset import QuerySet
+
+__all__ = (
+    'STREAM_FORMATS',
+    'model_to_dict',
+    'iter_sync',
+    'stream_response',
+)
+
+#: the mimetypes of the supported streaming formats.
+STREAM_FORMATS:t.Dict[str, str] = {
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+    "csv": "text/csv",
+}
+
+
+def model_to_dict(instance:"Model", fields:t.Optional[t.Sequence[str]]=None) -> t.Dict[str, t.Any]:
+    """
+    return the database fields (or the given ``fields``) of the model instance.
+    """
+    if fields is None:
+        fields = list(instance._meta.fields_db_projection.keys())
+    return {field: getattr(instance, field) for field in fields}
+
+
+def iter_sync(iterable:t.AsyncIterable[t.Any]) -> t.Iterator[t.Any]:
+    """
+    iterate over an async iterable from the synchronous code,
+    using a new event loop for the whole iteration.
+    """
+    loop = aio.new_event_loop()
+    iterator = iterable.__aiter__()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(iterator.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        try:
+            if hasattr(iterator, "aclose"):
+                loop.run_until_complete(iterator.aclose())
+            loop.run_until_complete(loop.shutdown_asyncgens())
+        finally:
+            loop.close()
+
+
+def _dump_csv_row(row:t.Iterable[t.Any]) -> str:
+    buffer = StringIO()
+    csv.writer(buffer).writerow(row)
+    return buffer.getvalue()
+
+
+def _iter_lines(
+    instances:t.AsyncIterable["Model"],
+    format:str,
+    serializer:t.Callable[["Model"], t.Any],
+    ) -> t.Iterator[bytes]:
+    # the same dumps as `QuerySet.to_json`, so the rows look the
+    # same on every endpoint and the flask version doesn't matter.
+    first = True
+    if format == "json":
+        yield b"["
+
+    for instance in iter_sync(instances):
+        data = serializer(instance)
+        if format == "ndjson":
+            yield dumps(data) + b"\n"
+
+        elif format == "json":
+            yield dumps(data) if first else b"," + dumps(data)
+
+        else:
+            if first:
+                yield _dump_csv_row(data.keys()).encode("utf-8")
+            yield _dump_csv_row(data.values()).encode("utf-8")
+        first = False
+
+    if format == "json":
+        yield b"]"
+
+
+def stream_response(
+    instances:t.Union["QuerySet", t.AsyncIterable["Model"]],
+    format:str="ndjson",
+    fields:t.Optional[t.Sequence[str]]=None,
+    serializer:t.Optional[t.Callable[["Model"], t.Any]]=None,
+    chunk_size:int=1000,
+    filename:t.Optional[str]=None,
+    ) -> Response:
+    """
+    return a chunked streaming response of the queryset rows
+    (or any other async iterable of the model instances),
+    fetched in the batches of `QuerySet.iter_chunks`.
+
+    :param format:
+        one of `ndjson`, `json` (a single array) or `csv`.
+
+    :param fields:
+        the fields of every row, defaults to all the database fields.
+
+    :param serializer:
+        a callable returning a dictionary of a model instance,
+        overrides the `fields`.
+
+    :param chunk_size:
+        the number of the rows fetched at once.
+
+    :param filename:
+        send the response as an attachment with this file name.
+
+    :for example::
+
+        @app.get("/todos.csv")
+        async def export_todos():
+            return stream_response(Todo.all(), format="csv", fields=["id", "title"])
+    """
+    if format not in STREAM_FORMATS:
+        raise ValueError(f"The stream format must be one of {list(STREAM_FORMATS)}. Got: {format}")
+
+    if hasattr(instances, "stream"):
+        instances = instances.stream(chunk_size)
+
+    if serializer is None:
+        serializer = lambda instance: model_to_dict(instance, fields)
+
+    response = Response(
+        stream_with_context(_iter_lines(instances, format, serializer)),
+        mimetype=STREAM_FORMATS[format],
+        )
+    if filename is not None:
+        response.headers["Content-Disposition"] = f"attachment; filename={filename}"
+    return response
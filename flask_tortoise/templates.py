@@ -0,0 +1,226 @@
+"""
+cache the compiled sql of the repeated query shapes.
+
+The shape of a queryset is everything changing it's sql except the
+values of it's filters, so `get_or_404(pk=1)` and `get_or_404(pk=2)`
+share a shape. The sql of a shape is rendered once, with the filter
+values as the placeholders of the driver, and cached in :data:`template_cache`.
+Every later queryset of the shape only binds it's own values, skipping
+the query builder. The size is set by `TORTOISE_ORM_SQL_TEMPLATE_CACHE_SIZE`.
+"""
+
+from tortoise.filters import not_equal
+from tortoise.query_utils import Q
+from pypika.terms import Term
+
+from copy import copy
+
+import operator as operator
+import re as re
+import typing as t
+
+from .cache import TTLCache
+
+if t.TYPE_CHECKING:
+    from tortoise.fields import Field
+    from .models import MODEL
+
+__all__ = (
+    'SQLTemplate',
+    'template_cache',
+    'get_placeholder',
+    'get_shape',
+    'mark_q_objects',
+    'compile_template',
+    'get_pk_template',
+)
+
+#: the compiled sql templates by the queryset shape.
+template_cache = TTLCache(maxsize=512)
+
+#: the filter operators whose value is bound as a parameter.
+_OPERATORS:t.Tuple[t.Callable, ...] = (
+    operator.eq, not_equal, operator.gt, operator.ge, operator.lt, operator.le,
+)
+
+_MARKER_RE = re.compile("\x00(\\d+)\x00")
+
+Shape = t.Tuple[t.Any, ...]
+Param = t.Tuple["Field", t.Any]
+
+
+class _Marker(Term):
+    """
+    A filter value rendered as a token, replaced by a placeholder once
+    the sql is rendered, so the order of the parameters is known.
+    """
+    def __init__(self, idx:int) -> None:
+        super(_Marker, self).__init__()
+        self.idx = idx
+
+    def get_sql(self, **kwargs:t.Any) -> str:
+        return f"\x00{self.idx}\x00"
+
+
+class SQLTemplate(object):
+    """
+    The compiled sql of a queryset shape.
+
+    :param sql:
+        the sql with the placeholders of the driver.
+
+    :param order:
+        the index of the filter value bound to each placeholder.
+
+    :param tables:
+        the tables read by the query, for the query cache.
+    """
+    __slots__ = ("sql", "order", "tables")
+
+    def __init__(self, sql:str, order:t.Tuple[int, ...], tables:t.FrozenSet[str]) -> None:
+        self.sql = sql
+        self.order = order
+        self.tables = tables
+
+    def bind(self, values:t.Sequence[t.Any]) -> t.List[t.Any]:
+        """
+        return the values in the order of the placeholders.
+        """
+        return [values[idx] for idx in self.order]
+
+    def __repr__(self) -> str:
+        return f"<SQLTemplate {self.sql!r}>"
+
+
+def get_placeholder(dialect:str, position:int) -> t.Optional[str]:
+    """
+    return the parameter placeholder of the dialect at the
+    1-based position, or `None` if it's not supported.
+    """
+    if dialect == "sqlite":
+        return "?"
+    if dialect == "mysql":
+        return "%s"
+    if dialect == "postgres":
+        return f"${position}"
+    return None
+
+
+def _get_q_shape(model:t.Type["MODEL"], q:Q, params:t.List[Param]) -> t.Optional[Shape]:
+    if q.children:
+        children = []
+        for child in q.children:
+            shape = _get_q_shape(model, child, params)
+            if shape is None:
+                return None
+            children.append(shape)
+        return (q.join_type, q._is_negated, tuple(children))
+
+    meta = model._meta
+    keys = []
+    for key, value in q.filters.items():
+        if key.split("__", 1)[0] in meta.fetch_fields or isinstance(value, Term):
+            return None
+
+        if value is None:
+            # rendered as `IS NULL`, there is nothing to bind.
+            if f"{key}__isnull" not in meta.filters:
+                return None
+            keys.append((key, None))
+            continue
+
+        param = meta.filters.get(key)
+        if param is None or param.get("table") or param.get("value_encoder") or param["operator"] not in _OPERATORS:
+            return None
+
+        params.append((meta.fields_map[param["field"]], value))
+        keys.append((key, True))
+    return (q.join_type, q._is_negated, tuple(keys))
+
+
+def get_shape(model:t.Type["MODEL"], q_objects:t.Sequence[Q]) -> t.Optional[t.Tuple[Shape, t.List[Param]]]:
+    """
+    return the shape of the filters and their values with the
+    fields encoding them, or `None` if a filter can't be bound.
+    """
+    params:t.List[Param] = []
+    shapes = []
+    for q in q_objects:
+        shape = _get_q_shape(model, q, params)
+        if shape is None:
+            return None
+        shapes.append(shape)
+    return tuple(shapes), params
+
+
+def _mark_q(q:Q, counter:t.List[int]) -> Q:
+    marked = copy(q)
+    if q.children:
+        marked.children = tuple(_mark_q(child, counter) for child in q.children)
+        return marked
+
+    filters = dict()
+    for key, value in q.filters.items():
+        if value is not None:
+            value = _Marker(counter[0])
+            counter[0] += 1
+        filters[key] = value
+    marked.filters = filters
+    return marked
+
+
+def mark_q_objects(q_objects:t.Sequence[Q]) -> t.List[Q]:
+    """
+    return copies of the filters with their values replaced by the markers,
+    in the order `get_shape` returns the values.
+    """
+    counter = [0]
+    return [_mark_q(q, counter) for q in q_objects]
+
+
+def compile_template(sql:str, dialect:str, tables:t.Iterable[str]) -> t.Optional[SQLTemplate]:
+    """
+    replace the markers of the rendered sql by the placeholders of the dialect.
+    """
+    if get_placeholder(dialect, 1) is None:
+        return None
+
+    if dialect == "mysql":
+        # the driver formats the whole query when there are parameters.
+        sql = sql.replace("%", "%%")
+
+    order:t.List[int] = []
+
+    def replace(match:"re.Match") -> str:
+        order.append(int(match.group(1)))
+        return t.cast(str, get_placeholder(dialect, len(order)))
+
+    return SQLTemplate(_MARKER_RE.sub(replace, sql), tuple(order), frozenset(tables))
+
+
+def get_pk_template(
+    model:t.Type["MODEL"],
+    dialect:str,
+    count:t.Optional[int]=None
+    ) -> t.Optional[SQLTemplate]:
+    """
+    return the compiled sql selecting the rows of the model by a single
+    primary key, or by `count` of them with `IN`, or `None` if the
+    dialect isn't supported.
+    """
+    key = ("pk", model, dialect, count)
+    template = template_cache.get(key)
+    if template is None:
+        if get_placeholder(dialect, 1) is None:
+            return None
+
+        meta = model._meta
+        column = meta.basetable[meta.db_pk_column]
+        if count is None:
+            criterion = column == _Marker(0)
+        else:
+            criterion = column.isin([_Marker(idx) for idx in range(count)])
+        query = copy(meta.basequery_all_fields).where(criterion)
+        template = compile_template(query.get_sql(), dialect, (meta.db_table,))
+        template_cache.set(key, template)
+    return template
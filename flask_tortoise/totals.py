@@ -0,0 +1,142 @@
+"""
+provide the total count strategies of the pagination.
+
+* `exact` runs a `COUNT(*)` query for every page.
+* `cached` caches the exact count per normalized count query for a ttl.
+* `window` fetches the total with the page rows by a single
+  `COUNT(*) OVER ()` query, falls back to the `exact` strategy
+  on the databases without the window functions.
+* `estimated` reads the planner statistics of the database
+  (sqlite `sqlite_stat1`, postgres `reltuples` or the `EXPLAIN`
+  row estimate) and falls back to the `cached` strategy
+  when no estimate is available.
+"""
+
+from tortoise.exceptions import OperationalError
+
+from .cache import TTLCache
+
+import json as json
+import sqlite3 as sqlite3
+import typing as t
+
+if t.TYPE_CHECKING:
+    from tortoise.backends.base.client import BaseDBAsyncClient
+    from .queryset import QuerySet
+
+__all__ = (
+    'TOTAL_STRATEGIES',
+    'total_cache',
+    'get_total',
+    'supports_window_functions',
+)
+
+TOTAL_STRATEGIES:t.Tuple[str, ...] = ("exact", "cached", "estimated", "window")
+
+#: the cached exact counts, by connection name and count query.
+total_cache = TTLCache(maxsize=1024)
+
+
+def supports_window_functions(client:"BaseDBAsyncClient") -> bool:
+    """
+    whether the database of the client supports `COUNT(*) OVER ()`.
+    The mysql servers older than 8.0 raise an `OperationalError` instead.
+    """
+    dialect = client.capabilities.dialect
+    if dialect == "sqlite":
+        return sqlite3.sqlite_version_info >= (3, 25, 0)
+    return dialect in ("postgres", "mysql")
+
+
+async def _fetch_rows(client:"BaseDBAsyncClient", sql:str) -> t.List[t.Dict[str, t.Any]]:
+    _, rows = await client.execute_query(sql)
+    return [dict(row) for row in rows]
+
+
+async def _estimate_table_rows(client:"BaseDBAsyncClient", table:str) -> t.Optional[int]:
+    dialect = client.capabilities.dialect
+    # the table name comes from the model metadata, never from the user input.
+    if dialect == "sqlite":
+        rows = await _fetch_rows(client, f"SELECT stat FROM sqlite_stat1 WHERE tbl = '{table}'")
+        for row in rows:
+            return int(str(row["stat"]).split()[0])
+
+    elif dialect == "postgres":
+        rows = await _fetch_rows(
+            client, f"SELECT reltuples::bigint AS estimate FROM pg_class WHERE relname = '{table}'"
+            )
+        if rows and rows[0]["estimate"] is not None and rows[0]["estimate"] >= 0:
+            return int(rows[0]["estimate"])
+
+    elif dialect == "mysql":
+        rows = await _fetch_rows(
+            client,
+            f"SELECT TABLE_ROWS AS estimate FROM information_schema.TABLES "
+            f"WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = '{table}'"
+            )
+        if rows and rows[0]["estimate"] is not None:
+            return int(rows[0]["estimate"])
+
+    return None
+
+
+async def _estimate_query_rows(client:"BaseDBAsyncClient", sql:str) -> t.Optional[int]:
+    if client.capabilities.dialect != "postgres":
+        return None
+
+    rows = await _fetch_rows(client, f"EXPLAIN (FORMAT JSON) {sql}")
+    if not rows:
+        return None
+
+    plan = list(rows[0].values())[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def estimate_total(queryset:"QuerySet") -> t.Optional[int]:
+    """
+    estimate the number of the rows matching the queryset
+    from the planner statistics or return `None`.
+    """
+    client = queryset._db or queryset._choose_db()
+    filtered = bool(
+        queryset._q_objects or queryset._custom_filters or queryset._limit or queryset._offset
+        )
+    try:
+        if not filtered:
+            return await _estimate_table_rows(client, queryset.model._meta.db_table)
+        return await _estimate_query_rows(client, queryset.all().sql())
+    except OperationalError:
+        # e.g. the statistics table doesn't exist before the first `ANALYZE`.
+        return None
+
+
+async def get_total(
+    queryset:"QuerySet",
+    strategy:str="exact",
+    ttl:t.Optional[float]=60
+    ) -> t.Tuple[int, bool]:
+    """
+    count the rows matching the queryset with the given strategy.
+    Returns the total and whether it's an estimate.
+    """
+    if strategy not in TOTAL_STRATEGIES:
+        raise ValueError(f"The pagination total strategy must be one of {list(TOTAL_STRATEGIES)}. Got: {strategy}")
+
+    if strategy == "estimated":
+        estimate = await estimate_total(queryset)
+        if estimate is not None:
+            return estimate, True
+        strategy = "cached"
+
+    query = queryset.count()
+    if strategy in ("exact", "window"):
+        return await query, False
+
+    key = (queryset.model._meta.default_connection, query.sql())
+    total = total_cache.get(key)
+    if total is None:
+        total = await query
+        total_cache.set(key, total, ttl=ttl)
+    return total, False
@@ -2,8 +2,9 @@ from datetime import datetime
 
 import flask
 import pytest
+import pytest_asyncio
 
-from flask_tortoise import Tortoise, fields
+from flask_tortoise import Tortoise, Tortoiser, fields
 
 
 @pytest.fixture
@@ -15,6 +16,14 @@ def app(request):
     return app
 
 
+@pytest_asyncio.fixture
+async def orm():
+    await Tortoiser.init(db_url="sqlite://:memory:", modules={"models": ["models"]})
+    await Tortoiser.generate_schemas()
+    yield
+    await Tortoiser.close_connections()
+
+
 @pytest.fixture
 def db(app):
     return Tortoise(app)
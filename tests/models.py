@@ -0,0 +1,45 @@
+from flask_tortoise import Tortoise, fields
+from flask_tortoise.models import Manager
+
+db = Tortoise()
+
+
+class Todo(db.Model):
+    id = fields.IntField(pk=True)
+    title = fields.CharField(max_length=60)
+    text = fields.CharField(max_length=60)
+    done = fields.BooleanField(default=False)
+    pub_date = fields.DatetimeField(null=True)
+
+    class Meta:
+        table = "todos"
+        manager = Manager()
+
+
+class Author(db.Model):
+    id = fields.IntField(pk=True)
+    name = fields.CharField(max_length=60)
+
+    class Meta:
+        table = "authors"
+        manager = Manager()
+
+
+class Book(db.Model):
+    id = fields.IntField(pk=True)
+    title = fields.CharField(max_length=60)
+    author = fields.ForeignKeyField("models.Author", related_name="books")
+
+    class Meta:
+        table = "books"
+        manager = Manager()
+
+
+class Tag(db.Model):
+    id = fields.IntField(pk=True)
+    name = fields.CharField(max_length=60)
+    books = fields.ManyToManyField("models.Book", related_name="tags", through="book_tags")
+
+    class Meta:
+        table = "tags"
+        manager = Manager()
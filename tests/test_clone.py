@@ -0,0 +1,56 @@
+import pytest
+from tortoise.functions import Count
+from tortoise.query_utils import Prefetch
+
+from models import Author, Book, Todo
+
+
+@pytest.mark.asyncio
+async def test_chaining_shares_the_unchanged_containers(orm):
+    base = Todo.filter(done=False)
+    chained = base.order_by("id").limit(10).offset(5)
+
+    assert chained._q_objects is base._q_objects
+    assert chained._annotations is base._annotations
+
+
+@pytest.mark.asyncio
+async def test_the_changing_methods_clone_once(orm, monkeypatch):
+    from flask_tortoise.queryset import QuerySet
+
+    base = Author.all()
+    clone = QuerySet._clone
+    clones = []
+    monkeypatch.setattr(QuerySet, "_clone", lambda self: clones.append(self) or clone(self))
+
+    base.filter(name="a").exclude(name="b").annotate(count=Count("id"))
+    base.select_related("books").prefetch_related("books")
+    assert len(clones) == 5
+
+
+@pytest.mark.asyncio
+async def test_clones_never_change_their_parent(orm):
+    base = Todo.filter(done=False)
+    filtered = base.filter(title="title")
+    annotated = base.annotate(count=Count("id"))
+    related = Book.all()
+    selected = related.select_related("author")
+    prefetched = Author.all().prefetch_related(Prefetch("books", Book.filter(title="x")))
+
+    assert (len(base._q_objects), len(filtered._q_objects)) == (1, 2)
+    assert not base._annotations and "count" in annotated._annotations
+    assert not base._custom_filters and annotated._custom_filters
+    assert not related._select_related and selected._select_related == {"author"}
+    assert not Author.all()._prefetch_queries and prefetched._prefetch_queries
+
+
+@pytest.mark.asyncio
+async def test_executing_keeps_the_prefetch_queries(orm):
+    author = await Author.create(name="author")
+    await Book.create(title="book", author=author)
+
+    base = Author.all().prefetch_related(Prefetch("books", Book.all()))
+    clone = base.filter(name="author")
+    for queryset in (clone, clone, base):
+        assert [len(a.books) for a in await queryset] == [1]
+    assert [len(queries) for queries in base._prefetch_queries.values()] == [1]
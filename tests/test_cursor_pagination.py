@@ -0,0 +1,102 @@
+import flask
+import pytest
+from tortoise.exceptions import FieldError
+from tortoise.functions import Count
+from werkzeug.exceptions import NotFound
+
+from flask_tortoise import CursorPagination
+
+from models import Author, Book, Todo
+
+
+@pytest.fixture
+def app():
+    app = flask.Flask(__name__)
+    app.config["SECRET_KEY"] = "secret"
+    return app
+
+
+async def create_todos(count):
+    for i in range(count):
+        await Todo.create(title=f"todo-{i % 3}", text=str(i))
+
+
+@pytest.mark.asyncio
+async def test_paginate_cursor_walks_all_pages(app, orm):
+    await create_todos(7)
+
+    with app.test_request_context("/"):
+        p = await Todo.paginate_cursor(per_page=3, order_by="-title")
+        assert isinstance(p, CursorPagination)
+        assert not p.has_prev and p.has_next
+
+        seen = [todo.id for todo in p.items]
+        while p.has_next:
+            p = await p.next()
+            seen += [todo.id for todo in p.items]
+
+        assert len(seen) == len(set(seen)) == 7
+        assert [todo.text for todo in p.items] == ["6"]
+
+        p = await p.prev()
+        assert [todo.text for todo in p.items] == ["4", "0", "3"]
+        assert p.has_next and p.has_prev
+
+
+@pytest.mark.asyncio
+async def test_paginate_cursor_reads_the_request_args(app, orm):
+    await create_todos(5)
+
+    with app.test_request_context("/?per_page=2"):
+        first = await Todo.paginate_cursor()
+        assert [todo.id for todo in first.items] == [1, 2]
+
+    with app.test_request_context(f"/?per_page=2&after={first.next_cursor}"):
+        second = await Todo.paginate_cursor()
+        assert [todo.id for todo in second.items] == [3, 4]
+        assert second.has_prev
+
+    with app.test_request_context(f"/?per_page=2&before={second.prev_cursor}"):
+        assert [todo.id for todo in (await Todo.paginate_cursor()).items] == [1, 2]
+
+    # the last page doesn't fall back to the `after` argument of the request.
+    with app.test_request_context(f"/?per_page=3&after={first.next_cursor}"):
+        last = await Todo.paginate_cursor()
+        assert [todo.id for todo in last.items] == [3, 4, 5]
+        assert not last.has_next and await last.next() is None
+
+
+@pytest.mark.asyncio
+async def test_paginate_cursor_rejects_tampered_cursors(app, orm):
+    await create_todos(3)
+
+    with app.test_request_context("/"):
+        p = await Todo.paginate_cursor(per_page=1)
+
+        with pytest.raises(NotFound):
+            await Todo.paginate_cursor(after=p.next_cursor + "x", per_page=1)
+
+        with pytest.raises(NotFound):
+            await Todo.paginate_cursor(after=p.next_cursor, per_page=1, order_by="-id")
+
+        p = await Todo.paginate_cursor(after="garbage", per_page=1, error_out=False)
+        assert [todo.id for todo in p.items] == [1]
+
+
+@pytest.mark.asyncio
+async def test_paginate_cursor_rejects_related_and_annotated_orderings(app, orm):
+    author = await Author.create(name="author")
+    await Book.create(title="book", author=author)
+
+    with app.test_request_context("/"):
+        with pytest.raises(FieldError):
+            await Book.all().paginate_cursor(order_by="author__name")
+
+        with pytest.raises(FieldError):
+            await Book.all().paginate_cursor(order_by="author")
+
+        with pytest.raises(FieldError):
+            await Author.annotate(count=Count("books")).paginate_cursor(order_by="-count")
+
+        p = await Book.all().paginate_cursor(order_by="author_id")
+        assert [book.title for book in p.items] == ["book"]
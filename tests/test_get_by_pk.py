@@ -0,0 +1,50 @@
+import pytest
+from werkzeug.exceptions import NotFound
+
+from flask_tortoise import Tortoiser
+
+from models import Todo
+
+
+@pytest.fixture
+def queries(monkeypatch):
+    client = Tortoiser.get_connection("default")
+    queries = []
+    execute_query = client.execute_query
+
+    async def _execute_query(sql, values=None):
+        queries.append((sql, values))
+        return await execute_query(sql, values)
+
+    monkeypatch.setattr(client, "execute_query", _execute_query)
+    return queries
+
+
+@pytest.mark.asyncio
+async def test_get_by_pk(orm, queries):
+    todo = await Todo.create(title="title", text="text")
+    queries.clear()
+
+    assert (await Todo.get_by_pk(todo.id)).title == "title"
+    assert (await Todo.get_by_pk(str(todo.id))).id == todo.id
+    assert await Todo.get_by_pk(todo.id + 1) is None
+    assert await Todo.get_by_pk("x") is None
+    with pytest.raises(NotFound):
+        await Todo.get_by_pk_or_404(todo.id + 1, description="missing")
+
+    sql, values = queries[0]
+    assert sql.endswith('WHERE "id"=?') and values == [todo.id]
+
+
+@pytest.mark.asyncio
+async def test_get_many_by_pk(orm, queries):
+    for i in range(4):
+        await Todo.create(title=str(i), text="text")
+    queries.clear()
+
+    todos = await Todo.get_many_by_pk([3, "1", 9, 3])
+    assert [todo.title for todo in todos] == ["2", "0"]
+
+    # the 3 keys are padded to the compiled select of 4 placeholders.
+    (sql, values), = queries
+    assert sql.endswith('WHERE "id" IN (?,?,?,?)') and values == [3, 1, 9, 9]
@@ -0,0 +1,62 @@
+import flask
+import pytest
+from werkzeug.exceptions import NotFound
+
+from flask_tortoise.identity import clear_identity_map
+
+
+@pytest.fixture
+def queries(orm, monkeypatch):
+    from flask_tortoise import Tortoiser
+
+    client = Tortoiser.get_connection("default")
+    executed = []
+    execute_query = client.execute_query
+
+    async def _execute_query(sql, values=None):
+        executed.append(sql)
+        return await execute_query(sql, values)
+
+    monkeypatch.setattr(client, "execute_query", _execute_query)
+    return executed
+
+
+@pytest.mark.asyncio
+async def test_identity_map(queries):
+    from models import Todo
+
+    await Todo.create(title="a", text="")
+    await Todo.create(title="b", text="")
+    app = flask.Flask(__name__)
+
+    with app.test_request_context():
+        queries.clear()
+        todo = await Todo.get_or_404(pk=1)
+        assert await Todo.get_or_404(pk="1") is todo
+        assert await Todo.first_or_404(id=1, description="not found") is todo
+        assert await Todo.filter(pk=1).first() is todo
+        assert len(queries) == 1
+
+        # not a plain primary key lookup.
+        assert (await Todo.get_or_404(pk=1, title="a")) is not todo
+        assert len(queries) == 2
+
+        with pytest.raises(NotFound):
+            await Todo.get_or_404(pk=3)
+
+        # the writes forget the loaded instances of the model.
+        await Todo.filter(pk=1).update(title="c")
+        assert (await Todo.get_or_404(pk=1)).title == "c"
+
+        clear_identity_map()
+        queries.clear()
+        await Todo.get_or_404(pk=2)
+        assert len(queries) == 1
+
+    with app.test_request_context():
+        # every request starts with an empty map.
+        assert await Todo.get_or_404(pk=2) is not None
+        assert len(queries) == 2
+
+    # there is no map outside of a request.
+    assert await Todo.get_or_404(pk=2) is not await Todo.get_or_404(pk=2)
@@ -0,0 +1,26 @@
+import pytest
+
+from flask_tortoise import Tortoiser
+
+from models import Todo
+
+
+@pytest.mark.asyncio
+async def test_models_registry_is_reused(monkeypatch):
+    Tortoiser.clear_models_registry()
+    await Tortoiser.init(db_url="sqlite://:memory:", modules={"models": ["models"]})
+    await Tortoiser.close_connections()
+    assert len(Tortoiser._models_registry) == 1
+
+    def discover(*args, **kwargs):
+        raise AssertionError("the models should not be discovered again")
+
+    monkeypatch.setattr(Tortoiser, "_discover_models", discover)
+    await Tortoiser.init(db_url="sqlite://:memory:", modules={"models": ["models"]})
+    try:
+        assert Tortoiser.apps["models"]["Todo"] is Todo
+        assert Todo._meta.default_connection == "default"
+        await Tortoiser.generate_schemas()
+        assert await Todo.all().count() == 0
+    finally:
+        await Tortoiser.close_connections()
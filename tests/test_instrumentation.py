@@ -0,0 +1,52 @@
+import asyncio as aio
+
+import flask
+import pytest
+
+from flask_tortoise.instrumentation import fingerprint, get_query_collector
+
+from models import db, Todo
+
+
+def test_fingerprint_replaces_the_literals():
+    assert fingerprint(
+        "SELECT \"id\" FROM \"todos\" WHERE \"id\" IN (1, 2,3) AND \"title\"='it''s'  LIMIT 10"
+    ) == "SELECT \"id\" FROM \"todos\" WHERE \"id\" IN (...) AND \"title\"=? LIMIT ?"
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = flask.Flask(__name__)
+    app.config["TORTOISE_ORM_DATABASE_URI"] = f"sqlite://{tmp_path / 'app.sqlite3'}"
+    app.config["TORTOISE_ORM_MODELS"] = "models"
+    app.config["TORTOISE_ORM_GENERATE_SCHEMAS"] = True
+    app.config["TORTOISE_ORM_POOL_MODE"] = "persistent"
+    app.config["TORTOISE_ORM_QUERY_TIMING_HEADERS"] = True
+    db.init_app(app)
+    yield app
+    aio.run(db.close_pools())
+
+
+def test_queries_are_recorded_per_request(app):
+
+    @app.get("/")
+    async def index():
+        await Todo.create(title="title", text="text")
+        for pk in (1, 2):
+            await Todo.filter(pk=pk).first()
+
+        collector = get_query_collector()
+        records = collector.records
+        assert [record.rows for record in records] == [1, 1, 0]
+        assert records[1].fingerprint == records[2].fingerprint
+        assert all(record.duration >= 0 for record in records)
+        return str(collector.count)
+
+    client = app.test_client()
+    response = client.get("/")
+    assert response.data == b"3"
+    assert response.headers["X-DB-Queries"] == "3"
+    assert response.headers["Server-Timing"].startswith("db;dur=")
+
+    # every request gets it's own collector.
+    assert client.get("/").headers["X-DB-Queries"] == "3"
@@ -0,0 +1,78 @@
+import asyncio as aio
+
+import pytest
+from werkzeug.exceptions import NotFound
+
+
+@pytest.mark.asyncio
+async def test_model_load(orm, monkeypatch):
+    from flask_tortoise import Tortoiser
+    from models import Todo
+
+    for i in range(3):
+        await Todo.create(title=str(i), text="")
+
+    client = Tortoiser.get_connection("default")
+    queries = []
+    execute_query = client.execute_query
+
+    async def _execute_query(sql, values=None):
+        queries.append(sql)
+        return await execute_query(sql, values)
+
+    monkeypatch.setattr(client, "execute_query", _execute_query)
+
+    todos = await aio.gather(Todo.load(3), Todo.load("1"), Todo.load(3), Todo.load(2))
+    assert [todo.title for todo in todos] == ["2", "0", "2", "1"]
+    assert len(queries) == 1 and " IN (" in queries[0]
+
+    results = await aio.gather(Todo.load(1), Todo.load(9, description="missing"), return_exceptions=True)
+    assert results[0].title == "0"
+    assert isinstance(results[1], NotFound) and results[1].description == "missing"
+    assert len(queries) == 2
+
+    with pytest.raises(NotFound):
+        await Todo.load("not-a-pk")
+
+    # the sequential lookups run their own queries.
+    await Todo.load(1)
+    await Todo.load(2)
+    assert len(queries) == 4
+
+
+@pytest.mark.asyncio
+async def test_model_load_inside_a_transaction(orm):
+    from tortoise.transactions import in_transaction
+    from models import Todo
+
+    await Todo.create(title="0", text="")
+
+    async with in_transaction() as conn:
+        todo = await Todo.create(title="1", text="", using_db=conn)
+        # the lookups of the transaction see it's uncommitted rows.
+        todos = await aio.gather(Todo.load(todo.pk), Todo.load(1, using_db=conn))
+        assert [todo.title for todo in todos] == ["1", "0"]
+
+
+@pytest.mark.asyncio
+async def test_model_load_doesnt_batch_across_transactions(orm):
+    from tortoise.transactions import in_transaction
+    from models import Todo
+
+    await Todo.create(title="0", text="")
+    created = aio.Event()
+
+    async def outside():
+        await created.wait()
+        return await Todo.load(1)
+
+    async def inside():
+        async with in_transaction():
+            todo = await Todo.create(title="1", text="")
+            created.set()
+            # let the lookup outside of the transaction schedule the batch first.
+            await aio.sleep(0)
+            return await Todo.load(todo.pk)
+
+    todos = await aio.wait_for(aio.gather(outside(), inside()), 2)
+    assert [todo.title for todo in todos] == ["0", "1"]
@@ -0,0 +1,60 @@
+import asyncio as aio
+
+import flask
+import pytest
+
+from flask_tortoise.metrics import Histogram, metrics
+
+from models import db, Todo
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency_seconds", "The latency.", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(value, operation="select")
+
+    assert histogram.expose()[2:] == [
+        'latency_seconds_bucket{operation="select",le="0.1"} 1',
+        'latency_seconds_bucket{operation="select",le="1.0"} 3',
+        'latency_seconds_bucket{operation="select",le="+Inf"} 4',
+        'latency_seconds_sum{operation="select"} 6.05',
+        'latency_seconds_count{operation="select"} 4',
+    ]
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = flask.Flask(__name__)
+    app.config["TORTOISE_ORM_DATABASE_URI"] = f"sqlite://{tmp_path / 'app.sqlite3'}"
+    app.config["TORTOISE_ORM_MODELS"] = "models"
+    app.config["TORTOISE_ORM_GENERATE_SCHEMAS"] = True
+    app.config["TORTOISE_ORM_POOL_MODE"] = "persistent"
+    app.config["TORTOISE_ORM_POOL_MIN_SIZE"] = 2
+    app.config["TORTOISE_ORM_METRICS"] = True
+    db.init_app(app)
+
+    @app.get("/")
+    async def index():
+        await Todo.create(title="title", text="text")
+        pagination = await Todo.all().paginate(page=1, per_page=10)
+        return str(pagination.total)
+
+    yield app
+    aio.run(db.close_pools())
+    metrics.enabled = False
+
+
+def test_metrics_endpoint(app):
+    client = app.test_client()
+    assert client.get("/").data == b"1"
+
+    response = client.get("/metrics")
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+    lines = response.get_data(as_text=True).splitlines()
+    assert 'flask_tortoise_queries_total{model="Todo",operation="insert"} 1' in lines
+    assert any(line.startswith('flask_tortoise_queries_total{model="Todo",operation="select"}') for line in lines)
+    assert 'flask_tortoise_pagination_count_duration_seconds_count{strategy="exact"} 1' in lines
+    # the count of paginate ran on the idle client, the metrics request holds one.
+    assert 'flask_tortoise_pool_size{connection="default"} 2' in lines
+    assert 'flask_tortoise_pool_in_use{connection="default"} 1' in lines
+    assert 'flask_tortoise_pool_opened_total{connection="default"} 2' in lines
@@ -0,0 +1,70 @@
+import asyncio as aio
+
+import flask
+import pytest
+
+from flask_tortoise.nplusone import NPlusOneError
+
+from models import db, Author, Book
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = flask.Flask(__name__)
+    app.testing = True
+    app.config["TORTOISE_ORM_DATABASE_URI"] = f"sqlite://{tmp_path / 'app.sqlite3'}"
+    app.config["TORTOISE_ORM_MODELS"] = "models"
+    app.config["TORTOISE_ORM_GENERATE_SCHEMAS"] = True
+    app.config["TORTOISE_ORM_POOL_MODE"] = "persistent"
+    app.config["TORTOISE_ORM_N_PLUS_ONE"] = "raise"
+    app.config["TORTOISE_ORM_N_PLUS_ONE_THRESHOLD"] = 2
+
+    db.init_app(app)
+
+    @app.post("/")
+    async def create():
+        for idx in range(4):
+            author = await Author.create(name=f"author {idx}")
+            await Book.create(title=f"book {idx}", author=author)
+        return ""
+
+    yield app
+    aio.run(db.close_pools())
+
+
+def test_lazy_foreign_keys_raise(app):
+
+    @app.get("/")
+    async def index():
+        books = await Book.all()
+        return ", ".join([(await book.author).name for book in books])
+
+    client = app.test_client()
+    client.post("/")
+    with pytest.raises(NPlusOneError, match=r'Book.all\(\).select_related\("author"\)'):
+        client.get("/")
+
+
+def test_prefetched_foreign_keys_pass(app):
+
+    @app.get("/")
+    async def index():
+        books = await Book.all().prefetch_related("author")
+        return ", ".join([book.author.name for book in books])
+
+    client = app.test_client()
+    client.post("/")
+    assert client.get("/").data == b"author 0, author 1, author 2, author 3"
+
+
+def test_lazy_reverse_relations_raise(app):
+
+    @app.get("/")
+    async def index():
+        authors = await Author.all()
+        return str(sum([len(await author.books) for author in authors]))
+
+    client = app.test_client()
+    client.post("/")
+    with pytest.raises(NPlusOneError, match=r'Author.all\(\).prefetch_related\("books"\)'):
+        client.get("/")
@@ -89,4 +89,181 @@ async def test_pagination_pages_when_total_is_none():
 #         db.session.add_all(Todo("", "") for _ in range(20))
 #         db.session.commit()
 
-#     assert len(Todo.query.paginate(count=False, page=1, per_page=10).items) == 10
\ No newline at end of file
+#     assert len(Todo.query.paginate(count=False, page=1, per_page=10).items) == 10
+
+@pytest.mark.asyncio
+async def test_query_paginate(orm):
+    from models import Todo
+
+    for i in range(25):
+        await Todo.create(title=str(i), text="")
+
+    p = await Todo.paginate(page=2, per_page=10)
+    assert isinstance(p.items, list)
+    assert [todo.title for todo in p.items] == [str(i) for i in range(10, 20)]
+    assert p.total == 25
+    assert await p.pages == 3
+
+    p = await p.next()
+    assert len(p.items) == 5
+    assert not await p.has_next
+
+    assert (await Todo.paginate(page=1, per_page=10, count=False)).total is None
+
+    with pytest.raises(NotFound):
+        await Todo.paginate(page=4, per_page=10)
+
+
+@pytest.mark.asyncio
+async def test_query_paginate_counts_on_a_spare_client(tmp_path):
+    from flask_tortoise import Tortoiser
+    from flask_tortoise.pool import ConnectionPool, lease_connections, release_connections
+    from models import Todo
+
+    db_url = f"sqlite://{tmp_path / 'db.sqlite3'}"
+    await Tortoiser.init(db_url=db_url, modules={"models": ["models"]})
+    await Tortoiser.generate_schemas()
+    pools = {"default": ConnectionPool("default", db_url, min_size=2, max_size=2)}
+    try:
+        await pools["default"].open()
+        await Todo.create(title="", text="")
+        await lease_connections(pools)
+        p = await Todo.paginate(page=1, per_page=10)
+        assert (len(p.items), p.total) == (1, 1)
+        assert (pools["default"].size, pools["default"].opened_count) == (2, 2)
+        await release_connections(pools)
+        assert pools["default"].in_use == 0
+    finally:
+        await pools["default"].close()
+        await Tortoiser.close_connections()
+
+
+@pytest.mark.asyncio
+async def test_query_paginate_counts_sequentially_without_an_idle_client(tmp_path, monkeypatch):
+    from flask_tortoise import Tortoiser
+    from flask_tortoise.pool import ConnectionPool, lease_connections, release_connections
+    from models import Todo
+
+    db_url = f"sqlite://{tmp_path / 'db.sqlite3'}"
+    await Tortoiser.init(db_url=db_url, modules={"models": ["models"]})
+    await Tortoiser.generate_schemas()
+    # the `request` pool mode.
+    pools = {"default": ConnectionPool("default", db_url, min_size=0, max_size=None, idle_timeout=0)}
+    try:
+        await Todo.create(title="", text="")
+        await lease_connections(pools)
+        p = await Todo.paginate(page=1, per_page=10)
+        assert (len(p.items), p.total) == (1, 1)
+        assert pools["default"].opened_count == 1
+        await release_connections(pools)
+    finally:
+        await pools["default"].close()
+        await Tortoiser.close_connections()
+
+
+@pytest.mark.asyncio
+async def test_query_paginate_counts_inside_the_transaction(tmp_path):
+    from tortoise.transactions import in_transaction
+
+    from flask_tortoise import Tortoiser
+    from flask_tortoise.pool import ConnectionPool, lease_connections, release_connections
+    from models import Todo
+
+    db_url = f"sqlite://{tmp_path / 'db.sqlite3'}"
+    await Tortoiser.init(db_url=db_url, modules={"models": ["models"]})
+    await Tortoiser.generate_schemas()
+    pools = {"default": ConnectionPool("default", db_url, min_size=0, max_size=2)}
+    try:
+        await lease_connections(pools)
+        async with in_transaction():
+            await Todo.create(title="", text="")
+            p = await Todo.paginate(page=1, per_page=10)
+            assert (len(p.items), p.total) == (1, 1)
+            assert pools["default"].size == 1
+        await release_connections(pools)
+    finally:
+        await pools["default"].close()
+        await Tortoiser.close_connections()
+
+
+@pytest.mark.asyncio
+async def test_query_paginate_cached_total(orm):
+    from flask_tortoise.totals import total_cache
+    from models import Todo
+
+    total_cache.clear()
+    for i in range(3):
+        await Todo.create(title=str(i), text="")
+
+    p = await Todo.paginate(page=1, per_page=2, total="cached")
+    assert (p.total, p.total_is_estimate) == (3, False)
+
+    await Todo.create(title="3", text="")
+    assert (await Todo.paginate(page=1, per_page=2, total="cached")).total == 3
+    assert (await Todo.paginate(page=1, per_page=2, total="exact")).total == 4
+    # a different filter is counted separately.
+    assert (await Todo.filter(title="3").paginate(page=1, per_page=2, total="cached")).total == 1
+    total_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_query_paginate_estimated_total(orm):
+    from flask_tortoise import Tortoiser
+    from flask_tortoise.totals import total_cache
+    from models import Todo
+
+    total_cache.clear()
+    for i in range(5):
+        await Todo.create(title=str(i), text="")
+
+    # no statistics yet, falls back to the cached exact count.
+    p = await Todo.paginate(page=1, per_page=2, total="estimated")
+    assert (p.total, p.total_is_estimate) == (5, False)
+
+    await Tortoiser.get_connection("default").execute_script("ANALYZE")
+    await Todo.create(title="5", text="")
+    p = await Todo.paginate(page=3, per_page=2, total="estimated")
+    assert (p.total, p.total_is_estimate) == (5, True)
+    # a full page might be followed by more rows than estimated.
+    assert await p.has_next
+
+    with pytest.raises(ValueError):
+        await Todo.paginate(total="unknown")
+    total_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_query_paginate_window_total(orm, monkeypatch):
+    from flask_tortoise import Tortoiser
+    from models import Todo
+
+    for i in range(25):
+        await Todo.create(title=str(i), text="")
+
+    client = Tortoiser.get_connection("default")
+    queries = []
+    execute_query = client.execute_query
+
+    async def _execute_query(sql, values=None):
+        queries.append(sql)
+        return await execute_query(sql, values)
+
+    monkeypatch.setattr(client, "execute_query", _execute_query)
+
+    p = await Todo.filter(title__not="0").paginate(page=2, per_page=10, total="window")
+    assert p.total == 24
+    assert [todo.title for todo in p.items] == [str(i) for i in range(11, 21)]
+    assert not hasattr(p.items[0], "_flask_tortoise_total")
+    assert len(queries) == 1 and "OVER()" in queries[0]
+
+    assert (await Todo.filter(title="x").paginate(per_page=10, total="window")).total == 0
+    p = await Todo.paginate(page=4, per_page=10, total="window", error_out=False)
+    assert (p.items, p.total) == ([], 25)
+    with pytest.raises(NotFound):
+        await Todo.paginate(page=4, per_page=10, total="window")
+
+    # the window would count the rows before the distinct.
+    queries.clear()
+    p = await Todo.all().distinct().paginate(page=1, per_page=10, total="window")
+    assert p.total == 25
+    assert len(queries) == 2 and not any("OVER()" in sql for sql in queries)
@@ -0,0 +1,218 @@
+import asyncio as aio
+
+import flask
+import pytest
+
+from flask_tortoise.pool import ConnectionPool
+
+from models import db, Todo
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    return f"sqlite://{tmp_path / 'pool.sqlite3'}"
+
+
+@pytest.mark.asyncio
+async def test_pool_reuses_released_clients(db_url):
+    pool = ConnectionPool("default", db_url, min_size=1, max_size=2)
+    await pool.open()
+    assert (pool.size, pool.idle, pool.in_use) == (1, 1, 0)
+
+    first = await pool.acquire()
+    await pool.release(first)
+    assert await pool.acquire() is first
+
+    second = await pool.acquire()
+    assert second is not first
+    assert (pool.size, pool.in_use) == (2, 2)
+
+    await pool.release(first)
+    await pool.release(second)
+    await pool.close()
+    assert pool.size == 0
+
+
+@pytest.mark.asyncio
+async def test_pool_waits_for_a_free_client(db_url):
+    pool = ConnectionPool("default", db_url, min_size=0, max_size=1, acquire_timeout=0.05)
+    client = await pool.acquire()
+
+    with pytest.raises(aio.TimeoutError):
+        await pool.acquire()
+
+    pool.acquire_timeout = None
+    waiter = aio.ensure_future(pool.acquire())
+    await aio.sleep(0)
+    assert pool.waiters == 1
+
+    await pool.release(client)
+    assert await waiter is client
+    assert pool.in_use == 1
+
+    await pool.release(client)
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_closes_expired_idle_clients(db_url):
+    pool = ConnectionPool("default", db_url, min_size=1, max_size=3, idle_timeout=0)
+    clients = [await pool.acquire() for _ in range(3)]
+    for client in clients:
+        await pool.release(client)
+
+    assert pool.size == 1
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_without_max_size(db_url):
+    pool = ConnectionPool("default", db_url, min_size=0, max_size=None, idle_timeout=0)
+    clients = [await pool.acquire(wait=False) for _ in range(12)]
+    assert None not in clients and pool.in_use == 12
+
+    for client in clients:
+        await pool.release(client)
+    assert pool.size == 0
+    await pool.close()
+
+
+def test_persistent_pool_mode(tmp_path):
+    app = flask.Flask(__name__)
+    app.config["TORTOISE_ORM_DATABASE_URI"] = f"sqlite://{tmp_path / 'app.sqlite3'}"
+    app.config["TORTOISE_ORM_MODELS"] = "models"
+    app.config["TORTOISE_ORM_GENERATE_SCHEMAS"] = True
+    app.config["TORTOISE_ORM_POOL_MODE"] = "persistent"
+    app.config["TORTOISE_ORM_POOL_MAX_SIZE"] = 2
+    db.init_app(app)
+
+    @app.get("/")
+    async def index():
+        await Todo.create(title="title", text="text")
+        return str(await Todo.all().count())
+
+    client = app.test_client()
+    assert [client.get("/").data for _ in range(3)] == [b"1", b"2", b"3"]
+
+    pool = db._pools["default"]
+    assert (pool.size, pool.in_use) == (1, 0)
+
+    aio.run(db.close_pools())
+
+
+@pytest.mark.parametrize("db_uri", ["sqlite://:memory:", "file"])
+def test_persistent_pool_mode_runs_concurrent_queries(tmp_path, db_uri):
+    app = flask.Flask(__name__)
+    if db_uri == "file":
+        db_uri = f"sqlite://{tmp_path / 'app.sqlite3'}"
+    app.config["TORTOISE_ORM_DATABASE_URI"] = db_uri
+    app.config["TORTOISE_ORM_MODELS"] = "models"
+    app.config["TORTOISE_ORM_GENERATE_SCHEMAS"] = True
+    app.config["TORTOISE_ORM_POOL_MODE"] = "persistent"
+    app.config["TORTOISE_ORM_POOL_MAX_SIZE"] = 1
+    db.init_app(app)
+
+    @app.get("/")
+    async def index():
+        todo = await Todo.create(title="title", text="text")
+        # every request contends for the lock of the pooled client inside it's own event loop.
+        todos = await aio.gather(*(Todo.get_or_404(id=todo.pk) for _ in range(3)))
+        return str(len(todos))
+
+    client = app.test_client()
+    responses = [client.get("/") for _ in range(3)]
+    assert [(r.status_code, r.data) for r in responses] == [(200, b"3")] * 3
+
+    aio.run(db.close_pools())
+
+
+@pytest.mark.asyncio
+async def test_pool_clients_of_other_engines_connect_lazily(db_url, monkeypatch):
+    monkeypatch.setattr("flask_tortoise.pool.SHARED_ENGINES", ())
+    pool = ConnectionPool("default", db_url, min_size=0, max_size=None)
+
+    client = await pool.acquire()
+    assert client._connection is None
+    async with client._in_transaction() as connection:
+        await connection.execute_query("SELECT 1")
+    assert client._connection is not None
+    await pool.release(client)
+    assert pool.closed_count == 0
+
+    await pool.close()
+    assert client._connection is None
+
+
+def test_request_pool_mode_connects_inside_the_view(tmp_path, monkeypatch):
+    monkeypatch.setattr("flask_tortoise.pool.SHARED_ENGINES", ())
+    app = flask.Flask(__name__)
+    app.config["TORTOISE_ORM_DATABASE_URI"] = f"sqlite://{tmp_path / 'app.sqlite3'}"
+    app.config["TORTOISE_ORM_MODELS"] = "models"
+    app.config["TORTOISE_ORM_GENERATE_SCHEMAS"] = True
+    db.init_app(app)
+
+    @app.get("/")
+    async def index():
+        todo = await Todo.create(title="title", text="text")
+        todos = await aio.gather(*(Todo.get_or_404(id=todo.pk) for _ in range(3)))
+        return str(len(todos))
+
+    client = app.test_client()
+    assert [client.get("/").data for _ in range(2)] == [b"3", b"3"]
+
+    pool = db._pools["default"]
+    assert (pool.opened_count, pool.closed_count, pool.size) == (2, 2, 0)
+    aio.run(db.close_pools())
+
+
+def test_persistent_pool_mode_needs_a_shared_engine(tmp_path, monkeypatch):
+    from tortoise.exceptions import ConfigurationError
+
+    monkeypatch.setattr("flask_tortoise.pool.SHARED_ENGINES", ())
+    app = flask.Flask(__name__)
+    app.config["TORTOISE_ORM_DATABASE_URI"] = f"sqlite://{tmp_path / 'app.sqlite3'}"
+    app.config["TORTOISE_ORM_MODELS"] = "models"
+    app.config["TORTOISE_ORM_POOL_MODE"] = "persistent"
+    db.init_app(app)
+
+    with pytest.raises(ConfigurationError):
+        aio.run(db.init_pools())
+    assert db._pools == dict()
+
+
+def test_invalid_pool_mode():
+    app = flask.Flask(__name__)
+    app.config["TORTOISE_ORM_DATABASE_URI"] = "sqlite://:memory:"
+    app.config["TORTOISE_ORM_POOL_MODE"] = "global"
+
+    with pytest.raises(ValueError):
+        db.init_app(app)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_contexts_lease_their_own_clients(db_url):
+    from flask_tortoise.pool import get_leased_client, lease_connections, release_connections
+
+    pools = {"default": ConnectionPool("default", db_url, min_size=0, max_size=2)}
+    leased = dict()
+    released = aio.Event()
+
+    async def handle(name):
+        await lease_connections(pools)
+        leased[name] = client = get_leased_client("default")
+        if name == "first":
+            await release_connections(pools)
+            released.set()
+        else:
+            await released.wait()
+            # the other context finished, this lease must still be usable.
+            assert get_leased_client("default") is client
+            await client.execute_query("SELECT 1")
+            await release_connections(pools)
+
+    await aio.gather(handle("first"), handle("second"))
+    assert leased["first"] is not leased["second"]
+    assert get_leased_client("default") is None
+    assert pools["default"].in_use == 0
+
+    await pools["default"].close()
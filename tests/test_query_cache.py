@@ -0,0 +1,158 @@
+import pytest
+
+from flask_tortoise.cache import query_cache
+
+
+@pytest.fixture
+def queries(orm, monkeypatch):
+    from flask_tortoise import Tortoiser
+
+    query_cache.clear()
+    client = Tortoiser.get_connection("default")
+    executed = []
+    execute_query = client.execute_query
+
+    async def _execute_query(sql, values=None):
+        executed.append(sql)
+        return await execute_query(sql, values)
+
+    monkeypatch.setattr(client, "execute_query", _execute_query)
+    yield executed
+    query_cache.clear()
+
+
+def test_clearing_keeps_the_counters():
+    query_cache.reset_stats()
+    query_cache.set("key", "value")
+    query_cache.get("key")
+    query_cache.get("missing")
+    query_cache.clear()
+
+    assert query_cache.stats() == dict(size=0, maxsize=query_cache.maxsize, hits=1, misses=1)
+
+
+@pytest.mark.asyncio
+async def test_cached_queryset(queries):
+    from models import Todo
+
+    await Todo.create(title="a", text="")
+    queries.clear()
+
+    first = await Todo.filter(title="a").cache(ttl=30)
+    second = await Todo.filter(title="a").cache(ttl=30)
+    assert [todo.title for todo in second] == ["a"]
+    # the cached rows build new instances every time.
+    assert first[0] is not second[0]
+    assert len(queries) == 1
+
+    assert (await Todo.filter(title="a").cache().first()).title == "a"
+    await Todo.filter(title="a")
+    assert len(queries) == 3
+
+
+@pytest.mark.asyncio
+async def test_cached_queryset_invalidation(queries):
+    from models import Todo
+
+    todo = await Todo.create(title="a", text="")
+    assert len(await Todo.all().cache()) == 1
+
+    await Todo.create(title="b", text="")
+    assert len(await Todo.all().cache()) == 2
+
+    todo.title = "c"
+    await todo.save()
+    assert sorted(todo.title for todo in await Todo.all().cache()) == ["b", "c"]
+
+    await Todo.filter(title="b").update(done=True)
+    assert [todo.done for todo in await Todo.filter(title="b").cache()] == [True]
+
+    await Todo.bulk_create([Todo(title="d", text="")])
+    await Todo.filter(title="c").delete()
+    assert sorted(todo.title for todo in await Todo.all().cache()) == ["b", "d"]
+
+    await (await Todo.get(title="d")).delete()
+    assert len(await Todo.all().cache()) == 1
+
+
+@pytest.mark.asyncio
+async def test_cached_queryset_waits_for_the_commit(queries):
+    from tortoise.transactions import in_transaction
+
+    from flask_tortoise.cache import CachingClient
+    from models import Todo
+
+    class Reader(object):
+        # a reader on another connection, outside of the transaction.
+        connection_name = "default"
+        calls = 0
+
+        async def execute_query(self, query, values=None):
+            self.calls += 1
+            return 0, []
+
+    reader = CachingClient(Reader(), ("todos",))
+    await Todo.create(title="a", text="")
+
+    async with in_transaction():
+        await Todo.filter(title="a").update(title="b")
+        await reader.execute_query("SELECT 1")
+        await reader.execute_query("SELECT 1")
+        assert reader.calls == 2 and len(query_cache) == 0
+
+    await reader.execute_query("SELECT 1")
+    assert [todo.title for todo in await Todo.all().cache()] == ["b"]
+    assert len(query_cache) == 2
+
+    with pytest.raises(RuntimeError):
+        async with in_transaction():
+            await Todo.filter(title="b").update(title="c")
+            raise RuntimeError
+    assert len(query_cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_cached_queryset_after_a_failed_transaction(queries):
+    from tortoise.exceptions import TransactionManagementError
+    from tortoise.transactions import in_transaction
+
+    from models import Todo
+
+    with pytest.raises(TransactionManagementError):
+        async with in_transaction():
+            await Todo.create(title="a", text="")
+            # neither the commit nor the rollback runs on the exit.
+            raise TransactionManagementError("failed")
+
+    queries.clear()
+    await Todo.all().cache()
+    await Todo.all().cache()
+    assert len(queries) == 1
+
+
+@pytest.mark.asyncio
+async def test_cached_prefetch_of_many_to_many_relations(queries):
+    from tortoise.transactions import in_transaction
+
+    from models import Author, Book, Tag
+
+    author = await Author.create(name="author")
+    book = await Book.create(title="book", author=author)
+    tag = await Tag.create(name="tag")
+
+    async def cached_tags():
+        books = await Book.all().prefetch_related("tags").cache()
+        return [tag.name for tag in books[0].tags]
+
+    assert await cached_tags() == []
+    await tag.books.add(book)
+    assert await cached_tags() == ["tag"]
+
+    async with in_transaction():
+        await book.tags.remove(tag)
+    assert await cached_tags() == []
+
+    await book.tags.add(tag)
+    assert await cached_tags() == ["tag"]
+    await tag.books.clear()
+    assert await cached_tags() == []
@@ -0,0 +1,80 @@
+import asyncio as aio
+import sqlite3
+
+import flask
+import pytest
+from tortoise.transactions import in_transaction
+
+from models import db, Todo
+
+
+def create_database(path, title):
+    with sqlite3.connect(path) as connection:
+        connection.execute(
+            "CREATE TABLE todos (id INTEGER PRIMARY KEY AUTOINCREMENT, title VARCHAR(60) NOT NULL, "
+            "text VARCHAR(60) NOT NULL, done INT NOT NULL DEFAULT 0, pub_date TIMESTAMP)"
+        )
+        connection.execute("INSERT INTO todos (title, text) VALUES (?, 'text')", (title,))
+
+
+@pytest.fixture
+def app(tmp_path):
+    for name in ("primary", "replica_0", "replica_1"):
+        create_database(tmp_path / f"{name}.sqlite3", name)
+
+    app = flask.Flask(__name__)
+    app.config["TORTOISE_ORM_DATABASE_URI"] = f"sqlite://{tmp_path / 'primary.sqlite3'}"
+    app.config["TORTOISE_ORM_MODELS"] = "models"
+    app.config["TORTOISE_ORM_POOL_MODE"] = "persistent"
+    app.config["TORTOISE_ORM_READ_REPLICA_URIS"] = [
+        f"sqlite://{tmp_path / 'replica_0.sqlite3'}",
+        f"sqlite://{tmp_path / 'replica_1.sqlite3'}",
+    ]
+    db.init_app(app)
+
+    @app.get("/")
+    async def read():
+        return (await Todo.first()).title
+
+    @app.get("/count")
+    async def count():
+        return str(await Todo.all().count())
+
+    @app.get("/write")
+    async def write():
+        await Todo.create(title="new", text="text")
+        return (await Todo.first()).title
+
+    @app.get("/transaction")
+    async def transaction():
+        async with in_transaction():
+            return (await Todo.first()).title
+
+    yield app
+    aio.run(db.close_pools())
+
+
+def test_reads_go_round_robin_to_the_replicas(app):
+    client = app.test_client()
+    assert [client.get("/").data for _ in range(4)] == [b"replica_0", b"replica_1"] * 2
+    assert client.get("/count").data == b"1"
+
+
+def test_request_sticks_to_the_primary_after_a_write(app):
+    client = app.test_client()
+    assert client.get("/write").data == b"primary"
+    assert client.get("/").data in (b"replica_0", b"replica_1")
+
+
+def test_transactions_use_the_primary(app):
+    client = app.test_client()
+    assert client.get("/transaction").data == b"primary"
+
+
+def test_invalid_replica_strategy():
+    app = flask.Flask(__name__)
+    app.config["TORTOISE_ORM_DATABASE_URI"] = "sqlite://:memory:"
+    app.config["TORTOISE_ORM_READ_REPLICA_STRATEGY"] = "random"
+
+    with pytest.raises(ValueError):
+        db.init_app(app)
@@ -0,0 +1,49 @@
+from datetime import datetime, timezone
+
+import pytest
+from tortoise.exceptions import FieldError
+
+from flask_tortoise.rows import get_row_factory
+
+from models import Todo
+
+
+@pytest.mark.asyncio
+async def test_rows_convert_the_field_values(orm):
+    pub_date = datetime(2021, 1, 1, tzinfo=timezone.utc)
+    await Todo.create(title="first", text="text", done=True, pub_date=pub_date)
+    await Todo.create(title="second", text="text")
+
+    first, second = await Todo.all().order_by("id").rows()
+    assert first == (1, "first", "text", True, pub_date)
+    assert (second.done, second.pub_date) == (False, None)
+    assert first._asdict()["title"] == "first"
+    assert not hasattr(first, "__dict__")
+
+
+@pytest.mark.asyncio
+async def test_rows_of_a_field_selection(orm):
+    for i in range(3):
+        await Todo.create(title=f"Todo-{i}", text="text", done=i == 1)
+
+    rows = await Todo.filter(done=False).order_by("-id").rows("id", "title")
+    assert rows == [(3, "Todo-2"), (1, "Todo-0")]
+    assert rows[0].title == "Todo-2" and rows[0]._fields == ("id", "title")
+    assert type(rows[0]) is type((await Todo.all().rows("id", "title"))[0])
+
+    with pytest.raises(FieldError):
+        await Todo.all().rows("id", "missing")
+
+
+@pytest.mark.parametrize("value", [
+    None, 1609459200, datetime(2021, 1, 1), datetime(2021, 1, 1, tzinfo=timezone.utc),
+    "2021-01-01 10:30:00", "2021-01-01T10:30:00.123456+05:30", "20210101T103000Z",
+])
+def test_rows_convert_datetimes_like_the_instances(monkeypatch, value):
+    monkeypatch.setenv("TIMEZONE", "Asia/Kolkata")
+    factory = get_row_factory(Todo, ("pub_date",))
+
+    row, = factory.make_rows([{"pub_date": value}])
+    assert row.pub_date == Todo._meta.fields_map["pub_date"].to_python_value(value)
+    if value is not None:
+        assert row.pub_date.tzinfo.zone == "Asia/Kolkata"
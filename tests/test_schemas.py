@@ -0,0 +1,32 @@
+import pytest
+from tortoise import Tortoise
+
+from flask_tortoise.schemas import generate_schemas_once, get_schema_fingerprint
+
+from models import Todo
+
+
+@pytest.mark.asyncio
+async def test_generate_schemas_once(tmp_path):
+    await Tortoise.init(db_url=f"sqlite://{tmp_path / 'db.sqlite3'}", modules={"models": ["models"]})
+    try:
+        assert await generate_schemas_once() == {"default": True}
+        assert await generate_schemas_once() == {"default": False}
+        assert await generate_schemas_once(force=True) == {"default": True}
+        assert await Todo.all().count() == 0
+    finally:
+        await Tortoise.close_connections()
+
+
+@pytest.mark.asyncio
+async def test_schema_fingerprint_follows_the_models(tmp_path):
+    await Tortoise.init(db_url=f"sqlite://{tmp_path / 'db.sqlite3'}", modules={"models": ["models"]})
+    try:
+        fingerprint = get_schema_fingerprint("default")
+        assert fingerprint == get_schema_fingerprint("default")
+
+        Todo._meta.db_table = "todo_items"
+        assert fingerprint != get_schema_fingerprint("default")
+    finally:
+        Todo._meta.db_table = "todos"
+        await Tortoise.close_connections()
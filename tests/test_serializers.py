@@ -0,0 +1,64 @@
+import datetime as dt
+import json as json
+from decimal import Decimal
+from uuid import UUID
+
+import flask
+import pytest
+
+from flask_tortoise import serializers
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_dumps(monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(serializers, "orjson", None)
+    elif serializers.orjson is None:
+        pytest.skip("orjson is not installed")
+
+    data = dict(
+        at=dt.datetime(2021, 5, 1, 10, 30),
+        price=Decimal("1.50"),
+        uid=UUID(int=1),
+        items=[1, "a", None, True],
+    )
+    assert json.loads(serializers.dumps(data)) == dict(
+        at="2021-05-01T10:30:00",
+        price="1.50",
+        uid="00000000-0000-0000-0000-000000000001",
+        items=[1, "a", None, True],
+    )
+
+
+@pytest.mark.asyncio
+async def test_queryset_to_json(orm):
+    from models import Todo
+
+    for i in range(3):
+        await Todo.create(title=str(i), text="", done=bool(i % 2))
+
+    assert json.loads(await Todo.filter(done=True).to_json("id", "title")) == [{"id": 2, "title": "1"}]
+    rows = json.loads(await Todo.all().to_json())
+    assert rows[0] == {"id": 1, "title": "0", "text": "", "done": False, "pub_date": None}
+
+
+@pytest.mark.asyncio
+async def test_pagination_to_response(orm):
+    from models import Todo
+
+    for i in range(3):
+        await Todo.create(title=str(i), text="")
+
+    with flask.Flask(__name__).app_context():
+        p = await Todo.paginate(page=1, per_page=2, fields=("id", "title"))
+        assert p.items == [{"id": 1, "title": "0"}, {"id": 2, "title": "1"}]
+        r = p.to_response()
+        assert r.mimetype == "application/json"
+        assert r.get_json() == dict(
+            items=[{"id": 1, "title": "0"}, {"id": 2, "title": "1"}], page=1, per_page=2, total=3, pages=2
+        )
+        assert (await p.next()).items == [{"id": 3, "title": "2"}]
+
+        # the model instances are serialized too.
+        p = await Todo.paginate(page=2, per_page=2)
+        assert p.to_response("title").get_json()["items"] == [{"title": "2"}]
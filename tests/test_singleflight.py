@@ -0,0 +1,72 @@
+import asyncio as aio
+
+import flask
+import pytest
+
+from flask_tortoise.singleflight import reset_single_flight_stats, single_flight_stats
+
+
+@pytest.fixture
+def queries(orm, monkeypatch):
+    from flask_tortoise import Tortoiser
+
+    client = Tortoiser.get_connection("default")
+    executed = []
+    execute_query = client.execute_query
+
+    async def _execute_query(sql, values=None):
+        executed.append(sql)
+        await aio.sleep(0.01)
+        return await execute_query(sql, values)
+
+    monkeypatch.setattr(client, "execute_query", _execute_query)
+    reset_single_flight_stats()
+    return executed
+
+
+@pytest.mark.asyncio
+async def test_single_flight(queries):
+    from models import Todo
+
+    await Todo.create(title="a", text="")
+    queries.clear()
+
+    results = await aio.gather(*(Todo.filter(title="a").single_flight() for _ in range(5)))
+    assert [[todo.title for todo in todos] for todos in results] == [["a"]] * 5
+    # every caller gets it's own instances.
+    assert results[0][0] is not results[1][0]
+    assert len(queries) == 1
+    assert single_flight_stats() == dict(executed=1, coalesced=4, in_flight=0)
+
+    # nothing is kept after the query completes.
+    await Todo.filter(title="a").single_flight()
+    assert len(queries) == 2
+
+    # the different queries are never coalesced.
+    await aio.gather(Todo.filter(title="a").single_flight(), Todo.filter(title="b").single_flight())
+    assert len(queries) == 4
+
+
+@pytest.mark.asyncio
+async def test_single_flight_config(queries):
+    from models import Todo
+
+    app = flask.Flask(__name__)
+    app.config["TORTOISE_ORM_SINGLE_FLIGHT"] = True
+    with app.app_context():
+        await aio.gather(Todo.all(), Todo.all(), Todo.all().single_flight(False))
+    assert len(queries) == 2
+
+
+@pytest.mark.asyncio
+async def test_single_flight_leader_cancelled(queries):
+    from models import Todo
+
+    await Todo.create(title="a", text="")
+    leader = aio.ensure_future(Todo.all().single_flight())
+    await aio.sleep(0)
+    follower = aio.ensure_future(Todo.all().single_flight())
+    await aio.sleep(0)
+    leader.cancel()
+    assert [todo.title for todo in await follower] == ["a"]
+    assert single_flight_stats()["in_flight"] == 0
@@ -0,0 +1,67 @@
+import asyncio as aio
+import json
+
+import flask
+import pytest
+
+from flask_tortoise.slowlog import get_explain_sql, slow_query_logger
+
+from models import db, Todo
+
+
+def test_only_the_selects_are_explained():
+    assert get_explain_sql("SELECT 1", "sqlite") == "EXPLAIN QUERY PLAN SELECT 1"
+    assert get_explain_sql("select 1", "postgres") == "EXPLAIN select 1"
+    assert get_explain_sql("DELETE FROM todos", "sqlite") is None
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    yield tmp_path / "slow.log"
+    for handler in list(slow_query_logger.handlers):
+        slow_query_logger.removeHandler(handler)
+        handler.close()
+
+
+def make_app(tmp_path, log_path, sample_rate):
+    app = flask.Flask(__name__)
+    app.config["TORTOISE_ORM_DATABASE_URI"] = f"sqlite://{tmp_path / 'app.sqlite3'}"
+    app.config["TORTOISE_ORM_MODELS"] = "models"
+    app.config["TORTOISE_ORM_GENERATE_SCHEMAS"] = True
+    app.config["TORTOISE_ORM_POOL_MODE"] = "persistent"
+    app.config["TORTOISE_ORM_SLOW_QUERY_MS"] = 0
+    app.config["TORTOISE_ORM_SLOW_QUERY_SAMPLE_RATE"] = sample_rate
+    app.config["TORTOISE_ORM_SLOW_QUERY_LOG"] = str(log_path)
+    db.init_app(app)
+
+    @app.get("/todos")
+    async def index():
+        await Todo.create(title="title", text="text")
+        return str(await Todo.filter(done=False).count())
+
+    return app
+
+
+def test_slow_queries_are_logged_with_their_plan(tmp_path, log_path):
+    app = make_app(tmp_path, log_path, 1.0)
+    try:
+        assert app.test_client().get("/todos").data == b"1"
+    finally:
+        aio.run(db.close_pools())
+
+    insert, count = [json.loads(line) for line in log_path.read_text().splitlines()]
+    assert insert["sql"].startswith("INSERT") and insert["plan"] is None
+    assert count["sql"].startswith("SELECT COUNT(*)")
+    assert count["endpoint"] == "index" and count["path"] == "/todos"
+    assert count["rows"] == 1 and count["duration_ms"] >= 0
+    assert any("todos" in row["detail"] for row in count["plan"])
+
+
+def test_unsampled_slow_queries_are_skipped(tmp_path, log_path):
+    app = make_app(tmp_path, log_path, 0)
+    try:
+        assert app.test_client().get("/todos").data == b"1"
+    finally:
+        aio.run(db.close_pools())
+
+    assert log_path.read_text() == ""
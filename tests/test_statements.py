@@ -0,0 +1,36 @@
+import pytest
+
+from flask_tortoise.pool import ConnectionPool
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    return f"sqlite://{tmp_path / 'statements.sqlite3'}"
+
+
+def test_the_statement_cache_size_is_passed_to_the_driver(db_url, monkeypatch):
+    pool = ConnectionPool("default", db_url, statement_cache_size=256)
+    # the sqlite driver doesn't take it.
+    assert "statement_cache_size" not in pool._credentials
+
+    monkeypatch.setattr("flask_tortoise.pool.STATEMENT_CACHE_PARAMS", {"tortoise.backends.sqlite": "statement_cache_size"})
+    pool = ConnectionPool("default", db_url, statement_cache_size=256)
+    assert pool._credentials["statement_cache_size"] == 256
+
+    pool = ConnectionPool("default", f"{db_url}?statement_cache_size=64", statement_cache_size=256)
+    assert pool._credentials["statement_cache_size"] == "64"
+
+
+@pytest.mark.asyncio
+async def test_the_driver_opens_the_clients_with_the_statement_cache_size(db_url, monkeypatch):
+    # the tortoise sqlite client passes it's extra params on as pragmas.
+    monkeypatch.setattr("flask_tortoise.pool.STATEMENT_CACHE_PARAMS", {"tortoise.backends.sqlite": "cache_size"})
+    pool = ConnectionPool("default", db_url, min_size=0, statement_cache_size=256)
+
+    client = await pool.acquire()
+    try:
+        _, rows = await client.execute_query("PRAGMA cache_size")
+        assert rows[0][0] == 256
+    finally:
+        await pool.release(client)
+        await pool.close()
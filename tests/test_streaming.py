@@ -0,0 +1,74 @@
+import asyncio as aio
+import json as json
+from datetime import datetime, timezone
+
+import flask
+import pytest
+
+from flask_tortoise import Tortoiser, stream_response
+
+
+@pytest.fixture
+def todos():
+    from models import Todo
+
+    async def _setup():
+        await Tortoiser.init(db_url="sqlite://:memory:", modules={"models": ["models"]})
+        await Tortoiser.generate_schemas()
+        for i in range(7):
+            pub_date = datetime(2021, 1, 1, tzinfo=timezone.utc) if i == 0 else None
+            await Todo.create(title=str(i), text="", pub_date=pub_date)
+
+    loop = aio.new_event_loop()
+    loop.run_until_complete(_setup())
+    yield Todo
+    loop.run_until_complete(Tortoiser.close_connections())
+    loop.close()
+
+
+@pytest.mark.asyncio
+async def test_iter_chunks(orm):
+    from models import Todo
+
+    for i in range(7):
+        await Todo.create(title=str(i), text="")
+
+    chunks = [[todo.title for todo in chunk] async for chunk in Todo.all().iter_chunks(3)]
+    assert chunks == [["0", "1", "2"], ["3", "4", "5"], ["6"]]
+
+    chunks = [len(chunk) async for chunk in Todo.all().offset(1).limit(5).iter_chunks(2)]
+    assert chunks == [2, 2, 1]
+
+    titles = [todo.title async for todo in Todo.filter(title__not="3").stream(2, order_by="-id")]
+    assert titles == ["6", "5", "4", "2", "1", "0"]
+
+    with pytest.raises(ValueError):
+        [chunk async for chunk in Todo.all().iter_chunks(0)]
+
+
+def test_stream_response(todos):
+    app = flask.Flask(__name__)
+
+    @app.get("/todos.<format>")
+    def export_todos(format):
+        fields = flask.request.args.get("fields", "id,title").split(",")
+        return stream_response(todos.all(), format=format, fields=fields, chunk_size=3)
+
+    client = app.test_client()
+    r = client.get("/todos.ndjson")
+    assert r.mimetype == "application/x-ndjson"
+    assert r.is_streamed
+    assert [json.loads(line) for line in r.data.decode().splitlines()][-1] == {"id": 7, "title": "6"}
+
+    r = client.get("/todos.json")
+    assert [todo["title"] for todo in r.get_json()] == [str(i) for i in range(7)]
+
+    # the dates are dumped like `QuerySet.to_json` dumps them.
+    r = client.get("/todos.json?fields=pub_date")
+    assert r.get_json()[0] == {"pub_date": "2021-01-01T00:00:00+00:00"}
+
+    r = client.get("/todos.csv")
+    assert r.data.decode().splitlines()[:2] == ["id,title", "1,0"]
+
+    with pytest.raises(ValueError):
+        stream_response(todos.all(), format="xml")
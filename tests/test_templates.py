@@ -0,0 +1,60 @@
+import pytest
+from tortoise.query_utils import Q
+
+from flask_tortoise.templates import template_cache
+
+from models import Todo
+
+
+@pytest.fixture
+def templates():
+    template_cache.clear()
+    template_cache.reset_stats()
+    yield template_cache
+    template_cache.clear()
+    template_cache.maxsize = 512
+
+
+@pytest.mark.asyncio
+async def test_the_shapes_are_compiled_once(orm, templates):
+    todos = [await Todo.create(title=f"Todo-{i}", text="text") for i in range(3)]
+
+    for todo in todos:
+        assert (await Todo.get_or_404(pk=todo.id)).title == todo.title
+    assert templates.stats()["misses"] == 1
+    assert templates.stats()["hits"] == 2
+
+    (template, _), = templates._data.values()
+    assert template.sql.endswith('WHERE "id"=? LIMIT ?') and template.order == (0, 1)
+
+
+@pytest.mark.asyncio
+async def test_the_pages_share_a_template(orm, templates):
+    for i in range(25):
+        await Todo.create(title=f"Todo-{i}", text="text")
+
+    for page in (1, 2, 3):
+        p = await Todo.filter(done=False).order_by("id").paginate(page=page, per_page=10)
+        assert [todo.id for todo in p.items] == list(range((page - 1) * 10 + 1, min(page * 10, 25) + 1))
+
+    # the first page has no offset, the later ones share the offset shape.
+    assert len([key for key in templates._data if key[0] is Todo]) == 2
+    # like the query builder, a zero limit renders no `LIMIT` at all.
+    assert len(await Todo.all().order_by("id").limit(0)) == 25
+
+
+@pytest.mark.asyncio
+async def test_the_templates_bind_the_values_in_order(orm, templates):
+    for i in range(6):
+        await Todo.create(title=f"Todo-{i}", text="text", done=i % 2 == 0)
+
+    def queries():
+        yield Todo.filter(Q(title="Todo-1") | Q(id__gt=4), done=False).exclude(text="other").order_by("id")
+        yield Todo.filter(pub_date=None, id__lte=2).order_by("-id")
+        yield Todo.filter(title__contains="Todo", done=True).order_by("id")
+
+    templated = [[todo.id for todo in await queryset] for queryset in queries()]
+    templates.maxsize = 0
+    built = [[todo.id for todo in await queryset] for queryset in queries()]
+
+    assert templated == built == [[2, 6], [2, 1], [1, 3, 5]]